@@ -0,0 +1,167 @@
+# game24/book.py
+"""
+Printable puzzle books: pick cases from answers.json, lay them out N per page,
+append an answer key, and stream the HTML to disk page by page.
+
+    python -m game24.book web/static/answers.json book.html --level medium --count 200
+
+Pages are rendered on a process pool; at most a few pages per worker are in
+flight, so memory stays flat however many puzzles go in. Print to PDF from
+the browser (pages break on .page).
+"""
+import argparse, base64, html, json, os, random
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+
+from .card_assets import get_registry, pick_card_images
+from .card_utils import get_values, _rng_for
+from .complexity import score_complexity
+
+def select_cases(puzzles: Iterable[Dict[str, Any]], level: Optional[str] = None,
+                 solvable: Optional[bool] = None, count: Optional[int] = None,
+                 seed=None) -> List[Dict[str, Any]]:
+    """Filter by level / solvability, optionally shuffle with seed, keep count."""
+    out = []
+    for p in puzzles:
+        if level and str(p.get("level", "")).strip().lower() != level.lower():
+            continue
+        if solvable is not None and bool(p.get("solutions")) != solvable:
+            continue
+        out.append(p)
+    if seed is not None:
+        random.Random(seed).shuffle(out)
+    return out[:count] if count else out
+
+def simplest_solution(p: Dict[str, Any]) -> Optional[str]:
+    sols = p.get("solutions") or []
+    return min(sols, key=lambda s: (score_complexity(s), len(s))) if sols else None
+
+# ---------- page rendering (runs in worker processes) ----------
+def _card_class(code: str) -> str:
+    return f"c-{code}"
+
+def _render_puzzle_page(job) -> str:
+    page_no, items, theme, pictures_root, embedded = job
+    cells = []
+    for p in items:
+        values = get_values(p)
+        images = pick_card_images(values, theme=theme, pictures_root=pictures_root,
+                                  rng=_rng_for(values, salt=str(p["case_id"])))
+        if embedded:
+            cards = "".join(f'<span class="card {_card_class(i["code"])}" title="{i["code"]}"></span>' for i in images)
+        else:
+            cards = "".join(f'<img class="card" src="file://{html.escape(i["path"])}" alt="{i["code"]}">' for i in images)
+        cells.append(f'<div class="cell"><div class="num">#{int(p["case_id"])}</div>'
+                     f'<div class="cards">{cards}</div><div class="line"></div></div>')
+    return (f'<section class="page"><div class="grid">{"".join(cells)}</div>'
+            f'<footer>Page {page_no}</footer></section>\n')
+
+def _render_answer_page(job) -> str:
+    page_no, items = job
+    rows = []
+    for p in items:
+        sol = simplest_solution(p)
+        rows.append(f'<tr><td>#{int(p["case_id"])}</td><td>{", ".join(map(str, get_values(p)))}</td>'
+                    f'<td>{html.escape(sol) if sol else "<em>no solution</em>"}</td></tr>')
+    return (f'<section class="page answers"><h2>Answers</h2><table>{"".join(rows)}</table>'
+            f'<footer>Page {page_no}</footer></section>\n')
+
+def _ordered_map(fn, jobs: Iterable, workers: int) -> Iterator[str]:
+    """Like executor.map, but keeps at most 2*workers jobs in flight."""
+    if workers <= 1:
+        for j in jobs:
+            yield fn(j)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending = deque()
+        for j in jobs:
+            pending.append(ex.submit(fn, j))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def _chunks(seq: List[Any], n: int) -> Iterator[List[Any]]:
+    for i in range(0, len(seq), n):
+        yield seq[i:i + n]
+
+# ---------- document ----------
+_CSS = """
+@page { size: A4; margin: 12mm; }
+body { font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial, sans-serif; margin: 0; }
+.page { page-break-after: always; padding: 8mm 0; }
+.grid { display: grid; grid-template-columns: 1fr 1fr; gap: 10mm 8mm; }
+.cell { border: 1px solid #ccc; border-radius: 6px; padding: 4mm; }
+.num { font-weight: 600; color: #555; }
+.cards { display: flex; gap: 2mm; margin: 2mm 0; }
+.card { display: inline-block; width: 18mm; height: 26mm; background-size: contain; background-repeat: no-repeat; }
+img.card { object-fit: contain; }
+.line { border-bottom: 1px dashed #999; height: 10mm; }
+.answers table { width: 100%; border-collapse: collapse; font-size: 10pt; }
+.answers td { border-bottom: 1px solid #eee; padding: 1mm 2mm; }
+footer { text-align: center; color: #888; font-size: 9pt; margin-top: 4mm; }
+"""
+
+def _sprite_css(theme: str, pictures_root: str) -> str:
+    """Each card image once, as a data-URI class the pages refer to."""
+    reg = get_registry(pictures_root)
+    rules = []
+    for code, asset in sorted(reg.themes.get(theme, {}).items()):
+        with open(asset["path"], "rb") as f:
+            b64 = base64.b64encode(f.read()).decode("ascii")
+        rules.append(f".{_card_class(code)}{{background-image:url(data:image/png;base64,{b64})}}")
+    return "\n".join(rules)
+
+def build_book(puzzles: List[Dict[str, Any]], outfile: str, pictures_root: str,
+               theme: str = "classic", per_page: int = 8, answers_per_page: int = 40,
+               title: str = "24-Point Puzzle Book", embed: bool = True,
+               workers: Optional[int] = None) -> str:
+    """Write the book to outfile and return its absolute path."""
+    workers = workers or os.cpu_count() or 1
+    if not embed:
+        pictures_root = os.path.abspath(pictures_root)
+    puzzle_jobs = ((i + 1, items, theme, pictures_root, embed)
+                   for i, items in enumerate(_chunks(puzzles, per_page)))
+    n_pages = (len(puzzles) + per_page - 1) // per_page
+    answer_jobs = ((n_pages + i + 1, items) for i, items in enumerate(_chunks(puzzles, answers_per_page)))
+
+    with open(outfile, "w", encoding="utf-8") as f:
+        f.write(f"<!doctype html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+                f"<title>{html.escape(title)}</title>\n<style>{_CSS}\n")
+        if embed:
+            f.write(_sprite_css(theme, pictures_root))
+        f.write(f"</style>\n</head>\n<body>\n<h1>{html.escape(title)}</h1>\n")
+        for page in _ordered_map(_render_puzzle_page, puzzle_jobs, workers):
+            f.write(page)
+        for page in _ordered_map(_render_answer_page, answer_jobs, workers):
+            f.write(page)
+        f.write("</body>\n</html>\n")
+    return os.path.abspath(outfile)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m game24.book", description="Build a printable puzzle book.")
+    ap.add_argument("answers", help="path to answers.json")
+    ap.add_argument("outfile", help="HTML file to write")
+    ap.add_argument("--level", help="easy | medium | hard")
+    ap.add_argument("--solvable", choices=["yes", "no"], help="only solvable / unsolvable cases")
+    ap.add_argument("--count", type=int, help="number of puzzles")
+    ap.add_argument("--seed", help="shuffle the selection with this seed")
+    ap.add_argument("--theme", default="classic")
+    ap.add_argument("--pictures", default=None, help="card images root (default: next to answers.json)")
+    ap.add_argument("--per-page", type=int, default=8)
+    ap.add_argument("--link-images", action="store_true", help="reference image files instead of embedding")
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args(argv)
+
+    with open(args.answers, encoding="utf-8") as f:
+        puzzles = json.load(f)
+    solvable = None if args.solvable is None else args.solvable == "yes"
+    chosen = select_cases(puzzles, args.level, solvable, args.count, args.seed)
+    pictures = args.pictures or os.path.join(os.path.dirname(args.answers), "assets", "images")
+    out = build_book(chosen, args.outfile, pictures, theme=args.theme, per_page=args.per_page,
+                     embed=not args.link_images, workers=args.workers)
+    print(f"wrote {len(chosen)} puzzles to {out}")
+
+if __name__ == "__main__":
+    main()
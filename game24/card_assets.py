@@ -1,16 +1,81 @@
 # game24/card_assets.py
 import random
-import os, html
-from typing import List, Dict, Any
-import os
-_warned_missing = set()
+import os, html, hashlib
+from typing import List, Dict, Any, Optional
 
 SUITS = ["S", "H", "D", "C"]  # Spades, Hearts, Diamonds, Clubs
 VALUE_TO_RANK = {1:"A", 11:"J", 12:"Q", 13:"K"}
+# every theme ships both 10X and TX (the web UI uses T)
+EXPECTED_RANKS = ["A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "T", "J", "Q", "K"]
+EXPECTED_CODES = frozenset(f"{r}{s}" for r in EXPECTED_RANKS for s in SUITS)
 
 def value_to_rank(v: int) -> str:
     return VALUE_TO_RANK.get(int(v), str(int(v)))
 
+class CardAssetRegistry:
+    """
+    Scans <root>/<theme>/*.png once and keeps an in-memory manifest
+    theme -> code -> {"code", "path", "url", "size", "hash"}.
+    After scan(), resolving a card is a dict lookup; nothing touches the disk.
+    """
+    def __init__(self, root: str, url_prefix: Optional[str] = None):
+        self.root = root
+        self.url_prefix = url_prefix
+        self.themes: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def scan(self) -> "CardAssetRegistry":
+        themes = {}
+        if os.path.isdir(self.root):
+            for theme in sorted(os.listdir(self.root)):
+                tdir = os.path.join(self.root, theme)
+                if not os.path.isdir(tdir):
+                    continue
+                entries = {}
+                for name in os.listdir(tdir):
+                    code, ext = os.path.splitext(name)
+                    if ext.lower() != ".png":
+                        continue
+                    path = os.path.join(tdir, name)
+                    with open(path, "rb") as f:
+                        digest = hashlib.sha256(f.read()).hexdigest()
+                    entries[code] = {
+                        "code": code,
+                        "path": f"{self.root}/{theme}/{name}",
+                        "url": f"{self.url_prefix}/{theme}/{name}" if self.url_prefix else None,
+                        "size": os.path.getsize(path),
+                        "hash": digest,
+                    }
+                themes[theme] = entries
+        self.themes = themes
+        return self
+
+    def missing(self, theme: str) -> List[str]:
+        have = self.themes.get(theme, {})
+        return sorted(EXPECTED_CODES - have.keys())
+
+    def validate(self) -> Dict[str, List[str]]:
+        """theme -> missing codes, only for incomplete themes."""
+        return {t: m for t in self.themes for m in [self.missing(t)] if m}
+
+    def has_theme(self, theme: str) -> bool:
+        return theme in self.themes
+
+    def resolve(self, theme: str, code: str) -> Optional[Dict[str, Any]]:
+        return self.themes.get(theme, {}).get(code)
+
+_registries: Dict[str, CardAssetRegistry] = {}
+_warned_missing = set()
+
+def get_registry(pictures_root: str = "pictures") -> CardAssetRegistry:
+    """One scanned registry per pictures_root, built on first use."""
+    reg = _registries.get(pictures_root)
+    if reg is None:
+        reg = CardAssetRegistry(pictures_root).scan()
+        for theme, codes in reg.validate().items():
+            print(f"[warn] theme '{theme}' is missing {len(codes)} images: {', '.join(codes[:8])}")
+        _registries[pictures_root] = reg
+    return reg
+
 def pick_card_images(
     values: List[int],
     theme: str = "classic",
@@ -26,6 +91,10 @@ def pick_card_images(
     - If False, will try to avoid reusing the same suit until it runs out.
     """
     r = rng or random
+    reg = get_registry(pictures_root)
+    if not reg.has_theme(theme) and (pictures_root, theme) not in _warned_missing:
+        print(f"[warn] missing theme: {pictures_root}/{theme}")
+        _warned_missing.add((pictures_root, theme))
     result: List[Dict[str, Any]] = []
     pool = SUITS.copy()
 
@@ -41,10 +110,8 @@ def pick_card_images(
             pool.remove(suit)
 
         code = f"{rank}{suit}"
-        path = f"{pictures_root}/{theme}/{code}.png"
-        if not os.path.exists(path) and path not in _warned_missing:
-            print(f"[warn] missing image: {path}")
-            _warned_missing.add(path)
+        asset = reg.resolve(theme, code)
+        path = asset["path"] if asset else f"{pictures_root}/{theme}/{code}.png"
         result.append({"value": int(v), "rank": rank, "suit": suit, "code": code, "path": path})
     return result
 
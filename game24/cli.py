@@ -0,0 +1,248 @@
+# game24/cli.py
+"""
+Command-line 24-point game, no web stack needed.
+
+    python -m game24 play [--level easy] [--variant nopow] [--answers web/static/answers.json]
+    python -m game24 variant sqrtfact --workers 8     # solve + cache a rule variant's catalog
+    python -m game24 classify puzzles.jsonl -o out.jsonl --workers 4
+    python -m game24 verify   puzzles.jsonl            # stdout
+    cat puzzles.jsonl | python -m game24 score -       # stdin
+
+Batch commands read one puzzle per line ({"case_id", "cards", "solutions", ...};
+a bare card list like [3, 3, 8, 8] also works) and write one JSON result per
+line, in input order. Lines are processed in chunks on a process pool with a
+bounded number of chunks in flight, so memory stays flat on any input size.
+Bad lines produce {"line": n, "error": ...} and do not stop the run.
+"""
+import argparse, json, os, random, re, sys
+from itertools import islice
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+
+from .book import _ordered_map
+from .card_utils import get_values, get_ranks_for_display
+from .complexity import preprocess_ranks, score_complexity, SIMPLE_THRESHOLD, HARD_THRESHOLD
+from .picker import QuestionPicker
+from .safety_eval import safe_eval_bounded, UnsafeExpression
+from . import solver
+
+TARGET = 24
+TOLERANCE = 1e-6
+CHUNK_LINES = 256
+DEFAULT_ANSWERS = Path(__file__).resolve().parent.parent / "web" / "static" / "answers.json"
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+# ---------- checking one expression ----------
+def numbers_used(expr: str) -> List[int]:
+    return sorted(int(float(n)) for n in _NUMBER_RE.findall(preprocess_ranks(expr)))
+
+def check_expression(expr: str, values: List[int], target: int = TARGET) -> Dict[str, Any]:
+    """{'ok': bool, 'value': float | None, 'error': str | None}; ok means = target using exactly the cards."""
+    if numbers_used(expr) != sorted(values):
+        return {"ok": False, "value": None, "error": "must use each card exactly once"}
+    try:
+        value = safe_eval_bounded(preprocess_ranks(expr))
+    except (UnsafeExpression, ZeroDivisionError, OverflowError) as e:
+        return {"ok": False, "value": None, "error": str(e) or "division by zero"}
+    if abs(value - target) >= TOLERANCE:
+        return {"ok": False, "value": value, "error": f"evaluates to {value:g}"}
+    return {"ok": True, "value": value, "error": None}
+
+# ---------- batch operations (one puzzle dict in, one result dict out) ----------
+def _base(p: Dict[str, Any]) -> Dict[str, Any]:
+    return {"case_id": p.get("case_id"), "cards": get_values(p)}
+
+def op_score(p: Dict[str, Any]) -> Dict[str, Any]:
+    scores = [score_complexity(s) for s in p.get("solutions") or []]
+    return {**_base(p), "scores": scores,
+            "min": min(scores) if scores else None, "max": max(scores) if scores else None}
+
+def op_verify(p: Dict[str, Any]) -> Dict[str, Any]:
+    values = get_values(p)
+    bad = []
+    for s in p.get("solutions") or []:
+        res = check_expression(s, values)
+        if not res["ok"]:
+            bad.append({"solution": s, "error": res["error"]})
+    n = len(p.get("solutions") or [])
+    return {**_base(p), "ok": not bad, "checked": n, "bad": bad}
+
+def op_classify(p: Dict[str, Any]) -> Dict[str, Any]:
+    """Level from the solutions' complexity, same thresholds the web pools use."""
+    scored = op_score(p)
+    if scored["min"] is None:
+        level = "nosol"
+    elif scored["min"] <= SIMPLE_THRESHOLD:
+        level = "easy"
+    elif scored["max"] >= HARD_THRESHOLD:
+        level = "hard"
+    else:
+        level = "medium"
+    return {**_base(p), "solvable": scored["min"] is not None,
+            "has_simple": scored["min"] is not None and scored["min"] <= SIMPLE_THRESHOLD,
+            "has_hard": scored["max"] is not None and scored["max"] >= HARD_THRESHOLD,
+            "level": level, "given_level": p.get("level")}
+
+OPS = {"classify": op_classify, "verify": op_verify, "score": op_score}
+
+def _parse_line(line: str) -> Dict[str, Any]:
+    obj = json.loads(line)
+    if isinstance(obj, list):
+        return {"cards": obj}
+    if not isinstance(obj, dict):
+        raise ValueError("expected an object or a card list")
+    return obj
+
+def _run_chunk(job) -> List[str]:
+    """Worker side: raw lines in, serialized result lines out."""
+    op_name, first_no, lines = job
+    op = OPS[op_name]
+    out = []
+    for no, line in enumerate(lines, first_no):
+        if not line.strip():
+            continue
+        try:
+            res = op(_parse_line(line))
+        except Exception as e:
+            res = {"line": no, "error": f"{type(e).__name__}: {e}"}
+        out.append(json.dumps(res, separators=(",", ":")))
+    return out
+
+def _chunks(lines: Iterable[str], op_name: str, size: int) -> Iterator[tuple]:
+    no = 1
+    it = iter(lines)
+    while True:
+        raw = list(islice(it, size))
+        if not raw:
+            return
+        yield (op_name, no, raw)
+        no += len(raw)
+
+def run_batch(op_name: str, infile, outfile, workers: int = 1, chunk: int = CHUNK_LINES) -> Dict[str, int]:
+    counts = {"lines": 0, "errors": 0}
+    for lines in _ordered_map(_run_chunk, _chunks(infile, op_name, chunk), workers):
+        for line in lines:
+            counts["lines"] += 1
+            if line.startswith('{"line":'):
+                counts["errors"] += 1
+            outfile.write(line + "\n")
+    return counts
+
+# ---------- interactive play ----------
+_PLAY_HELP = """enter an expression using all four cards (A=1, T=10, J=11, Q=12, K=13, ^ for power)
+  n     no solution        h  hint        s  skip
+  l X   level easy|medium|hard|challenge   q  quit"""
+
+def _simplest(p: Dict[str, Any]) -> Optional[str]:
+    sols = p.get("solutions") or []
+    return min(sols, key=lambda s: (score_complexity(s), len(s))) if sols else None
+
+def play(puzzles: List[Dict[str, Any]], level: str = "easy", inp=input, out=print,
+         rules: Optional["solver.Rules"] = None) -> Dict[str, int]:
+    picker = QuestionPicker(puzzles)
+    score = {"played": 0, "solved": 0}
+    out(_PLAY_HELP)
+    while True:
+        try:
+            p = picker.pick(level)
+        except TypeError:   # picker ran out of non-recent cases
+            p = None
+        if not p:
+            p = random.choice(puzzles)
+        score["played"] += 1
+        values = get_values(p)
+        out(f"\n#{p.get('case_id')}  [{level}]   " + "  ".join(get_ranks_for_display(p)))
+        while True:
+            try:
+                cmd = inp("> ").strip()
+            except EOFError:
+                cmd = "q"
+            if cmd == "q":
+                out(f"solved {score['solved']} of {score['played']}")
+                return score
+            if cmd == "s":
+                break
+            if cmd == "h":
+                sol = _simplest(p)
+                out(f"hint: {sol}" if sol else "hint: maybe there is no solution...")
+                continue
+            if cmd.startswith("l "):
+                level = cmd[2:].strip().lower() or level
+                out(f"level set to {level} (from the next hand)")
+                continue
+            if cmd == "n":
+                if p.get("solutions"):
+                    out("there is one - try again, or h for a hint")
+                    continue
+                out("correct, no solution!")
+                score["solved"] += 1
+                break
+            if not cmd or cmd == "?":
+                out(_PLAY_HELP)
+                continue
+            if rules is None:
+                res = check_expression(cmd, values)
+            else:
+                ok, _, reason = solver.check(cmd, values, rules)
+                res = {"ok": ok, "error": reason}
+            if res["ok"]:
+                out("correct!")
+                score["solved"] += 1
+                break
+            out(f"not quite: {res['error']}")
+
+# ---------- entry point ----------
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m game24", description="24-point game: play or batch-process puzzles.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p_play = sub.add_parser("play", help="interactive game in the terminal")
+    p_play.add_argument("--answers", default=str(DEFAULT_ANSWERS), help="path to answers.json")
+    p_play.add_argument("--level", default="easy", help="easy | medium | hard | challenge")
+    p_play.add_argument("--variant", default="classic", choices=sorted(solver.VARIANTS))
+
+    p_var = sub.add_parser("variant", help="solve every hand under a rule variant and cache the catalog")
+    p_var.add_argument("name", choices=sorted(solver.VARIANTS))
+    p_var.add_argument("--answers", default=str(DEFAULT_ANSWERS), help="hands (and case ids) to solve")
+    p_var.add_argument("--cache-dir", default=None, help=f"default: {solver.CACHE_DIR}")
+    p_var.add_argument("--workers", type=int, default=None)
+
+    for name, desc in (("classify", "suggest a level from solution complexity"),
+                       ("verify", "check every solution hits 24 using exactly the cards"),
+                       ("score", "complexity score of each solution")):
+        p = sub.add_parser(name, help=desc)
+        p.add_argument("infile", help="JSONL puzzles, - for stdin")
+        p.add_argument("-o", "--out", default="-", help="JSONL results, - for stdout (default)")
+        p.add_argument("--workers", type=int, default=None)
+        p.add_argument("--chunk", type=int, default=CHUNK_LINES, help="lines per worker task")
+    args = ap.parse_args(argv)
+
+    if args.cmd in ("play", "variant"):
+        with open(args.answers, encoding="utf-8") as f:
+            puzzles = json.load(f)
+        hands = [(int(p["case_id"]), list(p["cards"])) for p in puzzles]
+        if args.cmd == "variant":
+            rules = solver.get_rules(args.name)
+            path = solver.load_or_build(hands, rules, args.cache_dir, workers=args.workers or os.cpu_count() or 1)
+            print(f"{rules.name}: {path}")
+            return 0
+        rules = None
+        if args.variant != "classic":
+            rules = solver.get_rules(args.variant)
+            with open(solver.load_or_build(hands, rules, workers=os.cpu_count() or 1), encoding="utf-8") as f:
+                puzzles = json.load(f)
+        play(puzzles, args.level, rules=rules)
+        return 0
+
+    workers = args.workers or os.cpu_count() or 1
+    fin = sys.stdin if args.infile == "-" else open(args.infile, encoding="utf-8")
+    fout = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    try:
+        counts = run_batch(args.cmd, fin, fout, workers=workers, chunk=args.chunk)
+    finally:
+        if fin is not sys.stdin:
+            fin.close()
+        if fout is not sys.stdout:
+            fout.close()
+    print(f"{args.cmd}: {counts['lines']} lines, {counts['errors']} errors", file=sys.stderr)
+    return 1 if counts["errors"] else 0
@@ -0,0 +1,233 @@
+# game24/exprparse.py
+"""
+Small-grammar parser for answers and solutions.
+
+    expr  := numbers, names (A T J Q K, sqrt(...)), + - * / x, ^ or **, unary -/+,
+             postfix ! and parentheses
+
+One regex findall feeds a single loop over the tokens (Pratt binding powers
+on an explicit operator stack) that appends nodes to a flat list in
+post-order (children before parents, root last), so consumers walk the
+result with a plain loop instead of recursion. Errors carry the column.
+
+    tree = parse("(8 - 2) * 4")
+    evaluate(tree)                 -> 24.0
+    tree.ops(), tree.height()      -> used by complexity scoring
+"""
+import math, re
+from typing import Callable, Dict, List, Optional
+
+# node kinds
+NUM, NAME, NEG, POS, BIN, CALL = range(6)
+
+class ParseError(ValueError):
+    def __init__(self, msg: str, pos: int):
+        super().__init__(f"{msg} at column {pos + 1}")
+        self.pos = pos
+
+_TOKEN_RE = re.compile(r"\d+\.?\d*|\.\d+|\*\*|[xX](?![A-Za-z_])|[A-Za-z_]\w*|\S")
+
+# binary operator -> (left binding power, canonical op); ** and ^ are right-associative
+_BINARY = {'+': (10, '+'), '-': (10, '-'), '*': (20, '*'), '/': (20, '/'), 'x': (20, '*'), 'X': (20, '*'),
+           '**': (40, '**'), '^': (40, '**')}
+_UNARY_BP = 30      # -2**2 == -(2**2), 2*-3 ok, like Python
+_POSTFIX_BP = 50    # 3! binds tightest
+
+class Expr:
+    """
+    Parsed expression: `nodes` is a post-order list of (kind, val, lhs, rhs, tok)
+    tuples, root last. val is the number, name or canonical operator; lhs/rhs
+    are child indices (-1 if none); tok indexes the token, for error columns.
+    """
+    __slots__ = ('src', 'nodes', '_toks')
+
+    def __init__(self, src: str, nodes: list, toks: list):
+        self.src = src
+        self.nodes = nodes
+        self._toks = toks
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def col(self, i: int) -> int:
+        """0-based column of node i's token."""
+        return _column(self.src, self.nodes[i][4])
+
+    def ops(self) -> Dict[str, int]:
+        """Binary operator counts, e.g. {'+': 2, '/': 1}."""
+        out: Dict[str, int] = {}
+        for k, v, _, _, _ in self.nodes:
+            if k == BIN:
+                out[v] = out.get(v, 0) + 1
+        return out
+
+    def height(self) -> int:
+        """Depth as ast.parse(mode='eval') would measure it (Expression root, operator nodes included)."""
+        h = []
+        for k, _, l, r, _ in self.nodes:
+            if k == BIN:
+                a, b = h[l], h[r]
+                h.append(1 + (a if a > b else b))
+            elif k == NEG or k == POS:
+                h.append(1 + h[l])
+            elif k == CALL:
+                h.append(max(2, 1 + h[l]))      # Call -> Name -> Load
+            else:
+                h.append(1 if k == NAME else 0)  # Name -> Load
+        return 1 + h[-1] if h else 0
+
+    def ast_size(self) -> int:
+        """Node count as ast.walk would report it, so existing size limits keep their meaning."""
+        size = 1
+        for k, _, _, _, _ in self.nodes:
+            size += 1 if k == NUM else 3 if k == CALL else 2
+        return size
+
+    def names(self) -> List[str]:
+        return [v for k, v, _, _, _ in self.nodes if k == NAME or k == CALL]
+
+def _column(src: str, tok: int) -> int:
+    for i, m in enumerate(_TOKEN_RE.finditer(src)):
+        if i == tok:
+            return m.start()
+    return len(src.rstrip()) if tok else 0
+
+_CALL_PAREN = 2     # parser state: swallow the '(' after f
+
+def parse(src: str) -> Expr:
+    """
+    Parse src in one pass; raises ParseError with the offending column.
+
+    Binding powers as a Pratt parser would use them, driven by an explicit
+    operator stack instead of recursion: each token is looked at once and
+    every reduction appends one node.
+    """
+    toks = _TOKEN_RE.findall(src)   # one C call; columns are recovered only on error
+    nodes: list = []
+    add = nodes.append
+    vals: List[int] = []            # node index of each pending operand
+    stack: list = []                # (bp, kind, val, tok); '(' and f( have bp 0
+    binary = _BINARY
+    want_operand = True
+    fail = _fail
+    i = -1
+    for t in toks:
+        i += 1
+        if want_operand:
+            if want_operand is _CALL_PAREN:  # the '(' after a function name
+                want_operand = True
+                continue
+            c = t[0]
+            if c in '0123456789.':
+                try:
+                    add((NUM, float(t) if '.' in t else int(t), -1, -1, i))
+                except ValueError:
+                    fail(src, f"unexpected {t!r}", i)
+                vals.append(len(nodes) - 1)
+                want_operand = False
+            elif t == '(':
+                stack.append((0, None, '(', i))
+            elif t == '-':
+                stack.append((_UNARY_BP, NEG, '-', i))
+            elif t == '+':
+                stack.append((_UNARY_BP, POS, '+', i))
+            elif (c.isalpha() or c == '_') and t not in binary:
+                if i + 1 < len(toks) and toks[i + 1] == '(':
+                    stack.append((0, CALL, t, i))
+                    want_operand = _CALL_PAREN
+                else:
+                    add((NAME, t, -1, -1, i))
+                    vals.append(len(nodes) - 1)
+                    want_operand = False
+            else:
+                fail(src, f"unexpected {t!r}", i)
+            continue
+        b = binary.get(t)
+        if b is not None:
+            lbp = b[0]
+            if lbp == 40:   # right-associative
+                while stack and stack[-1][0] > 40:
+                    _reduce(stack, vals, add, nodes)
+            else:
+                while stack and stack[-1][0] >= lbp:
+                    _reduce(stack, vals, add, nodes)
+            stack.append((lbp, BIN, b[1], i))
+            want_operand = True
+        elif t == ')':
+            while stack and stack[-1][0]:
+                _reduce(stack, vals, add, nodes)
+            if not stack:
+                fail(src, "unexpected ')'", i)
+            _, kind, name, tok = stack.pop()
+            if kind == CALL:
+                add((CALL, name, vals[-1], -1, tok))
+                vals[-1] = len(nodes) - 1
+        elif t == '!':
+            add((CALL, 'fact', vals[-1], -1, i))
+            vals[-1] = len(nodes) - 1
+        elif t == '(':
+            fail(src, "unexpected '('", i)
+        else:
+            fail(src, f"expected an operator before {t!r}", i)
+    if want_operand:
+        fail(src, "unexpected end of expression", i + 1)
+    while stack:
+        if not stack[-1][0]:
+            fail(src, "unclosed '('", stack[-1][3] + (stack[-1][1] == CALL))
+        _reduce(stack, vals, add, nodes)
+    return Expr(src, nodes, toks)
+
+def _reduce(stack, vals, add, nodes):
+    _, kind, op, tok = stack.pop()
+    if kind == BIN:
+        r = vals.pop()
+        add((BIN, op, vals[-1], r, tok))
+    else:
+        add((kind, op, vals[-1], -1, tok))
+    vals[-1] = len(nodes) - 1
+
+def _fail(src: str, msg: str, tok: int):
+    raise ParseError(msg, _column(src, tok))
+
+def evaluate(tree: Expr, names: Optional[Dict[str, float]] = None,
+             funcs: Optional[Dict[str, Callable[[float], float]]] = None,
+             binary: Optional[Dict[str, Callable[[float, float], float]]] = None,
+             check: Optional[Callable[[int, float], float]] = None) -> float:
+    """
+    Float value of tree. names / funcs are the only identifiers allowed.
+    binary overrides operator functions (e.g. a bounded power); check(i, value)
+    sees every node result and may raise or adjust it.
+    """
+    names = names or {}
+    funcs = funcs or {}
+    ops = _FLOAT_OPS if binary is None else {**_FLOAT_OPS, **binary}
+    out: List[float] = []
+    push = out.append
+    for i, (k, val, l, r, _) in enumerate(tree.nodes):
+        if k == NUM:
+            v = float(val)
+        elif k == BIN:
+            v = ops[val](out[l], out[r])
+        elif k == NEG:
+            v = -out[l]
+        elif k == POS:
+            v = out[l]
+        elif k == NAME:
+            if val not in names:
+                raise ParseError(f"unknown name {val!r}", tree.col(i))
+            v = float(names[val])
+        else:
+            fn = funcs.get(val)
+            if fn is None:
+                raise ParseError(f"{val}() is not allowed", tree.col(i))
+            v = fn(out[l])
+        push(check(i, v) if check is not None else v)
+    return out[-1]
+
+_FLOAT_OPS = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': lambda a, b: a / b,
+    '**': lambda a, b: math.pow(a, b),
+}
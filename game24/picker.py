@@ -1,10 +1,12 @@
-import random
+import logging, random
 from collections import deque, Counter
 from typing import List, Dict, Any, Optional, Tuple
 
 from .card_utils import get_values
 from .complexity import score_complexity, SIMPLE_THRESHOLD, HARD_THRESHOLD
 
+log = logging.getLogger(__name__)
+
 def has_solution(p: Dict[str, Any]) -> bool:
     return bool(p.get("solutions"))
 
@@ -53,15 +55,15 @@ class QuestionPicker:
         random.shuffle(pool)
         for it in pool:
             if self._not_recent(it[2]):
-                print(f"find not recent used cards {str(it)} in _pick_from")
+                log.debug("find not recent used cards %s in _pick_from", it[2])
                 return self._serve(it)
-        print(f"find not recent used cards NONE--0 in _pick_from")
+        log.debug("find not recent used cards NONE--0 in _pick_from")
         return None
 
     def pick(self, level="easy"):
         """Select a puzzle matching the requested difficulty level """
 
-        print(f"inside pick, Picker request level={level}")
+        log.debug("inside pick, Picker request level=%s", level)
 
         level = level.lower()
         easy_pool = []
@@ -91,22 +93,22 @@ class QuestionPicker:
                 #if unique_vals:
                 hard_pool.append((p, vals, key))
 
-        print(f"loaded games: {len(no_sol_pool)},{len(easy_pool)}, {len(med_pool)}, {len(hard_pool)}, total: {len(no_sol_pool) + len(easy_pool) +len(med_pool) + len(hard_pool)}")
+        log.debug("loaded games: %d,%d, %d, %d", len(no_sol_pool), len(easy_pool), len(med_pool), len(hard_pool))
         #print(f"after load, hard pool len={len(easy_pool)}; {len(med_pool)}; {len(hard_pool)}")
         if level in ("challenge","4"):
-            print("Q picked from no_sol pool")
+            log.debug("Q picked from no_sol pool")
             pool = [it for it in no_sol_pool if self._not_recent(it[2])]
             chosen = self._pick_from(pool)
             return {**chosen, "level": "challenge", "difficulty": "challenge"}
 
         if level in ("easy","1"):
-            print("Q picked from easy pool")
+            log.debug("Q picked from easy pool")
             pool = [it for it in (easy_pool + med_pool_with_simple) if self._not_recent(it[2])]
             chosen = self._pick_from(pool)
             return {**chosen, "level": "easy", "difficulty": "easy"}
 
         if level in ("medium","2"):
-            print("Q picked from medium pool")
+            log.debug("Q picked from medium pool")
             need_ratio = self.no_sol_served / self.total_served if self.total_served else 0.0
             allow_no_sol = need_ratio < self.medium_no_sol_target
             med_only = [it for it in med_pool if has_solution(it[0])]
@@ -116,9 +118,9 @@ class QuestionPicker:
             return self._pick_from(candidates)
 
         if level in ("hard","3"):
-            print(f"hard pool len={len(hard_pool)}")
+            log.debug("hard pool len=%d", len(hard_pool))
             hard_like = hard_pool + [it for it in med_pool_with_hard if all_values_unique(it[1])]
-            print(f"Q picked from hard_like pool {len(hard_like)}")
+            log.debug("Q picked from hard_like pool %d", len(hard_like))
             #hard_like = hard_pool 
             if not hard_like:
                 hard_like = med_pool_with_hard
@@ -126,13 +128,13 @@ class QuestionPicker:
             chosen = self._pick_from(hard_like)
             return {**chosen, "level": "hard", "difficulty": "hard"}
 
-        print("Q picked None")
+        log.debug("Q picked None")
         return None
 
     def pre_process_pool(PUZZLE):
         """sort out pools by level """
 
-        print(f"inside pre_process_pool, sort out pools")
+        log.debug("inside pre_process_pool, sort out pools")
 
         easy_pool = []
         med_pool_with_simple = []
@@ -163,7 +165,8 @@ class QuestionPicker:
 
         #finalize pools
 
-        print(f"loaded original games: {len(no_sol_pool)},{len(easy_pool)}, {len(med_pool)}, {len(hard_pool)}, total: {len(no_sol_pool) + len(easy_pool) +len(med_pool) + len(hard_pool)}")
+        log.debug("loaded original games: %d,%d, %d, %d, total: %d", len(no_sol_pool), len(easy_pool), len(med_pool),
+                  len(hard_pool), len(no_sol_pool) + len(easy_pool) + len(med_pool) + len(hard_pool))
         easy_pool = easy_pool + med_pool_with_simple
         hard_pool = hard_pool + med_pool_with_hard
         return [no_sol_pool, easy_pool + med_pool_with_simple, med_pool, hard_pool + med_pool_with_hard]
@@ -0,0 +1,343 @@
+# game24/solver.py
+"""
+Rule-variant solver and evaluator.
+
+A Rules object names the operator set (binary ops, unary ops, concatenation
+of digit cards) and the magnitude bounds. The same object drives
+
+  - solve(values, rules)       exact search over rationals
+  - evaluate(expr, rules)      checking a player's answer
+  - load_or_build(...)         a solved catalog for every hand, cached on disk
+
+Search prunes equivalent subresults: a multiset of intermediate values is
+expanded once, however many expression orders reach it, and commutative ops
+are tried in one order only.
+"""
+import hashlib, json, math, os, tempfile
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from . import exprparse
+from .complexity import preprocess_ranks, score_complexity, SIMPLE_THRESHOLD, HARD_THRESHOLD
+from .safety_eval import UnsafeExpression, MAX_EXPR_LEN, MAX_AST_NODES, MAX_EXPONENT_ABS
+
+try:
+    import fcntl
+except ImportError:     # not on Windows: concurrent builders just both solve
+    fcntl = None
+
+TARGET = 24
+MAX_SOLUTIONS = 30
+SOLVER_VERSION = 1   # bump when search or formatting changes; invalidates cached catalogs
+CACHE_DIR = Path(os.environ.get('PUZZLEBOOK_VARIANT_CACHE') or Path(tempfile.gettempdir()) / 'puzzlebook-variants')
+
+# ---------- operators ----------
+# binary: symbol -> (precedence, commutative); '**' is right-associative
+BINARY = {'+': (0, True), '-': (0, False), '*': (1, True), '/': (1, False), '**': (2, False)}
+ATOM = 3
+MAX_FACT = 6   # 6! = 720 is the largest factorial worth trying for 24
+
+# Rationals are (numerator, denominator) int pairs in lowest terms, denominator > 0;
+# several times cheaper than Fraction in the inner loop.
+Q = Tuple[int, int]
+
+def _q(n: int, d: int) -> Q:
+    if d < 0:
+        n, d = -n, -d
+    g = math.gcd(n, d)
+    return (n // g, d // g)
+
+def _pow(a: Q, b: Q, max_abs) -> Optional[Q]:
+    (an, ad), (e, bd) = a, b
+    if bd != 1 or abs(e) > MAX_EXPONENT_ABS or (an == 0 and e < 0):
+        return None
+    if an != 0 and abs(e) * math.log10(abs(an) / ad) > math.log10(max_abs):
+        return None
+    return _q(an ** e, ad ** e) if e >= 0 else _q(ad ** -e, an ** -e)
+
+def _apply(op: str, a: Q, b: Q, max_abs) -> Optional[Q]:
+    (an, ad), (bn, bd) = a, b
+    if op == '+': r = _q(an * bd + bn * ad, ad * bd)
+    elif op == '-': r = _q(an * bd - bn * ad, ad * bd)
+    elif op == '*': r = _q(an * bn, ad * bd)
+    elif op == '/':
+        if not bn:
+            return None
+        r = _q(an * bd, ad * bn)
+    else:
+        r = _pow(a, b, max_abs)
+        if r is None:
+            return None
+    return r if abs(r[0]) <= max_abs * r[1] else None
+
+def _sqrt(x: Q) -> Optional[Q]:
+    if x[0] < 0:
+        return None
+    n, d = math.isqrt(x[0]), math.isqrt(x[1])
+    return (n, d) if n * n == x[0] and d * d == x[1] else None
+
+def _fact(x: Q) -> Optional[Q]:
+    if x[1] != 1 or not 0 <= x[0] <= MAX_FACT:
+        return None
+    return (math.factorial(x[0]), 1)
+
+# unary: name -> exact function (None when not applicable); identity results are skipped
+UNARY = {'sqrt': _sqrt, 'fact': _fact}
+
+class Rules:
+    """One game variant. Immutable; `fingerprint` keys the on-disk catalog cache."""
+    __slots__ = ('name', 'title', 'binary', 'unary', 'concat', 'max_abs')
+
+    def __init__(self, name: str, title: str, binary: Iterable[str] = ('+', '-', '*', '/', '**'),
+                 unary: Iterable[str] = (), concat: bool = False, max_abs: float = 1e6):
+        unknown = [o for o in binary if o not in BINARY] + [u for u in unary if u not in UNARY]
+        if unknown:
+            raise ValueError(f"unknown operators: {unknown}")
+        self.name = name
+        self.title = title
+        self.binary = tuple(binary)
+        self.unary = tuple(unary)
+        self.concat = bool(concat)
+        self.max_abs = max_abs
+
+    @property
+    def fingerprint(self) -> str:
+        return f"{SOLVER_VERSION}|{','.join(self.binary)}|{','.join(self.unary)}|{int(self.concat)}|{self.max_abs:g}"
+
+    def describe(self) -> Dict[str, Any]:
+        return {'name': self.name, 'title': self.title, 'ops': list(self.binary),
+                'unary': list(self.unary), 'concat': self.concat}
+
+VARIANTS: Dict[str, Rules] = {}
+
+def register(rules: Rules) -> Rules:
+    VARIANTS[rules.name] = rules
+    return rules
+
+CLASSIC = register(Rules('classic', 'Classic (+ - * / ^)'))
+register(Rules('nopow', 'No powers (+ - * /)', binary=('+', '-', '*', '/')))
+register(Rules('sqrtfact', 'Square roots and factorials', unary=('sqrt', 'fact')))
+register(Rules('concat', 'Join cards into numbers', binary=('+', '-', '*', '/'), concat=True))
+
+def get_rules(name: Optional[str]) -> Rules:
+    rules = VARIANTS.get((name or 'classic').strip().lower())
+    if rules is None:
+        raise KeyError(f"unknown variant: {name}")
+    return rules
+
+# ---------- search ----------
+# (value, node, precedence); node is a literal str, (op, a, b) or (unary_name, a).
+# Text is only built for solutions, not for every intermediate.
+Item = Tuple[Q, Any, int]
+
+def _fmt(item: Item) -> str:
+    node = item[1]
+    if isinstance(node, str):
+        return node
+    if len(node) == 2:
+        return f"{node[0]}({_fmt(node[1])})"
+    op, a, b = node
+    p = BINARY[op][0]
+    if op == '**':
+        left, right = a[2] <= p, b[2] < p
+    else:
+        left, right = a[2] < p, b[2] < p or (b[2] == p and not BINARY[op][1])
+    sa, sb = _fmt(a), _fmt(b)
+    return f"{f'({sa})' if left else sa} {op} {f'({sb})' if right else sb}"
+
+def _with_unary(item: Item, rules: Rules) -> List[Item]:
+    out = [item]
+    for name in rules.unary:
+        r = UNARY[name](item[0])
+        if r is not None and r != item[0] and abs(r[0]) <= rules.max_abs * r[1]:
+            out.append((r, (name, item), ATOM))
+    return out
+
+def _starts(values: List[int], rules: Rules) -> List[Tuple[int, ...]]:
+    """Leaf multisets: the cards, plus digit cards joined into two-digit numbers."""
+    seen = {tuple(sorted(values))}
+    frontier = list(seen)
+    while rules.concat and frontier:
+        nxt = []
+        for leaves in frontier:
+            for i, a in enumerate(leaves):
+                for j, b in enumerate(leaves):
+                    if i == j or not (1 <= a <= 9 and 1 <= b <= 9):
+                        continue
+                    rest = [v for k, v in enumerate(leaves) if k not in (i, j)]
+                    cand = tuple(sorted(rest + [10 * a + b]))
+                    if cand not in seen:
+                        seen.add(cand)
+                        nxt.append(cand)
+        frontier = nxt
+    return sorted(seen)
+
+def solve(values: List[int], rules: Rules = CLASSIC, target: int = TARGET,
+          max_solutions: int = MAX_SOLUTIONS) -> List[str]:
+    """Distinct solution expressions (at most max_solutions), simplest first."""
+    goal = (target, 1)
+    found: Dict[str, None] = {}
+    seen = set()
+
+    def search(items: List[Item]):
+        if len(found) >= max_solutions:
+            return
+        key = tuple(sorted(it[0] for it in items))
+        if key in seen:
+            return
+        seen.add(key)
+        n = len(items)
+        for i in range(n):
+            for j in range(n):
+                if i == j:
+                    continue
+                a, b = items[i], items[j]
+                rest = [items[k] for k in range(n) if k not in (i, j)]
+                for op in rules.binary:
+                    if BINARY[op][1] and i > j:
+                        continue
+                    r = _apply(op, a[0], b[0], rules.max_abs)
+                    if r is None:
+                        continue
+                    for res in _with_unary((r, (op, a, b), BINARY[op][0]), rules):
+                        if rest:
+                            search(rest + [res])
+                        elif res[0] == goal:
+                            found.setdefault(_fmt(res))
+
+    def leaves(vals, acc):
+        if not vals:
+            search(acc)
+            return
+        for it in _with_unary(((vals[0], 1), str(vals[0]), ATOM), rules):
+            leaves(vals[1:], acc + [it])
+
+    for start in _starts(values, rules):
+        leaves(list(start), [])
+    return sorted(found, key=lambda s: (score_complexity(s), len(s)))
+
+def level_for(solutions: List[str]) -> str:
+    """Difficulty of a solved hand from its simplest solution."""
+    if not solutions:
+        return 'challenge'
+    best = min(score_complexity(s) for s in solutions)
+    if best <= SIMPLE_THRESHOLD:
+        return 'easy'
+    if best >= HARD_THRESHOLD:
+        return 'hard'
+    return 'medium'
+
+# ---------- evaluating answers ----------
+def evaluate(expr: str, rules: Rules) -> Tuple[float, List[int]]:
+    """(value, integer literals used) under rules; raises UnsafeExpression."""
+    if len(expr) > MAX_EXPR_LEN:
+        raise UnsafeExpression("Expression too long.")
+    try:
+        tree = exprparse.parse(preprocess_ranks(expr))
+    except exprparse.ParseError as e:
+        raise UnsafeExpression(f"Invalid expression: {e}")
+    if tree.ast_size() > MAX_AST_NODES:
+        raise UnsafeExpression("Expression too complex.")
+    literals: List[int] = []
+    out: List[Q] = []
+    for k, val, l, r, _ in tree.nodes:
+        if k == exprparse.NUM:
+            if not isinstance(val, int):
+                raise UnsafeExpression("Only whole numbers allowed.")
+            literals.append(val)
+            v = (val, 1)
+        elif k == exprparse.NEG:
+            v = (-out[l][0], out[l][1])
+        elif k == exprparse.POS:
+            v = out[l]
+        elif k == exprparse.BIN and val in rules.binary:
+            a, b = out[l], out[r]
+            if val == '/' and not b[0]:
+                raise UnsafeExpression("Division by zero.")
+            v = _apply(val, a, b, rules.max_abs)
+            if v is None:
+                raise UnsafeExpression("Result too large." if val != '**' else "Exponent must be a small integer.")
+        elif k == exprparse.CALL and val in rules.unary:
+            a = out[l]
+            v = UNARY[val](a)
+            if v is None:
+                shown = a[0] if a[1] == 1 else f"{a[0]}/{a[1]}"
+                raise UnsafeExpression(f"{val}() needs an exact result; not defined for {shown}")
+        else:
+            raise UnsafeExpression("Operator not allowed in this variant.")
+        out.append(v)
+    n, d = out[-1]
+    return n / d, literals
+
+def uses_cards(literals: List[int], values: List[int], rules: Rules) -> bool:
+    """Every card exactly once; with concat a literal may be digit cards written together."""
+    def take(lits, cards):
+        if not lits:
+            return not cards
+        n, rest = lits[0], lits[1:]
+        if n in cards:
+            left = list(cards); left.remove(n)
+            if take(rest, left):
+                return True
+        if rules.concat and n >= 10:
+            digits = [int(d) for d in str(n)]
+            left = list(cards)
+            for d in digits:
+                if d == 0 or d not in left:
+                    return False
+                left.remove(d)
+            return take(rest, left)
+        return False
+    return take(list(literals), list(values))
+
+def check(expr: str, values: List[int], rules: Rules, target: int = TARGET) -> Tuple[bool, Optional[float], str]:
+    """(ok, value, reason)"""
+    try:
+        value, literals = evaluate(expr, rules)
+    except (UnsafeExpression, ValueError, OverflowError, ZeroDivisionError) as e:
+        return False, None, str(e) or 'Invalid expression'
+    if not uses_cards(literals, values, rules):
+        return False, value, 'Use each card exactly once'
+    if abs(value - target) >= 1e-6:
+        return False, value, f'Not {target}'
+    return True, value, ''
+
+# ---------- solved catalogs, cached on disk ----------
+def _solve_hand(job) -> Dict[str, Any]:
+    rules_name, case_id, cards = job
+    rules = get_rules(rules_name)
+    sols = solve(list(cards), rules)
+    return {'case_id': case_id, 'cards': list(cards), 'solutions': sols,
+            'level': level_for(sols), 'variant': rules_name}
+
+def build_catalog(hands: List[Tuple[int, List[int]]], rules: Rules, workers: int = 1) -> List[Dict[str, Any]]:
+    from .book import _ordered_map
+    jobs = ((rules.name, cid, tuple(cards)) for cid, cards in hands)
+    return list(_ordered_map(_solve_hand, jobs, workers))
+
+def cache_path(hands: List[Tuple[int, List[int]]], rules: Rules, cache_dir=None) -> Path:
+    h = hashlib.sha256(rules.fingerprint.encode())
+    for cid, cards in hands:
+        h.update(f"{cid}:{','.join(map(str, cards))};".encode())
+    return Path(cache_dir or CACHE_DIR) / f"{rules.name}-{h.hexdigest()[:16]}.json"
+
+def load_or_build(hands: List[Tuple[int, List[int]]], rules: Rules, cache_dir=None, workers: int = 1) -> Path:
+    """
+    Path of an answers.json-shaped file for rules over hands, solving only on a
+    cache miss. Builders hold <file>.lock, so processes missing at the same time
+    solve once: the others wait and then find the file.
+    """
+    path = cache_path(hands, rules, cache_dir)
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_suffix('.lock'), 'a') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        if path.exists():
+            return path
+        puzzles = build_catalog(hands, rules, workers)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(puzzles, separators=(',', ':')), encoding='utf-8')
+        os.replace(tmp, path)
+    return path
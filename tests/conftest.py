@@ -0,0 +1,19 @@
+# tests/conftest.py
+import sys, uuid
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+# web/ modules import each other flat (import core), game24 is a package at the root
+for p in (ROOT, ROOT / 'web'):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+@pytest.fixture
+def client():
+    import app
+    app.init_app(freeze=False)
+    c = app.app.test_client()
+    c.set_cookie('session_id', uuid.uuid4().hex)   # own session and rate bucket per test
+    return c
@@ -0,0 +1,36 @@
+# tests/test_admin.py
+import json
+
+import pytest
+
+import app as webapp
+import core
+
+LOCAL = {'REMOTE_ADDR': '127.0.0.1'}
+
+@pytest.mark.parametrize('env, headers, code', [
+    ({}, {}, 403),                                             # no token: fail closed
+    ({'PUZZLEBOOK_ADMIN_LOCAL': '1'}, {}, 200),                # explicit local-dev opt-in
+    ({'ADMIN_TOKEN': 's3cret'}, {}, 403),
+    ({'ADMIN_TOKEN': 's3cret'}, {'X-Admin-Token': 's3cret'}, 200),
+])
+def test_admin_gate(client, monkeypatch, env, headers, code):
+    monkeypatch.delenv('ADMIN_TOKEN', raising=False)
+    monkeypatch.delenv('PUZZLEBOOK_ADMIN_LOCAL', raising=False)
+    for k, v in env.items():
+        monkeypatch.setenv(k, v)
+    r = client.get('/api/admin/admission', headers=headers, environ_base=LOCAL)
+    assert r.status_code == code
+
+def test_reload_caps_retired(tmp_path, monkeypatch):
+    monkeypatch.setattr(webapp, 'RETIRED_MAX', 3)
+    cat = core.CATALOG
+    prev = None
+    for start in range(0, 20, 4):       # each version drops the previous four ids
+        path = tmp_path / f'answers-{start}.json'
+        path.write_text(json.dumps([{'case_id': start + i, 'cards': [1, 2, 3, start + i],
+                                     'solutions': [], 'level': 'hard'} for i in range(4)]))
+        prev = webapp._build_catalog(path, prev)
+    assert list(prev.retired) == [13, 14, 15]
+    assert prev.get(15) is not None and prev.get(0) is None
+    assert core.CATALOG is cat
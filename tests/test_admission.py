@@ -0,0 +1,75 @@
+# tests/test_admission.py
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import app as webapp
+from admission import Coalescer, Limiter
+
+def test_limiter_burst_then_refill(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    lim = Limiter(rate=2, burst=3)
+    assert [lim.admit(('a',))[0] for _ in range(4)] == [True, True, True, False]
+    ok, wait = lim.admit(('a',))
+    assert not ok and wait == pytest.approx(0.5)
+    assert lim.admit(('b',))[0]                     # other keys keep their own budget
+    now[0] += 0.5
+    assert lim.admit(('a',))[0]
+    assert not lim.admit(('a', 'fresh'))[0]          # every key must afford it
+    assert lim.status()['rejected'] == 3
+
+def test_limiter_off_and_bad_config():
+    lim = Limiter(rate=0)
+    assert all(lim.admit(('a',))[0] for _ in range(100))
+    with pytest.raises(ValueError):
+        lim.configure(rate='abc')
+
+def test_coalescer_shares_one_run():
+    co = Coalescer()
+    gate = threading.Event()
+    runs, results = [], []
+
+    def work():
+        runs.append(1)
+        gate.wait(2)
+        return 'done'
+
+    ts = [threading.Thread(target=lambda: results.append(co.run('k', work))) for _ in range(4)]
+    for t in ts:
+        t.start()
+    while 'k' not in co.flights or co.flights['k'].joined < 3:
+        time.sleep(0.01)
+    gate.set()
+    for t in ts:
+        t.join()
+    assert len(runs) == 1
+    assert sorted(results) == [('done', False)] + [('done', True)] * 3
+    assert co.run('k', lambda: 'again') == ('again', False)     # nothing cached afterwards
+
+def test_coalescer_shares_errors():
+    co = Coalescer()
+    with pytest.raises(KeyError):
+        co.run('k', lambda: {}['x'])
+    assert co.status()['in_flight'] == 0
+
+def test_cookieless_requests_share_an_address_bucket(monkeypatch):
+    monkeypatch.setattr(webapp, 'LIMITER', Limiter(rate=0.001, burst=5))
+    c = webapp.app.test_client(use_cookies=False)       # like a script that drops the cookie
+    codes = [c.get('/api/next?level=easy', environ_base={'REMOTE_ADDR': '10.9.8.7'}).status_code
+             for _ in range(8)]
+    assert codes.count(429) == 3
+    assert c.get('/api/next?level=easy', environ_base={'REMOTE_ADDR': '10.9.8.6'}).status_code == 200
+
+def test_bad_admission_env_falls_back():
+    code = ("import sys; sys.path[:0] = ['.', 'web']; import app; "
+            "print(app.LIMITER.rate, app.LIMITER.burst)")
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                         env={'PUZZLEBOOK_ADMISSION': 'abc', 'PATH': ''},
+                         cwd=webapp._ROOT)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.split() == ['5.0', '20.0']
+    assert 'PUZZLEBOOK_ADMISSION' in out.stderr
@@ -0,0 +1,80 @@
+# tests/test_assets.py
+import gzip
+import json
+import shutil
+
+import pytest
+
+import app as webapp
+from tools import build_assets
+
+@pytest.fixture
+def static(tmp_path, monkeypatch):
+    """A small copy of web/static: two card images plus the script and stylesheet."""
+    src = build_assets.STATIC
+    root = tmp_path / 'static'
+    for rel in ('assets/images/classic/AD.png', 'assets/images/classic/2S.png') + build_assets.TEXT_FILES:
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(src / rel, root / rel)
+    monkeypatch.setattr(build_assets, 'STATIC', root)
+    monkeypatch.setattr(build_assets, 'WIDTHS', (100, 150))
+    return root
+
+def _manifest(out):
+    return json.loads((out / 'manifest.json').read_text(encoding='utf-8'))
+
+def test_rebuild_swaps_and_keeps_previous_files(static):
+    out = static / 'dist'
+    build_assets.main(['--out', str(out)])
+    first = _manifest(out)
+    assert 'answers.json' not in first
+    assert set(first['images/classic/AD.png']['webp']) == {'100', '150'}
+
+    (static / 'css/style.css').write_text('body{color:red}')
+    build_assets.main(['--out', str(out)])
+    second = _manifest(out)
+    assert out.is_symlink()
+    assert second['css/style.css']['file'] != first['css/style.css']['file']
+    # a server still holding the first manifest can resolve every file it names
+    for rel in build_assets._manifest_files(first):
+        assert (out / rel).is_file(), rel
+    assert len(list((static / 'dist.builds').iterdir())) == 1
+
+@pytest.fixture
+def built(static, monkeypatch):
+    out = static / 'dist'
+    build_assets.main(['--out', str(out)])
+    manifest = _manifest(out)
+    monkeypatch.setattr(webapp, 'DIST_DIR', out)
+    monkeypatch.setattr(webapp, 'ASSET_MANIFEST', manifest)
+    monkeypatch.setattr(webapp, 'DIST_ENCODINGS',
+                        {e['file']: e.get('encodings', []) for e in manifest.values() if 'file' in e})
+    return manifest
+
+def test_hashed_asset_route(client, built):
+    name = built['js/script.js']['file']
+    r = client.get(f'/static/dist/{name}', headers={'Accept-Encoding': 'gzip'})
+    assert r.status_code == 200
+    assert r.headers['Content-Encoding'] == 'gzip' and r.headers['Vary'] == 'Accept-Encoding'
+    assert 'immutable' in r.headers['Cache-Control']
+    assert gzip.decompress(r.data) == (build_assets.STATIC / 'js/script.js').read_bytes()
+    plain = client.get(f'/static/dist/{name}')
+    assert 'Content-Encoding' not in plain.headers and plain.data == gzip.decompress(r.data)
+    assert client.get('/static/dist/manifest.json').status_code == 404
+
+def test_cards_use_built_images(client, built):
+    ad = webapp._cards_to_images([1], 'classic')[0]
+    entry = built['images/classic/AD.png']
+    assert ad['url'].startswith(webapp.DIST_URL) and ad['url'].endswith('.png')
+    assert ad['srcset'].count('w,') == len(entry['webp']) - 1
+    assert client.get(ad['url']).status_code == 200
+
+def test_hand_sprite_is_opt_in(client, monkeypatch):
+    r = client.get('/api/next?level=easy').get_json()
+    assert 'hand_url' not in r and all(c['url'] for c in r['images'])
+    r = client.get('/api/next?level=easy&sprite=1&w=400').get_json()
+    webp, png = client.get(r['hand_url']), client.get(r['hand_url_png'])
+    assert webp.mimetype == 'image/webp' and png.mimetype == 'image/png'
+    monkeypatch.setattr(webapp, 'HAND_SPRITE', True)
+    assert 'hand_url' in client.get('/api/next?level=easy').get_json()
+    assert 'hand_url' not in client.get('/api/next?level=easy&sprite=0').get_json()
@@ -0,0 +1,34 @@
+# tests/test_book.py
+import json
+import re
+
+from game24 import book, cli
+
+PICTURES = cli.DEFAULT_ANSWERS.parent / 'assets' / 'images'
+
+def _puzzles():
+    with open(cli.DEFAULT_ANSWERS, encoding='utf-8') as f:
+        return json.load(f)
+
+def test_select_cases():
+    ps = _puzzles()
+    easy = book.select_cases(ps, level='easy', count=30, seed=7)
+    assert len(easy) == 30 and all(p['level'] == 'easy' for p in easy)
+    assert easy == book.select_cases(ps, level='easy', count=30, seed=7)
+    assert all(not p['solutions'] for p in book.select_cases(ps, solvable=False))
+
+def test_book_pages_in_order_whatever_the_workers(tmp_path):
+    chosen = book.select_cases(_puzzles(), level='medium', count=21, seed=1)
+    for name, workers in (('one.html', 1), ('two.html', 2)):
+        book.build_book(chosen, str(tmp_path / name), str(PICTURES), per_page=4, answers_per_page=10,
+                        workers=workers)
+    html = (tmp_path / 'one.html').read_text(encoding='utf-8')
+    assert html == (tmp_path / 'two.html').read_text(encoding='utf-8')
+    # 6 puzzle pages, then 3 answer pages, numbered in sequence
+    assert re.findall(r'Page (\d+)', html) == [str(i) for i in range(1, 10)]
+    ids = [p['case_id'] for p in chosen]
+    assert [int(c) for c in re.findall(r'class="num">#(\d+)', html)] == ids
+    assert [int(c) for c in re.findall(r'<tr><td>#(\d+)</td>', html)] == ids
+    # every card shown is embedded exactly once, as a stylesheet class
+    for cls in set(re.findall(r'class="card (c-\w+)"', html)):
+        assert html.count(f'.{cls}{{background-image:url(data:image/png;base64,') == 1, cls
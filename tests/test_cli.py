@@ -0,0 +1,29 @@
+# tests/test_cli.py
+import io
+import json
+
+import pytest
+
+from game24 import cli
+
+LINES = [
+    '{"case_id": 1, "cards": [3, 3, 8, 8], "solutions": ["8/(3-8/3)"]}',
+    '[1, 1, 1, 1]',
+    '',
+    'not json',
+    '{"case_id": 4, "cards": [1, 2, 3, 4], "solutions": ["1*2*3*4", "1+2+3+4"]}',
+    '"a string"',
+    '{"case_id": 6, "cards": [4, 4, 4, 4], "solutions": ["4*4+4+4"]}',
+]
+
+@pytest.mark.parametrize('workers, chunk', [(1, 256), (1, 2), (2, 2)])
+def test_run_batch_keeps_order_and_reports_bad_lines(workers, chunk):
+    out = io.StringIO()
+    counts = cli.run_batch('verify', io.StringIO("\n".join(LINES) + "\n"), out, workers=workers, chunk=chunk)
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert counts == {'lines': 6, 'errors': 2}
+    assert [r.get('case_id', r.get('line')) for r in rows] == [1, None, 4, 4, 6, 6]
+    assert [r['line'] for r in rows if 'error' in r] == [4, 6]
+    assert rows[2]['error'].startswith('JSONDecodeError') and rows[4]['error'].startswith('ValueError')
+    assert rows[3]['ok'] is False and rows[3]['bad'][0]['solution'] == '1+2+3+4'
+    assert rows[0]['ok'] and rows[1]['cards'] == [1, 1, 1, 1] and rows[5]['ok']
@@ -0,0 +1,60 @@
+# tests/test_engines.py
+import json
+
+import pytest
+
+import app as webapp
+import calibration
+import engines
+import leaderboard
+
+CID = 987654    # not a classic case id
+
+class Toy(engines.Engine):
+    name = 'toy'
+    title = 'Toy'
+
+    def load(self):
+        self.cat = None
+
+    def catalog(self, state, params):
+        return self.cat
+
+    def pick(self, level, state, catalog):
+        return catalog.get(CID)
+
+    def present(self, puzzle, state, params):
+        return {'question': 'say yes'}
+
+    def check(self, answer, puzzle, state, data):
+        return answer, None if answer == 'yes' else 'say yes'
+
+def test_engine_is_abstract():
+    class Half(engines.Engine):
+        def catalog(self, state, params):
+            return None
+    with pytest.raises(TypeError):
+        Half()
+
+@pytest.fixture
+def toy(tmp_path, monkeypatch):
+    monkeypatch.setattr(engines, 'REGISTRY', dict(engines.REGISTRY))
+    monkeypatch.setattr(engines, '_loaded', dict(engines._loaded))
+    engines.register(' Toy ', Toy())
+    eng = engines.get('TOY')
+    path = tmp_path / 'toy.json'
+    path.write_text(json.dumps([{'case_id': CID, 'cards': [1], 'solutions': ['yes'], 'level': 'easy'}]))
+    eng.cat = webapp._build_catalog(path)
+    return eng
+
+def test_register_normalizes_names(toy):
+    assert 'toy' in engines.REGISTRY and ' Toy ' not in engines.REGISTRY
+    assert engines.get(' toy') is toy
+
+def test_other_games_skip_calibration_and_global_board(client, toy):
+    r = client.get('/api/next?game=toy&guest_id=toy-player').get_json()
+    assert r['case_id'] == CID
+    client.post('/api/check', json={'game': 'toy', 'answer': 'no'})
+    assert client.post('/api/check', json={'game': 'toy', 'answer': 'yes', 'guest_id': 'toy-player'}).get_json()['ok']
+    assert CID not in calibration.STATS
+    assert not any(g.startswith('toy-player') for g in leaderboard.BOARDS[leaderboard.GLOBAL].totals)
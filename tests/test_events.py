@@ -0,0 +1,28 @@
+# tests/test_events.py
+import core
+import events
+
+def test_streams_over_cap_do_not_park(monkeypatch):
+    monkeypatch.setattr(events, 'MAX_STREAMS', 1)
+    ch = events.subscribe('s-cap')
+    ch.publish('score', {'n': 1})
+    first = events.poll('s-cap', None, timeout=0)       # takes the only slot, then frees it
+    assert first[2] is False
+    assert events._park()                               # someone else now holds it
+    try:
+        evs, last, busy = events.poll('s-cap', ch.seq - 1, timeout=5)
+        assert busy and [e['event'] for e in evs] == ['score'] and last == ch.seq
+        out = list(events.stream('s-cap', ch.seq - 1, lambda: 42.2))
+        assert out[0] == f"retry: {events.BUSY_RETRY_SECS * 1000}\n\n"
+        assert 'event: score' in out[1] and 'event: tick' in out[2] and len(out) == 3
+    finally:
+        events._unpark()
+        events.unsubscribe('s-cap', ch)
+    assert events._parked == 0
+
+def test_ticks_do_not_dirty_the_session(client):
+    client.get('/api/next?level=easy')
+    sid = client.get_cookie('session_id').value
+    core.SESSIONS.take_dirty()
+    assert client.get('/api/events?transport=poll&since=0').get_json()['ok']
+    assert sid not in core.SESSIONS.dirty
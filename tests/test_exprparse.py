@@ -0,0 +1,56 @@
+# tests/test_exprparse.py
+import ast
+import json
+import math
+
+import pytest
+
+from game24 import cli, exprparse
+from game24.complexity import preprocess_ranks
+
+def _ast_depth(node, depth=0):
+    """The old complexity._DepthVisitor measure."""
+    return max([depth] + [_ast_depth(c, depth + 1) for c in ast.iter_child_nodes(node)])
+
+_AST_OPS = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/', ast.Pow: '**'}
+
+def _ast_ops(tree):
+    out = {}
+    for n in ast.walk(tree):
+        if isinstance(n, ast.BinOp):
+            op = _AST_OPS[type(n.op)]
+            out[op] = out.get(op, 0) + 1
+    return out
+
+def _solutions():
+    with open(cli.DEFAULT_ANSWERS, encoding='utf-8') as f:
+        return sorted({s for p in json.load(f) for s in p.get('solutions') or []})
+
+def test_matches_ast_on_every_catalog_solution():
+    sols = _solutions()
+    assert sols
+    for s in sols:
+        src = preprocess_ranks(s).replace('^', '**').strip()
+        ref = ast.parse(src, mode='eval')
+        tree = exprparse.parse(src)
+        assert tree.ast_size() == sum(1 for _ in ast.walk(ref)), s
+        assert tree.height() == _ast_depth(ref), s
+        assert tree.ops() == _ast_ops(ref), s
+        try:
+            want = float(eval(compile(ref, '<catalog>', 'eval'), {'__builtins__': {}}))
+        except ZeroDivisionError:
+            with pytest.raises(ZeroDivisionError):
+                exprparse.evaluate(tree)
+            continue
+        assert math.isclose(exprparse.evaluate(tree), want, rel_tol=1e-12, abs_tol=1e-12), s
+
+@pytest.mark.parametrize('src', ['2+', '(1+2', '1+2)', '*3', '3 4', '2***3', ''])
+def test_rejects_what_ast_rejects(src):
+    with pytest.raises(SyntaxError):
+        ast.parse(src, mode='eval')
+    with pytest.raises(exprparse.ParseError):
+        exprparse.parse(src)
+
+def test_error_reports_column():
+    with pytest.raises(exprparse.ParseError, match='column 1'):
+        exprparse.parse('(8-2*4')
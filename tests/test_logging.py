@@ -0,0 +1,15 @@
+# tests/test_logging.py
+import logging
+
+import app as webapp
+
+def test_stats_payload_logs_its_result_lazily(client, caplog):
+    webapp.app.logger.setLevel(logging.DEBUG)
+    try:
+        with caplog.at_level(logging.DEBUG, logger=webapp.app.logger.name):
+            out = webapp._stats_payload({'stats': {'played': 2, 'solved': 1}})
+    finally:
+        webapp.app.logger.setLevel(logging.NOTSET)
+    assert out['played'] == 2 and out['solved'] == 1
+    rec = [r for r in caplog.records if r.msg == 'stats: %s']
+    assert len(rec) == 1 and rec[0].getMessage() == f'stats: {out}'
@@ -0,0 +1,52 @@
+# tests/test_outcomes.py
+import glob
+import os
+
+import pytest
+
+import core
+import outcomes
+
+pytest.importorskip('numpy')
+
+def _files(d):
+    return sorted(os.path.basename(p) for p in glob.glob(os.path.join(d, 'outcomes-*.col')))
+
+def test_partial_chunk_flush_is_replaced_by_full_spill(tmp_path, monkeypatch):
+    monkeypatch.setattr(outcomes, 'CHUNK_ROWS', 10)
+    st = outcomes.OutcomeStore()
+    st.configure(str(tmp_path))
+    for i in range(4):
+        st.record(i, 'easy', 'dealt')
+    assert st.flush() == 4 and st.flush() == 0         # nothing new, nothing written
+    part = _files(tmp_path)
+    assert len(part) == 1
+    assert outcomes._read_chunk(str(tmp_path / part[0]))['case_id'].tolist() == [0, 1, 2, 3]
+    assert st.load()['case_id'].size == 4               # memory stands in for its own partial file
+
+    for i in range(4, 12):
+        st.record(i, 'easy', 'dealt')                   # fills chunk 1, starts chunk 2
+    assert _files(tmp_path) == part
+    assert outcomes._read_chunk(str(tmp_path / part[0]))['case_id'].size == 10
+    assert sorted(st.load()['case_id'].tolist()) == list(range(12))
+
+    st.flush()                                          # what other workers' reports read
+    on_disk = [outcomes._read_chunk(str(tmp_path / f))['case_id'].tolist() for f in _files(tmp_path)]
+    assert sorted(sum(on_disk, [])) == list(range(12))
+
+def test_correct_recorded_once_per_hand(client, monkeypatch):
+    store = outcomes.OutcomeStore()
+    monkeypatch.setattr(outcomes, 'STORE', store)
+    cid = client.get('/api/next?level=easy').get_json()['case_id']
+    answer = core.CATALOG.get(cid)['solutions'][0]
+    for _ in range(3):
+        client.post('/api/check', json={'answer': answer})
+    cols = store.load()
+    rep = outcomes.report(cols)
+    assert rep['actions']['dealt'] == 1 and rep['actions']['correct'] == 1
+    assert all(r['solve_rate'] <= 1 for r in rep['solve_rate_by_hour'])
+
+    cid = client.get('/api/next?level=easy').get_json()['case_id']
+    client.post('/api/help', json={})
+    client.post('/api/check', json={'answer': core.CATALOG.get(cid)['solutions'][0]})
+    assert outcomes.report(store.load())['actions']['correct'] == 1
@@ -0,0 +1,107 @@
+# tests/test_pools.py
+import pytest
+
+import app as webapp
+import core
+
+@pytest.mark.parametrize('size', ['abc', -3, 0.5])
+def test_seeded_pool_bad_size_is_400(client, size):
+    r = client.post('/api/pool', json={'mode': 'competition', 'seed': 's', 'size': size})
+    assert r.status_code == 400
+    assert 'Bad pool spec' in r.get_json()['error']
+
+def test_seeded_pool_size(client):
+    r = client.post('/api/pool', json={'mode': 'competition', 'seed': 's', 'size': 10})
+    assert r.status_code == 200 and r.get_json()['pool_len'] == 10
+
+# ---------- level mixes ----------
+def test_normalize_mix():
+    assert webapp._normalize_mix({'Easy': 2, 'easy_like': 1, 'hard': 0}) == {'easy_like': 3.0}
+    for bad in ({'nope': 1}, {'easy': -1}, {'easy': 0}, {}, 'easy', [1], None):
+        with pytest.raises(ValueError):
+            webapp._normalize_mix(bad)
+    with pytest.raises(TypeError):
+        webapp._normalize_mix({'easy': [1]})
+
+@pytest.mark.parametrize('weights, size, want', [
+    ({'a': 1, 'b': 1, 'c': 1}, 10, {'a': 4, 'b': 3, 'c': 3}),     # largest remainder, ties by order
+    ({'a': 40, 'b': 60}, 1, {'a': 0, 'b': 1}),
+    ({'a': 0.1, 'b': 0.3}, 7, {'a': 2, 'b': 5}),
+    ({'a': 5}, 3, {'a': 3}),
+])
+def test_apportion(weights, size, want):
+    got = webapp._apportion(weights, size)
+    assert got == want and sum(got.values()) == size
+
+@pytest.mark.parametrize('mix', ['easy', [1], 3, {'easy': 'x'}, {'easy': [1]}])
+def test_bad_mix_is_400(client, mix):
+    r = client.post('/api/pool', json={'mode': 'custom', 'size': 10, 'mix': mix})
+    assert r.status_code == 400 and 'Bad pool spec' in r.get_json()['error']
+
+def test_mix_shortfall_is_reported(client):
+    have = len(core.CATALOG.pools['hard_like'])
+    r = client.post('/api/pool', json={'mode': 'custom', 'size': webapp.MAX_POOL_SIZE, 'mix': {'hard': 1}})
+    body = r.get_json()
+    assert r.status_code == 200 and body['pool_len'] == have < webapp.MAX_POOL_SIZE
+    assert body['mix'] == {'requested': webapp.MAX_POOL_SIZE, 'delivered': have,
+                           'strata': {'hard_like': {'requested': webapp.MAX_POOL_SIZE, 'delivered': have}}}
+
+def test_mix_top_up_and_strict(client):
+    have = len(core.CATALOG.pools['hard_like'])
+    spec = {'mode': 'custom', 'size': 2 * have + 20, 'mix': {'hard': 1, 'easy': 1}, 'seed': 7}
+    body = client.post('/api/pool', json=spec).get_json()
+    assert body['pool_len'] == spec['size'] == body['mix']['delivered']
+    hard = body['mix']['strata']['hard_like']
+    assert hard['delivered'] == have < hard['requested']
+    r = client.post('/api/pool', json={**spec, 'strict': True})
+    assert r.status_code == 400 and 'hard_like' in r.get_json()['error']
+
+def test_same_seed_same_mix_pool():
+    a, _ = webapp._build_stratified_pool({'easy': 1, 'medium': 1}, 30, seed='x')
+    b, _ = webapp._build_stratified_pool({'easy': 1, 'medium': 1}, 30, seed='x')
+    assert a == b and len(set(a)) == 30
+
+# ---------- seeded sequences ----------
+@pytest.mark.parametrize('n', [1, 2, 7, 64, 1000])
+def test_seeded_permutation_round_trip(n):
+    seq = core.SeededSequence('seed', tuple(range(n)))
+    perm = [seq._permute(i) for i in range(n)]
+    assert sorted(perm) == list(range(n))
+    assert [seq._unpermute(x) for x in perm] == list(range(n))
+    assert list(seq) == [seq[i] for i in range(n)] == [perm[i] for i in range(n)]
+
+def test_seeded_membership_on_unsorted_and_copied_sources():
+    src = (50, 10, 40, 20, 30)
+    seq = core.SeededSequence('x', src, size=3)
+    assert {c for c in src if c in seq} == set(seq)
+    assert 99 not in seq
+    copy = core.SeededSequence('x', tuple(src), size=3)     # e.g. restored from a snapshot
+    assert list(copy) == list(seq) and all(c in copy for c in seq)
+
+def test_same_seed_same_sequence_across_catalog_pools():
+    src = core.CATALOG.pool_ids['medium']
+    a, b = core.SeededSequence('comp-1', src, 20), core.SeededSequence('comp-1', src, 20)
+    assert list(a) == list(b) and list(a) != list(core.SeededSequence('comp-2', src, 20))
+
+# ---------- delta reports ----------
+def test_delta_reports_merge_to_full(client):
+    ids = list(core.CATALOG.ids[:5])
+    assert client.post('/api/pool', json={'mode': 'custom', 'case_ids': ids}).status_code == 200
+    full = client.get('/api/pool_report').get_json()
+    have = dict(full['stats']['pool_score'])
+    since = full['version']
+    assert client.get(f'/api/pool_report?since={since}').get_json()['unchanged']
+
+    for _ in range(2):
+        cid = client.get('/api/next').get_json()['case_id']
+        sols = core.CATALOG.get(cid)['solutions']
+        client.post('/api/check', json={'answer': sols[0] if sols else 'no solution'})
+        client.post('/api/check', json={'answer': sols[0] if sols else 'no solution'})
+        d = client.get(f'/api/pool_report?since={since}').get_json()
+        assert d['delta'] and set(d['stats']['pool_score']) <= set(have)
+        have.update(d['stats']['pool_score'])
+        since = d['version']
+
+    now = client.get('/api/pool_report').get_json()['stats']
+    assert have == now['pool_score']
+    assert d['stats']['pool_solved'] == sum(have.values()) == 2
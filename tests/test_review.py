@@ -0,0 +1,53 @@
+# tests/test_review.py
+import review
+import snapshot
+
+def test_pop_due_leases_for_first_interval():
+    q = review.ReviewQueue()
+    q.record(7, 'attempt', now=0)
+    q.record(7, 'good', now=0)          # step 1
+    assert q.items[7][1] == 1
+    due = q.items[7][0]
+    assert q.pop_due(now=due) == 7
+    assert q.items[7] == (due + review.INTERVALS[0], 1)
+
+def test_pop_due_skips_excluded_case():
+    q = review.ReviewQueue()
+    q.record(1, 'attempt', now=0)
+    q.record(2, 'attempt', now=1)
+    now = 1000
+    assert q.pop_due(now=now, exclude=1) == 2
+    assert q.pop_due(now=now, exclude=2) == 1      # 1 was put back, not dropped
+    assert q.pop_due(now=now) is None
+
+def test_queue_blob_round_trip():
+    q = review.ReviewQueue()
+    for cid in (3, 1, 2):
+        q.record(cid, 'revealed', now=cid)
+    back = review.ReviewQueue.from_blob(q.to_blob())
+    assert back.items == q.items
+    assert back.pop_due(now=10 ** 6) == 1
+
+def test_queues_bounded_and_thawed(monkeypatch):
+    monkeypatch.setattr(review, 'QUEUES', type(review.QUEUES)())
+    monkeypatch.setattr(review, 'COLD', {})
+    monkeypatch.setattr(review, 'MAX_GUESTS', 2)
+    for g in ('a', 'b', 'c'):
+        review.record(g, 5, 'skipped')
+    assert list(review.QUEUES) == ['b', 'c'] and 'a' in review.COLD
+    review.record('a', 6, 'skipped')               # comes back with its old item
+    assert set(review.QUEUES['a'].items) == {5, 6}
+
+def test_reviews_survive_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(review, 'QUEUES', type(review.QUEUES)())
+    monkeypatch.setattr(review, 'COLD', {})
+    monkeypatch.setattr(review, 'DIRTY', set())
+    snaps = snapshot.Snapshots()
+    snaps.configure(str(tmp_path))
+    review.record('g1', 42, 'attempt')
+    snaps.flush()
+    review.QUEUES.clear()
+    snaps.restore()
+    assert 'g1' in review.COLD
+    review.record('g1', 43, 'attempt')
+    assert set(review.QUEUES['g1'].items) == {42, 43}
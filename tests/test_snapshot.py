@@ -0,0 +1,98 @@
+# tests/test_snapshot.py
+import threading
+import time
+
+import pytest
+
+import core
+import snapshot
+
+@pytest.fixture
+def store(monkeypatch):
+    s = core.SessionStore()
+    s.decoder = snapshot.decode
+    monkeypatch.setattr(core, 'SESSIONS', s)
+    return s
+
+def _seeded_state():
+    st = core.default_state()
+    src = core.CATALOG.pool_ids['easy_like']
+    st['pool'] = {'mode': 'competition', 'ids': core.SeededSequence('s1', src, 12), 'index': 3,
+                  'status': {'5': {'status': 'good', 'attempts': 1}}, 'score': {'5': 1}}
+    st['extra'] = {'seq': core.SeededSequence('s2', src, 4), 'live': threading.Lock()}
+    return st
+
+def test_encode_decode_round_trip(monkeypatch):
+    plain = core.default_state()
+    sources = {}
+    assert snapshot.decode(snapshot.encode(plain, sources)) == plain and not sources
+
+    st = _seeded_state()
+    blob = snapshot.encode(st, sources)
+    monkeypatch.setattr(snapshot, 'SOURCES', dict(sources))
+    back = snapshot.decode(blob)
+    assert list(back['pool']['ids']) == list(st['pool']['ids'])
+    assert list(back['extra']['seq']) == list(st['extra']['seq'])
+    assert 'live' not in back['extra']                  # unpicklable key dropped, rest kept
+    assert back['pool']['score'] == {'5': 1} and back['stats'] == st['stats']
+
+def test_missing_source_keeps_session_cold(store, monkeypatch):
+    blob = snapshot.encode(_seeded_state(), {})
+    monkeypatch.setattr(snapshot, 'SOURCES', {})
+    with pytest.raises(snapshot.MissingSource):
+        snapshot.decode(blob)
+    errors = []
+    store.on_error = lambda sid, e: errors.append(sid)
+    store.cold['sid'] = (1, blob)
+    assert store.get('sid') is None
+    assert 'sid' in store.cold and errors == ['sid'] and store.thaw_errors == 1
+
+def test_thaw_is_atomic(store):
+    calls = []
+    def slow(blob):
+        calls.append(1)
+        time.sleep(0.05)
+        return snapshot.decode(blob)
+    store.decoder = slow
+    store.cold['sid'] = (1, snapshot.encode({**core.default_state(), 'mark': 'restored'}, {}))
+    got = []
+    ts = [threading.Thread(target=lambda: got.append(store.get('sid'))),
+          threading.Thread(target=lambda: got.append(store.setdefault('sid', core.default_state())))]
+    for t in ts:
+        t.start()
+        time.sleep(0.01)
+    for t in ts:
+        t.join()
+    assert len(calls) == 1 and got[0] is got[1] and got[0]['mark'] == 'restored'
+    assert not store.cold
+
+def test_flush_never_loses_dirty_marks(store, tmp_path):
+    snaps = snapshot.Snapshots()
+    snaps.configure(str(tmp_path))
+    for i in range(2000):
+        store[f"s{i}"] = core.default_state()
+    stop = threading.Event()
+    def hammer():
+        i = 0
+        while not stop.is_set():
+            store.get(f"s{i % 2000}")
+            i += 1
+    t = threading.Thread(target=hammer)
+    t.start()
+    try:
+        for _ in range(20):
+            snaps.flush()
+    finally:
+        stop.set()
+        t.join()
+    store.get('s1')
+    assert 's1' in store.take_dirty()
+
+def test_failed_flush_keeps_dirty(store, tmp_path):
+    snaps = snapshot.Snapshots()
+    snaps.configure(str(tmp_path / 'gone'))
+    store['a'] = core.default_state()
+    (tmp_path / 'gone').rmdir()
+    with pytest.raises(OSError):
+        snaps.flush()
+    assert 'a' in store.dirty and snaps.last_error
@@ -0,0 +1,62 @@
+# tests/test_solve_dedup.py
+import uuid
+
+import pytest
+
+import calibration
+import core
+import leaderboard
+
+@pytest.fixture
+def hand(client):
+    """Deal one hand to a fresh guest; returns (client, guest_id, case_id, answer)."""
+    gid = uuid.uuid4().hex
+    r = client.get(f'/api/next?level=easy&guest_id={gid}').get_json()
+    answer = core.CATALOG.get(r['case_id'])['solutions'][0]
+    return client, gid, r['case_id'], answer
+
+def _check(client, gid, answer):
+    return client.post('/api/check', json={'answer': answer, 'guest_id': gid}).get_json()
+
+def test_board_counts_one_point_per_hand(hand):
+    client, gid, _, answer = hand
+    for _ in range(5):
+        assert _check(client, gid, answer)['ok']
+    assert leaderboard.BOARDS[leaderboard.GLOBAL].totals[gid] == 1
+    client.get(f'/api/next?level=easy&guest_id={gid}')
+    r = client.post('/api/check', json={'answer': 'no solution', 'guest_id': gid}).get_json()
+    assert leaderboard.BOARDS[leaderboard.GLOBAL].totals[gid] == 1 + bool(r['ok'])
+
+def test_board_counts_a_case_once_per_guest(hand):
+    client, gid, cid, answer = hand
+    for _ in range(3):
+        assert _check(client, gid, answer)['ok']
+        assert client.get(f'/api/next?case_id={cid}&guest_id={gid}').get_json()['case_id'] == cid
+    assert leaderboard.BOARDS[leaderboard.GLOBAL].totals[gid] == 1
+
+def test_board_skips_revealed_hand(hand):
+    client, gid, _, answer = hand
+    client.post('/api/help', json={'guest_id': gid})
+    assert _check(client, gid, answer)['ok']
+    assert gid not in leaderboard.BOARDS[leaderboard.GLOBAL].totals
+
+def _counts(cid):
+    s = calibration._get(cid)
+    return s.played, s.solved, s.solve_attempts, s.revealed
+
+def test_calibration_counts_one_solve_per_hand(hand):
+    client, gid, cid, answer = hand
+    before = _counts(cid)
+    _check(client, gid, '1+1')
+    for _ in range(5):
+        _check(client, gid, answer)
+    after = _counts(cid)
+    assert [a - b for a, b in zip(after, before)] == [1, 1, 2, 0]
+
+def test_calibration_no_solve_after_reveal(hand):
+    client, gid, cid, answer = hand
+    before = _counts(cid)
+    client.post('/api/help', json={'guest_id': gid})
+    _check(client, gid, answer)
+    after = _counts(cid)
+    assert [a - b for a, b in zip(after, before)] == [1, 0, 0, 1]
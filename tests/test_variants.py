@@ -0,0 +1,88 @@
+# tests/test_variants.py
+import json
+import threading
+
+import app as webapp
+import calibration
+import core
+from game24 import solver
+
+HANDS = [(1, [1, 2, 3, 4]), (2, [3, 3, 8, 8]), (3, [1, 1, 1, 1])]
+
+def test_worker_solves_in_child_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(solver, 'CACHE_DIR', tmp_path)
+    def in_process(*a, **k):
+        raise AssertionError("a web worker must not solve in-process")
+    monkeypatch.setattr(solver, 'build_catalog', in_process)
+    answers = tmp_path / 'answers.json'
+    answers.write_text(json.dumps([{'case_id': c, 'cards': v, 'solutions': [], 'level': 'hard'} for c, v in HANDS]))
+    base = webapp._build_catalog(answers)
+    monkeypatch.setitem(webapp.VARIANT_CATALOGS, 'nopow', None)
+    webapp._load_variant('nopow', base)
+    digest, cat = webapp.VARIANT_CATALOGS['nopow']
+    assert digest == base.digest and sorted(cat.by_id) == [1, 2, 3]
+    assert cat.get(2)['solutions'] and not cat.get(3)['solutions']
+
+def test_concurrent_builds_solve_once(tmp_path, monkeypatch):
+    calls = []
+    real = solver.build_catalog
+    def counted(*a, **k):
+        calls.append(1)
+        return real(*a, **k)
+    monkeypatch.setattr(solver, 'build_catalog', counted)
+    rules = solver.get_rules('nopow')
+    paths = []
+    ts = [threading.Thread(target=lambda: paths.append(solver.load_or_build(HANDS, rules, tmp_path)))
+          for _ in range(4)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    assert len(set(paths)) == 1 and paths[0].exists()
+    assert len(calls) == 1
+
+def _solvable_without_powers(client, monkeypatch):
+    """A classic hand dealt under 'nopow' (its catalog stubbed by the classic one), and a +-*/ answer."""
+    cat = core.CATALOG
+    monkeypatch.setitem(webapp.VARIANT_CATALOGS, 'nopow', (cat.digest, cat))
+    for p in cat.by_id.values():
+        sols = [s for s in p['solutions'] if '^' not in s and '**' not in s]
+        if sols:
+            r = client.get(f"/api/next?case_id={p['case_id']}&variant=nopow").get_json()
+            assert r['variant'] == 'nopow'
+            return p['case_id'], sols[0]
+    raise AssertionError('catalog has no +-*/ solutions')
+
+def _counts(cid):
+    s = calibration._get(cid)
+    return tuple(getattr(s, k) for k in type(s).__slots__)
+
+def test_variant_play_skips_calibration(client, monkeypatch):
+    cid, answer = _solvable_without_powers(client, monkeypatch)
+    before = _counts(cid)
+    assert client.post('/api/check', json={'answer': '1+1'}).get_json()['ok'] is False
+    assert client.post('/api/check', json={'answer': answer}).get_json()['ok']
+    client.post('/api/help', json={})
+    assert _counts(cid) == before
+
+def test_variant_sticks_only_when_ready(client, monkeypatch):
+    monkeypatch.setitem(webapp.VARIANT_CATALOGS, 'concat', None)
+    monkeypatch.setattr(webapp, '_variant_building', {'concat'})    # "a build is already running"
+    cid = client.get('/api/next?level=easy').get_json()['case_id']
+    assert client.get('/api/next?variant=concat').status_code == 503
+    sid = client.get_cookie('session_id').value
+    state = dict.get(core.SESSIONS, sid)
+    assert state.get('variant', 'classic') == 'classic' and state['current_case_id'] == cid
+    answer = core.CATALOG.get(cid)['solutions'][0]
+    assert client.post('/api/check', json={'answer': answer}).get_json()['ok']
+
+def test_check_uses_the_dealt_variant(client, monkeypatch):
+    cid, answer = _solvable_without_powers(client, monkeypatch)
+    cat = core.CATALOG
+    monkeypatch.setitem(webapp.VARIANT_CATALOGS, 'sqrtfact', (cat.digest, cat))
+    seen = []
+    real = webapp._evaluate_answer
+    monkeypatch.setattr(webapp, '_evaluate_answer', lambda a, v, variant: seen.append(variant) or real(a, v, variant))
+    # switching rules on the check itself does not change the hand's rules
+    assert client.post('/api/check', json={'answer': answer, 'variant': 'sqrtfact'}).get_json()['ok']
+    assert seen == ['nopow']
@@ -0,0 +1,68 @@
+# tools/bench_exprparse.py
+"""
+Benchmark game24.exprparse.parse against ast.parse.
+
+    python tools/bench_exprparse.py            # lengths 10..MAX_EXPR_LEN
+    python tools/bench_exprparse.py --eval     # also safe_eval_bounded end to end
+
+Expressions are random well-formed game expressions grown to each target
+length; both parsers see the same strings (^ spelled ** for ast).
+"""
+import argparse, ast, random, sys, timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from game24.exprparse import parse
+from game24.safety_eval import MAX_EXPR_LEN, safe_eval_bounded
+
+def _term(rng: random.Random, depth: int) -> str:
+    if depth <= 0 or rng.random() < 0.35:
+        return str(rng.randint(1, 13))
+    op = rng.choice(["+", "-", "*", "/", "**"]) if depth > 1 else rng.choice(["+", "-", "*"])
+    left, right = _term(rng, depth - 1), _term(rng, depth - 1) if op != "**" else str(rng.randint(1, 3))
+    return f"({left} {op} {right})" if rng.random() < 0.5 else f"{left} {op} {right}"
+
+def expression(rng: random.Random, length: int) -> str:
+    expr = _term(rng, 2)
+    while len(expr) < length:
+        expr = f"{expr} {rng.choice('+-*')} {_term(rng, 2)}"
+    return expr[:length] if _parses(expr[:length]) else expression(rng, length)
+
+def _parses(expr: str) -> bool:
+    try:
+        parse(expr)
+        ast.parse(expr, mode="eval")
+        return True
+    except (ValueError, SyntaxError):
+        return False
+
+def bench(fn, exprs, number):
+    t = timeit.timeit(lambda: [fn(e) for e in exprs], number=number)
+    return t / (number * len(exprs)) * 1e6
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--samples", type=int, default=50, help="expressions per length")
+    ap.add_argument("--number", type=int, default=40, help="timing repetitions")
+    ap.add_argument("--eval", action="store_true", help="time safe_eval_bounded too")
+    args = ap.parse_args(argv)
+
+    rng = random.Random(24)
+    print(f"{'len':>5} {'ast.parse':>11} {'exprparse':>11} {'speedup':>8}" + ("  safe_eval_bounded" if args.eval else ""))
+    for length in (10, 20, 40, 80, 120, 160, MAX_EXPR_LEN):
+        exprs = [expression(rng, length) for _ in range(args.samples)]
+        t_ast = bench(lambda e: ast.parse(e, mode="eval"), exprs, args.number)
+        t_new = bench(parse, exprs, args.number)
+        line = f"{length:>5} {t_ast:>9.1f}us {t_new:>9.1f}us {t_ast / t_new:>7.2f}x"
+        if args.eval:
+            def _safe(e):
+                try:
+                    safe_eval_bounded(e)
+                except (ValueError, ZeroDivisionError, OverflowError):
+                    pass
+            line += f"  {bench(_safe, exprs, args.number):>9.1f}us"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# tools/build_assets.py
+"""
+Build fingerprinted static assets for the web app.
+
+    python tools/build_assets.py            # writes web/static/dist/ + manifest.json
+
+- card PNGs -> PNG and WebP at several widths, content-hashed names
+- JS / CSS -> hashed copies plus .gz (and .br if `brotli` is installed)
+
+web/app.py picks up dist/manifest.json at startup; without it the app keeps
+serving the original files.
+
+Each build goes to its own directory under dist.builds/ and dist is a symlink
+swapped to it in one rename, so a running server never sees a half-written
+build. The files the previous manifest names are carried into the new build:
+a server still holding that manifest keeps resolving them until it restarts.
+"""
+import argparse, gzip, hashlib, io, json, os, shutil, tempfile
+from pathlib import Path
+
+from PIL import Image
+
+try:
+    import brotli  # optional
+except ImportError:
+    brotli = None
+
+ROOT = Path(__file__).resolve().parent.parent
+STATIC = ROOT / "web" / "static"
+WIDTHS = (100, 150, 200)
+TEXT_FILES = ("js/script.js", "css/style.css")
+
+def _hashed(rel: str, data: bytes, suffix: str = "") -> str:
+    """css/style.css -> css/style.<hash>.css ; suffix goes before the hash."""
+    stem, ext = os.path.splitext(rel)
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    return f"{stem}{suffix}.{digest}{ext}"
+
+def _write(out: Path, rel: str, data: bytes):
+    path = out / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+def _encode(im: Image.Image, fmt: str) -> bytes:
+    buf = io.BytesIO()
+    if fmt == "webp":
+        im.save(buf, "WEBP", quality=85, method=6)
+    else:
+        im.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+def build_images(out: Path, manifest: dict):
+    images = STATIC / "assets" / "images"
+    for src in sorted(images.glob("*/*.png")):
+        rel = src.relative_to(STATIC / "assets").as_posix()   # images/classic/AD.png
+        with Image.open(src) as im:
+            im.load()
+            entry = {"width": im.width, "png": {}, "webp": {}}
+            for w in WIDTHS:
+                if w > im.width:
+                    continue
+                scaled = im if w == im.width else im.resize((w, round(im.height * w / im.width)), Image.LANCZOS)
+                for fmt in ("png", "webp"):
+                    data = _encode(scaled, fmt)
+                    name = _hashed(os.path.splitext(rel)[0] + f".{fmt}", data, suffix=f"-{w}")
+                    _write(out, name, data)
+                    entry[fmt][str(w)] = name
+        manifest[rel] = entry
+
+def build_text(out: Path, manifest: dict):
+    for rel in TEXT_FILES:
+        data = (STATIC / rel).read_bytes()
+        name = _hashed(rel, data)
+        _write(out, name, data)
+        encodings = ["gzip"]
+        _write(out, name + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write(out, name + ".br", brotli.compress(data, quality=11))
+            encodings.append("br")
+        manifest[rel] = {"file": name, "encodings": encodings}
+
+def _manifest_files(manifest: dict):
+    """Every file a manifest points at (relative to its build directory)."""
+    for entry in manifest.values():
+        if "file" in entry:
+            yield entry["file"]
+            yield from (entry["file"] + {"gzip": ".gz", "br": ".br"}[e] for e in entry.get("encodings", ()))
+        for fmt in ("png", "webp"):
+            yield from entry.get(fmt, {}).values()
+
+def _carry_previous(live: Path, stage: Path):
+    """Link (or copy) the live build's files into stage; returns how many were carried."""
+    try:
+        previous = json.loads((live / "manifest.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return 0
+    n = 0
+    for rel in _manifest_files(previous):
+        src, dst = live / rel, stage / rel
+        if dst.exists() or not src.exists():
+            continue
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+        n += 1
+    return n
+
+def _swap(out: Path, stage: Path):
+    """Point out at stage in one rename; drop builds nothing points at any more."""
+    builds = stage.parent
+    if out.exists() and not out.is_symlink():
+        # a plain directory from an older build script: the one non-atomic step
+        out.rename(builds / f"legacy-{os.getpid()}")
+    link = builds / f".link-{os.getpid()}"
+    link.symlink_to(os.path.relpath(stage, out.parent), target_is_directory=True)
+    os.replace(link, out)
+    for old in builds.iterdir():
+        if old != stage and old.is_dir():
+            shutil.rmtree(old, ignore_errors=True)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--out", default=str(STATIC / "dist"))
+    args = ap.parse_args(argv)
+
+    out = Path(args.out)
+    builds = out.parent / f"{out.name}.builds"
+    builds.mkdir(parents=True, exist_ok=True)
+    stage = Path(tempfile.mkdtemp(prefix="build-", dir=builds))
+    os.chmod(stage, 0o755)
+    manifest = {}
+    build_images(stage, manifest)
+    build_text(stage, manifest)
+    carried = _carry_previous(out, stage) if out.exists() else 0
+    (stage / "manifest.json").write_text(json.dumps(manifest, indent=1, sort_keys=True), encoding="utf-8")
+    total = sum(f.stat().st_size for f in stage.rglob("*") if f.is_file())
+    _swap(out, stage)
+    print(f"wrote {len(manifest)} assets ({total / 1024:.0f} KiB, {carried} files kept from the last build) to {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# web/admission.py
+import threading, time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# ---- per-session admission control: token buckets + coalescing of duplicate in-flight requests ----
+# Buckets live in the worker process; with N gunicorn workers a client gets up to N x the rate.
+IDLE_SECS = 300         # forget buckets untouched this long (they would be full again anyway)
+PRUNE_EVERY = 1024      # admit() calls between idle sweeps
+
+class TokenBucket:
+    __slots__ = ('tokens', 'stamp')
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.stamp = now
+
+class Limiter:
+    """
+    rate tokens/second refill, up to burst. admit() charges every key it is given
+    (session and guest), so rotating one of them does not reset the budget.
+    """
+    def __init__(self, rate: float = 5.0, burst: float = 20.0):
+        self.lock = threading.Lock()
+        self.buckets: Dict[Hashable, TokenBucket] = {}
+        self.calls = 0
+        self.rejected = 0
+        self.rate = self.burst = 0.0
+        self.configure(rate, burst)
+
+    def configure(self, rate=None, burst=None) -> Dict[str, Any]:
+        """Change rate (0 = off) and/or burst; buckets restart full. Raises ValueError."""
+        rate = self.rate if rate is None else float(rate)
+        burst = self.burst if burst is None else float(burst)
+        if rate < 0 or burst < 1:
+            raise ValueError("rate must be >= 0 and burst >= 1")
+        with self.lock:
+            self.rate, self.burst = rate, burst
+            self.buckets.clear()
+        return self.status()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def admit(self, keys, cost: float = 1.0) -> Tuple[bool, float]:
+        """(True, 0) and charge cost to every key, or (False, seconds until it would fit)."""
+        if not self.enabled:
+            return True, 0.0
+        now = time.monotonic()
+        with self.lock:
+            self.calls += 1
+            if self.calls % PRUNE_EVERY == 0:
+                self._prune(now)
+            picked = []
+            wait = 0.0
+            for key in keys:
+                if key is None:
+                    continue
+                b = self.buckets.get(key)
+                if b is None:
+                    b = self.buckets[key] = TokenBucket(self.burst, now)
+                else:
+                    b.tokens = min(self.burst, b.tokens + (now - b.stamp) * self.rate)
+                    b.stamp = now
+                if b.tokens < cost:
+                    wait = max(wait, (cost - b.tokens) / self.rate)
+                picked.append(b)
+            if wait:
+                self.rejected += 1
+                return False, wait
+            for b in picked:
+                b.tokens -= cost
+            return True, 0.0
+
+    def _prune(self, now: float) -> None:
+        stale = [k for k, b in self.buckets.items() if now - b.stamp > IDLE_SECS]
+        for k in stale:
+            del self.buckets[k]
+
+    def status(self) -> Dict[str, Any]:
+        return {'enabled': self.enabled, 'rate': self.rate, 'burst': self.burst, 'keys': len(self.buckets),
+                'calls': self.calls, 'rejected': self.rejected}
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error', 'joined')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.joined = 0
+
+class Coalescer:
+    """
+    run(key, fn): the first caller for key runs fn; callers arriving while it is
+    still running wait and get the same result (or exception). Nothing is cached
+    after it finishes, so a later identical request does the work again.
+    """
+    def __init__(self, timeout: float = 30.0):
+        self.lock = threading.Lock()
+        self.flights: Dict[Hashable, _Flight] = {}
+        self.timeout = timeout
+        self.shared = 0
+
+    def run(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """(result, shared) - shared is True for callers that piggybacked on another's work."""
+        with self.lock:
+            f = self.flights.get(key)
+            leader = f is None
+            if leader:
+                f = self.flights[key] = _Flight()
+            else:
+                f.joined += 1
+                self.shared += 1
+        if not leader:
+            if not f.done.wait(self.timeout):
+                raise TimeoutError("coalesced request timed out")
+            if f.error is not None:
+                raise f.error
+            return f.result, True
+        try:
+            f.result = fn()
+            return f.result, False
+        except BaseException as e:
+            f.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            f.done.set()
+
+    def status(self) -> Dict[str, Any]:
+        return {'in_flight': len(self.flights), 'shared': self.shared}
+
+LIMITER = Limiter()
+COALESCER = Coalescer()
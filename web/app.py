@@ -1,21 +1,56 @@
 # web/app.py
-from flask import Flask, request, jsonify, make_response, send_file
-import json, random, time, ast
+from flask import Flask, Response, request, jsonify, make_response, send_file, send_from_directory, abort, g
+import json, random, time, sys, math, mimetypes, gc, importlib.util, os, hashlib, hmac, subprocess, threading
+_T_IMPORT_START = time.perf_counter()
 from pathlib import Path
 from typing import List, Dict, Any, Optional
+from functools import wraps
 
-import core  # our helpers/state module
+# game24/ sits next to web/; make it importable when run as `python web/app.py`
+_ROOT = str(Path(__file__).resolve().parent.parent)
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
 
-# ---- optional imports from your original logic ----
-try:
-    from game24.complexity import puzzle_has_simple_solution as _simple_fn  # type: ignore
-    from game24.complexity import puzzle_has_hard_solution   as _hard_fn    # type: ignore
-except Exception:
-    _simple_fn = None
-    _hard_fn = None
+from game24.exprparse import parse as parse_expr, evaluate as eval_expr
+
+import core  # our helpers/state module
+import review
+import leaderboard
+import calibration
+import events
+import engines
+from profiling import PROFILER
+from admission import LIMITER, COALESCER
+from snapshot import SNAPSHOTS
+import outcomes
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
 
+@app.before_request
+def _ensure_init():
+    # registered first: servers that import app:app without calling init_app()
+    if not _ready:
+        init_app(freeze=False)
+
+# ---- optional imports, resolved on first use ----
+_handimg = None
+def _hand_renderer():
+    """web/handimg.py pulls in Pillow; only import it when a hand image is asked for."""
+    global _handimg
+    if _handimg is None:
+        import handimg
+        _handimg = handimg
+    return _handimg
+
+_solver = None
+def _solver_mod():
+    """game24/solver.py is only needed once someone plays a non-classic variant."""
+    global _solver
+    if _solver is None:
+        from game24 import solver
+        _solver = solver
+    return _solver
+
 # ---------- load puzzles ----------
 def _answers_path():
     here = Path(__file__).parent
@@ -23,42 +58,36 @@ def _answers_path():
     if p.exists(): return p
     raise FileNotFoundError("answers.json not found at web/static/answers.json")
 
-ANSWERS_PATH = _answers_path()
-with open(ANSWERS_PATH, encoding='utf-8') as f:
-    ALL_PUZZLES: List[Dict[str, Any]] = json.load(f)
-
 def _values_key(cards: List[int]) -> str:
     return "-".join(map(str, sorted(map(int, cards or []))))
 
-# Fast lookups
-core.PUZZLES_BY_ID  = {int(p['case_id']): p for p in ALL_PUZZLES}
-core.PUZZLES_BY_KEY = {_values_key(p['cards']): p for p in ALL_PUZZLES}
+def _freeze_puzzle(p: Dict[str, Any]) -> Dict[str, Any]:
+    """Tuples of ints/strs are untracked by the GC, so forked workers never write to them."""
+    p['cards'] = tuple(int(x) for x in p.get('cards') or ())
+    p['solutions'] = tuple(p.get('solutions') or ())
+    return p
+
+def _load_puzzles(path) -> List[Dict[str, Any]]:
+    with open(path, encoding='utf-8') as f:
+        return [_freeze_puzzle(p) for p in json.load(f)]
 
-app.logger.debug(f"I loaded total {len(ALL_PUZZLES)} puzzles from {ANSWERS_PATH}")
 assets_dir = Path(app.static_folder) / 'assets' / 'images'
-app.logger.debug(f"picutures are here: {assets_dir}")
+DEFAULT_THEME = 'classic'
 
 # ---------- helpers for preprocessing into pools ----------
 def has_solution(p: Dict[str,Any]) -> bool:
     return bool(p.get('solutions'))
 
+# Pools split medium hands on '^' in a stored solution. (game24.picker has
+# complexity-score versions; switching would reshuffle every pool and so
+# every seeded competition sequence.)
 def puzzle_has_simple_solution(p: Dict[str,Any]) -> bool:
-    if _simple_fn:
-        try:
-            return bool(_simple_fn(p))
-        except Exception:
-            pass
     for s in (p.get('solutions') or []):
         if '^' not in s:
             return True
     return False
 
 def puzzle_has_hard_solution(p: Dict[str,Any]) -> bool:
-    if _hard_fn:
-        try:
-            return bool(_hard_fn(p))
-        except Exception:
-            pass
     for s in (p.get('solutions') or []):
         if '^' in s:
             return True
@@ -69,7 +98,7 @@ def _build_index(puzzles: List[Dict[str,Any]]):
     for p in puzzles:
         vals = list(map(int, p.get('cards') or []))
         key = _values_key(vals)
-        idx.append((p, vals, key))
+        idx.append((p, tuple(vals), key))
     return idx
 
 def pre_process_pool(puzzles: List[Dict[str,Any]]):
@@ -108,46 +137,412 @@ def pre_process_pool(puzzles: List[Dict[str,Any]]):
     )
 
     return {
-        'nosol': nosol_pool,
-        'easy_like': easy_like,
-        'medium': med_pool,
-        'hard_like': hard_like,
+        'nosol': tuple(nosol_pool),
+        'easy_like': tuple(easy_like),
+        'medium': tuple(med_pool),
+        'hard_like': tuple(hard_like),
     }
 
-# Build once at startup
-POOLS_ADV = pre_process_pool(ALL_PUZZLES)
+LEVEL_TO_POOL = {'easy': 'easy_like', 'medium': 'medium', 'hard': 'hard_like'}
+
+def recalibrate_pools(overrides: Dict[int,str]):
+    """
+    Rebuild the solvable buckets from the catalog's base pools with observed
+    levels applied, then publish them with a single reference swap. Seeded
+    sequences keep using pool_ids so shared competitions stay reproducible.
+    """
+    cat = core.CATALOG
+    moved = {cid: LEVEL_TO_POOL[lvl] for cid, lvl in overrides.items()
+             if cid in cat.index_by_id and has_solution(cat.index_by_id[cid][0])}
+    pools = {'nosol': cat.pools_base['nosol']}
+    for name in ('easy_like', 'medium', 'hard_like'):
+        keep = [t for t in cat.pools_base[name] if moved.get(int(t[0]['case_id']), name) == name]
+        have = {int(t[0]['case_id']) for t in keep}
+        keep += [cat.index_by_id[cid] for cid, to in moved.items() if to == name and cid not in have]
+        pools[name] = tuple(keep)
+    cat.pools = pools
+    app.logger.debug("recalibrated pools: %s (%d cases moved)",
+                     {k: len(v) for k, v in pools.items()}, len(moved))
+
+# ---------- catalog build / hot reload ----------
+RETIRED_MAX = 20000    # dropped cases a reload keeps resolvable for sessions that still hold them
+
+def _build_catalog(path, prev: Optional[core.Catalog] = None) -> core.Catalog:
+    """Parse answers.json and derive every index; touches no live state."""
+    raw = Path(path).read_bytes()
+    puzzles = [_freeze_puzzle(p) for p in json.loads(raw)]
+    if not puzzles:
+        raise ValueError(f"{path} has no puzzles")
+    by_id = {int(p['case_id']): p for p in puzzles}
+    by_key = {_values_key(p['cards']): p for p in puzzles}
+    index_by_id = {int(t[0]['case_id']): t for t in _build_index(puzzles)}
+    retired = {}
+    if prev is not None:
+        # sessions may still hold ids this version dropped; keep the latest RETIRED_MAX
+        retired = {cid: p for cid, p in prev.retired.items() if cid not in by_id}
+        retired.update((cid, p) for cid, p in prev.by_id.items() if cid not in by_id)
+        if len(retired) > RETIRED_MAX:
+            retired = dict(list(retired.items())[-RETIRED_MAX:])
+    return core.Catalog(puzzles, by_id, by_key, index_by_id, pre_process_pool(puzzles),
+                        version=(prev.version + 1) if prev else 1,
+                        digest=hashlib.sha256(raw).hexdigest(), retired=retired)
+
+_reload_lock = threading.Lock()
+
+def reload_catalog(path=None, force: bool = False) -> Dict[str, Any]:
+    """
+    Build a new catalog off the request path and publish it with one assignment
+    to core.CATALOG. Readers never wait: they keep whichever object they read.
+    A broken file leaves the current catalog in place.
+    """
+    path = Path(path or ANSWERS_PATH)
+    with _reload_lock:
+        prev = core.CATALOG
+        if not force and prev is not None:
+            digest = hashlib.sha256(path.read_bytes()).hexdigest()
+            if digest == prev.digest:
+                return {'reloaded': False, 'version': prev.version, 'puzzles': len(prev.puzzles)}
+        cat = _build_catalog(path, prev)
+        core.CATALOG = cat
+    # No gc.unfreeze(): the old catalog has no reference cycles, so refcounting
+    # frees it once the last reader lets go even though it sits in the frozen
+    # generation, and everything else startup froze stays shared.
+    app.logger.info("catalog v%d published: %d puzzles (%d retired)",
+                    cat.version, len(cat.puzzles), len(cat.retired))
+    return {'reloaded': True, 'version': cat.version, 'puzzles': len(cat.puzzles), 'retired': len(cat.retired)}
+
+# ---------- rule variants (game24/solver.py) ----------
+# name -> (classic digest it was solved from, Catalog). Case ids are shared with
+# the classic catalog, so pools, reviews and reports work across variants.
+VARIANT_CATALOGS: Dict[str, tuple] = {}
+_variant_building = set()
+_variant_lock = threading.Lock()
+
+VARIANT_BUILD_WORKERS = max(1, (os.cpu_count() or 2) // 2)   # solver processes for a cache miss
+
+def _load_variant(name: str, base: core.Catalog):
+    """
+    Workers only load solved catalogs. A cache miss runs `python -m game24
+    variant` in a child process over exactly base's hands: the solve stays off
+    this process's GIL, and the solver's file lock makes workers that miss
+    together wait for one build.
+    """
+    solver = _solver_mod()
+    try:
+        rules = solver.get_rules(name)
+        hands = [(int(p['case_id']), list(p['cards'])) for p in base.puzzles]
+        path = solver.cache_path(hands, rules)
+        if not path.exists():
+            _build_variant_in_child(name, hands, path)
+        VARIANT_CATALOGS[name] = (base.digest, _build_catalog(path))
+        app.logger.info("variant %r ready from %s", name, path)
+    except Exception as e:
+        app.logger.error("variant %r failed to build: %s", name, e)
+    finally:
+        with _variant_lock:
+            _variant_building.discard(name)
+
+def _build_variant_in_child(name: str, hands, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    spec = path.with_suffix(f".{os.getpid()}.hands.json")
+    spec.write_text(json.dumps([{'case_id': cid, 'cards': cards} for cid, cards in hands]), encoding='utf-8')
+    try:
+        t0 = time.perf_counter()
+        done = subprocess.run([sys.executable, '-m', 'game24', 'variant', name, '--answers', str(spec),
+                               '--cache-dir', str(path.parent), '--workers', str(VARIANT_BUILD_WORKERS)],
+                              cwd=_ROOT, capture_output=True, text=True)
+    finally:
+        spec.unlink(missing_ok=True)
+    if done.returncode != 0 or not path.exists():
+        raise RuntimeError(f"solver exited {done.returncode}: {done.stderr.strip()[-500:]}")
+    app.logger.info("variant %r solved in a child process in %.1f s", name, time.perf_counter() - t0)
+
+def _variant_catalog(name: str) -> Optional[core.Catalog]:
+    """
+    classic -> core.CATALOG. Other variants come from the solver's on-disk cache
+    (built ahead of time with `python -m game24 variant NAME`, or by a child
+    process on the first miss); a miss starts a background load and returns
+    None until it is published.
+    """
+    base = core.CATALOG
+    if name == 'classic':
+        return base
+    entry = VARIANT_CATALOGS.get(name)
+    if entry is not None and entry[0] == base.digest:
+        return entry[1]
+    with _variant_lock:
+        if name not in _variant_building:
+            _variant_building.add(name)
+            threading.Thread(target=_load_variant, args=(name, base), name=f'variant-{name}', daemon=True).start()
+    return entry[1] if entry is not None else None   # stale but consistent until the rebuild lands
+
+def _request_variant(raw, state: Dict[str,Any]) -> str:
+    """
+    Explicit variant wins; otherwise the session's last one. The caller stores it
+    on the session only once its catalog is ready (Game24Engine.catalog).
+    """
+    name = str(raw or state.get('variant') or 'classic').strip().lower()
+    if name != 'classic':
+        _solver_mod().get_rules(name)   # KeyError on unknown names
+    return name
+
+def _not_ready(e: engines.NotReady):
+    resp = jsonify({'error': f'{e.what} is being prepared, try again shortly', 'retry_after': e.retry_after})
+    resp.status_code = 503
+    resp.headers['Retry-After'] = str(e.retry_after)
+    return resp
+
+CATALOG_WATCH_SECS = float(os.environ.get('PUZZLEBOOK_WATCH_CATALOG') or 0)
+_watcher_pid = None
+
+def _watch_catalog():
+    last = ANSWERS_PATH.stat().st_mtime
+    while True:
+        time.sleep(CATALOG_WATCH_SECS)
+        try:
+            mtime = ANSWERS_PATH.stat().st_mtime
+            if mtime != last:
+                last = mtime
+                reload_catalog()
+        except Exception as e:
+            app.logger.error("catalog reload failed, keeping v%d: %s", core.CATALOG.version, e)
+
+@app.before_request
+def _ensure_catalog_watcher():
+    # threads don't survive fork, so each worker starts its own on first request
+    global _watcher_pid
+    if CATALOG_WATCH_SECS > 0 and _watcher_pid != os.getpid():
+        _watcher_pid = os.getpid()
+        threading.Thread(target=_watch_catalog, name='catalog-watch', daemon=True).start()
+
+def _is_admin(req) -> bool:
+    """
+    X-Admin-Token must match ADMIN_TOKEN. Without a token everything is denied;
+    PUZZLEBOOK_ADMIN_LOCAL=1 lets loopback in for local development (never set
+    it behind a proxy: every proxied request comes from loopback).
+    """
+    token = os.environ.get('ADMIN_TOKEN')
+    if token:
+        return hmac.compare_digest(req.headers.get('X-Admin-Token', ''), token)
+    if os.environ.get('PUZZLEBOOK_ADMIN_LOCAL') == '1':
+        return req.remote_addr in ('127.0.0.1', '::1')
+    return False
+
+# ---------- request profiling (off unless switched on via /api/admin/profile) ----------
+# PUZZLEBOOK_PROFILE=cprofile:0.05 or sample:0.2 turns it on at startup
+_prof_env = os.environ.get('PUZZLEBOOK_PROFILE')
+if _prof_env:
+    _mode, _, _rate = _prof_env.partition(':')
+    PROFILER.configure(enabled=True, mode=_mode or 'cprofile', rate=_rate or None)
+
+@app.before_request
+def _profile_start():
+    if PROFILER.enabled:
+        g.profile = PROFILER.start(request.url_rule.rule if request.url_rule else request.path)
+
+@app.teardown_request
+def _profile_finish(exc):
+    token = g.pop('profile', None)
+    if token is not None:
+        PROFILER.finish(token)
+
+# ---------- session snapshots (off unless PUZZLEBOOK_SNAPSHOT_DIR is set) ----------
+# restored in init_app; each process appends what changed every PUZZLEBOOK_SNAPSHOT_SECS
+# and on SIGTERM / worker exit (gunicorn.conf.py)
+SNAPSHOTS.configure(os.environ.get('PUZZLEBOOK_SNAPSHOT_DIR'),
+                    interval=os.environ.get('PUZZLEBOOK_SNAPSHOT_SECS'),
+                    max_age_days=os.environ.get('PUZZLEBOOK_SNAPSHOT_MAX_AGE_DAYS'))
+
+def _thaw_failed(sid, e):
+    app.logger.error("restored session %s kept cold, it did not decode: %s: %s", sid, type(e).__name__, e)
+
+core.SESSIONS.on_error = _thaw_failed
+
+@app.before_request
+def _ensure_snapshot_writer():
+    SNAPSHOTS.start()
+
+# ---------- per-case outcome rows (admin reports; spilled to PUZZLEBOOK_OUTCOMES_DIR if set) ----------
+# the chunk still filling is written every PUZZLEBOOK_OUTCOMES_FLUSH_SECS and on worker exit
+outcomes.STORE.configure(os.environ.get('PUZZLEBOOK_OUTCOMES_DIR'),
+                         interval=os.environ.get('PUZZLEBOOK_OUTCOMES_FLUSH_SECS'))
+
+@app.before_request
+def _ensure_outcome_flusher():
+    outcomes.STORE.start()
+
+def _record_outcome(engine, state, action, puzzle=None):
+    """
+    One row for the default game's current hand; other games' case ids would
+    collide. 'correct' is the hand's first unrevealed solve only, like the boards.
+    """
+    cid = state.get('current_case_id')
+    if engine.name != engines.DEFAULT or not cid:
+        return
+    if action == 'correct' and (state.get('hand_solved') or state.get('hand_revealed')):
+        return
+    level = state.get('current_effective_level') or (puzzle and puzzle.get('level'))
+    outcomes.STORE.record(cid, level, action, state.get('hand_attempts', 0))
+
+# ---------- admission control (per-session token buckets + duplicate coalescing) ----------
+# PUZZLEBOOK_ADMISSION=rate:burst (default 5:20), 0 or off to disable
+# PUZZLEBOOK_TRUSTED_PROXIES=N: the client address is the Nth X-Forwarded-For hop from the end
+HELP_ALL_COST = 4       # the full solution list is the expensive help
+_adm_env = (os.environ.get('PUZZLEBOOK_ADMISSION') or '').strip().lower()
+try:
+    if _adm_env in ('0', 'off'):
+        LIMITER.configure(rate=0)
+    elif _adm_env:
+        _rate, _, _burst = _adm_env.partition(':')
+        LIMITER.configure(rate=_rate, burst=_burst or None)
+except ValueError as e:
+    app.logger.error("PUZZLEBOOK_ADMISSION=%r ignored (%s); using %s:%s",
+                     _adm_env, e, LIMITER.rate, LIMITER.burst)
+try:
+    TRUSTED_PROXIES = max(0, int(os.environ.get('PUZZLEBOOK_TRUSTED_PROXIES') or 0))
+except ValueError:
+    app.logger.error("PUZZLEBOOK_TRUSTED_PROXIES=%r is not an integer; using the socket address",
+                     os.environ.get('PUZZLEBOOK_TRUSTED_PROXIES'))
+    TRUSTED_PROXIES = 0
+
+def _client_addr(req) -> Optional[str]:
+    if TRUSTED_PROXIES:
+        hops = [h.strip() for h in req.headers.get('X-Forwarded-For', '').split(',') if h.strip()]
+        if len(hops) >= TRUSTED_PROXIES:
+            return hops[-TRUSTED_PROXIES]
+    return req.remote_addr
+
+def _admission_key(req):
+    """The browser's session cookie (not the per-tab sid, which the client picks); its address without one."""
+    cookie = req.cookies.get('session_id')
+    return f"s:{cookie}" if cookie else f"ip:{_client_addr(req)}"
+
+def _admitted(cost=lambda data: 1):
+    """
+    Guard a game endpoint. Identical requests from one session that arrive while
+    the first is still running (same route, query incl. seq, and body) share its
+    response; anything else is charged cost(json body) against the session (or,
+    with no cookie yet, client address) and guest buckets and gets a cheap 429
+    when they are empty.
+    """
+    def wrap(view):
+        @wraps(view)
+        def guarded(*args, **kwargs):
+            sid = core.get_or_create_session_id(request)
+            key = (sid, request.path, request.query_string, request.get_data())
+
+            def work():
+                data = request.get_json(silent=True) or {}
+                gid = core.get_guest_id(request)
+                ok, wait = LIMITER.admit((_admission_key(request), gid and f"g:{gid}"), cost(data))
+                if not ok:
+                    resp = jsonify({'error': 'Too many requests', 'retry_after': math.ceil(wait)})
+                    resp.status_code = 429
+                    resp.headers['Retry-After'] = str(math.ceil(wait))
+                else:
+                    resp = app.make_response(view(*args, **kwargs))
+                return resp.get_data(), resp.status_code, list(resp.headers.items())
+
+            (body, status, headers), shared = COALESCER.run(key, work)
+            resp = Response(body, status, headers)
+            if shared:
+                resp.headers['X-Coalesced'] = '1'
+            return resp
+        return guarded
+    return wrap
+
+# ---------- fingerprinted assets (tools/build_assets.py) ----------
+DIST_DIR = Path(app.static_folder) / 'dist'
+DIST_URL = '/static/dist'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+def _load_manifest() -> Dict[str, Any]:
+    mf = DIST_DIR / 'manifest.json'
+    if not mf.exists():
+        return {}
+    with open(mf, encoding='utf-8') as f:
+        return json.load(f)
+
+def _index_html() -> str:
+    html = (Path(app.static_folder) / 'index.html').read_text(encoding='utf-8')
+    for rel in ('css/style.css', 'js/script.js'):
+        entry = ASSET_MANIFEST.get(rel)
+        if entry:
+            html = html.replace(f'static/{rel}', f"{DIST_URL}/{entry['file']}")
+    return html
 
 # ---------- image helpers ----------
 SUITS = ['D','S','H','C']
 def _rank_code(n: int) -> str:
     return {1:'A',10:'T',11:'J',12:'Q',13:'K'}.get(n, str(n))
 
+def _effective_theme(theme: str) -> str:
+    # themes offered in the UI but not installed fall back to the default deck
+    return theme if ASSETS.has_theme(theme) else DEFAULT_THEME
+
+# per-card images (with the build's srcset) unless a client asks for ?sprite=1
+# or PUZZLEBOOK_HAND_SPRITE=1 makes the one-request hand sprite the default
+HAND_SPRITE = os.environ.get('PUZZLEBOOK_HAND_SPRITE') == '1'
+
+def _hand_url(images: List[Dict[str, str]], theme: str, fmt: str = 'webp', width=None) -> Optional[str]:
+    """One composited sprite for the whole hand (see /hand/...); width snaps to handimg.WIDTHS, default the largest."""
+    if not HAVE_PILLOW:
+        return None
+    h = _hand_renderer()
+    try:
+        w = h.snap_width(width) if width else h.WIDTHS[-1]
+    except (TypeError, ValueError):
+        w = h.WIDTHS[-1]
+    codes = "-".join(i['code'] for i in images)
+    return f"/hand/{_effective_theme(theme)}/{codes}.{fmt}?w={w}"
+
+def _hand_sprite(images: List[Dict[str, str]], theme: str, params) -> Dict[str, Any]:
+    """hand_url (WebP) and hand_url_png for clients that opted into the sprite; {} otherwise."""
+    want = params.get('sprite')
+    if not (HAND_SPRITE if want is None else want in ('1', 'true')):
+        return {}
+    url = _hand_url(images, theme, width=params.get('w'))
+    if url is None:
+        return {}
+    return {'hand_url': url, 'hand_url_png': _hand_url(images, theme, fmt='png', width=params.get('w'))}
+
 def _cards_to_images(cards: List[int], theme: str) -> List[Dict[str, str]]:
+    theme = _effective_theme(theme)
     out = []
     for i, n in enumerate(cards):
         rank = _rank_code(n)
         suit = SUITS[i % len(SUITS)]
         code = f"{rank}{suit}"
-        url = f"/static/assets/images/{theme}/{code}.png"
-        out.append({'code': code, 'url': url})
+        asset = ASSETS.resolve(theme, code)
+        url = asset['url'] if asset else f"/static/assets/images/{theme}/{code}.png"
+        item = {'code': code, 'url': url}
+        built = ASSET_MANIFEST.get(f"images/{theme}/{code}.png")
+        if built and built.get('png'):
+            widths = sorted(built['png'], key=int)
+            item['url'] = f"{DIST_URL}/{built['png'][widths[-1]]}"
+            item['srcset'] = ", ".join(f"{DIST_URL}/{built['webp'][w]} {w}w" for w in sorted(built['webp'], key=int))
+        out.append(item)
     return out
 
 # ----- safe expression eval for /api/check -----
-ALLOWED_NODES = (
-    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Num, ast.Constant,
-    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd,
-    ast.Load, ast.Name
-)
 ALLOWED_NAMES = { 'A':1, 'T':10, 'J':11, 'Q':12, 'K':13 }
 def safe_eval(expr: str) -> float:
-    tree = ast.parse(expr, mode='eval')
-    for node in ast.walk(tree):
-        if not isinstance(node, ALLOWED_NODES):
-            raise ValueError(f"Illegal expression: {type(node).__name__}")
-        if isinstance(node, ast.Name) and node.id not in ALLOWED_NAMES:
-            raise ValueError(f"Unknown identifier: {node.id}")
-    code = compile(tree, "<expr>", "eval")
-    return float(eval(code, {"__builtins__": {}}, ALLOWED_NAMES))
+    tree = parse_expr(expr)   # ParseError (a ValueError) carries the column
+    for name in tree.names():
+        if name not in ALLOWED_NAMES:
+            raise ValueError(f"Unknown identifier: {name}")
+    return eval_expr(tree, names=ALLOWED_NAMES)
+
+def _evaluate_answer(ans: str, values: List[int], variant: str):
+    """(value, None) when it makes 24, (value, reason) when not; raises on invalid input."""
+    if variant == 'classic':
+        value = safe_eval(ans)
+        return value, (None if abs(value - 24.0) < 1e-6 else 'Not 24')
+    solver = _solver_mod()
+    ok, value, reason = solver.check(ans, values, solver.get_rules(variant))
+    if value is None:
+        raise ValueError(reason)
+    return value, (None if ok else reason)
 
 # ---------- level normalization ----------
 LEVEL_ALIASES = {
@@ -162,10 +557,11 @@ def normalize_level(level: str) -> str:
     return LEVEL_ALIASES.get(str(level).lower(), str(level).lower())
 
 # ---------- selection using preprocessed pools ----------
-def _pick_from_pool_name(pool_name: str, state: Dict[str,Any]) -> Dict[str,Any]:
-    pool = POOLS_ADV.get(pool_name, [])
+def _pick_from_pool_name(pool_name: str, state: Dict[str,Any], catalog: Optional[core.Catalog] = None) -> Dict[str,Any]:
+    pools = (catalog or core.CATALOG).pools
+    pool = pools.get(pool_name, [])
     if not pool:
-        pool = POOLS_ADV['medium']
+        pool = pools['medium']
 
     recent = set(state.get('recent_keys', [])[-50:])
     candidates = [t for t in pool if t[2] not in recent] or pool
@@ -175,15 +571,146 @@ def _pick_from_pool_name(pool_name: str, state: Dict[str,Any]) -> Dict[str,Any]:
         state['recent_keys'] = state['recent_keys'][-100:]
     return choice[0]  # puzzle dict
 
-def _random_pick_by_level(level: str, state: Dict[str,Any]) -> Dict[str,Any]:
+def _random_pick_by_level(level: str, state: Dict[str,Any], catalog: Optional[core.Catalog] = None) -> Dict[str,Any]:
     lvl = normalize_level(level)
     if lvl in ('challenge','nosol'):
-        return _pick_from_pool_name('nosol', state)
+        return _pick_from_pool_name('nosol', state, catalog)
     if lvl == 'hard':
-        return _pick_from_pool_name('hard_like', state)
+        return _pick_from_pool_name('hard_like', state, catalog)
     if lvl == 'easy':
-        return _pick_from_pool_name('easy_like', state)
-    return _pick_from_pool_name('medium', state)
+        return _pick_from_pool_name('easy_like', state, catalog)
+    return _pick_from_pool_name('medium', state, catalog)
+
+# ---------- server-side stratified pools (custom / competition) ----------
+MIX_ALIASES = {
+    'easy': 'easy_like', 'easy_like': 'easy_like',
+    'medium': 'medium',
+    'hard': 'hard_like', 'hard_like': 'hard_like',
+    'challenge': 'nosol', 'nosol': 'nosol',
+}
+MAX_POOL_SIZE = 500
+
+def _normalize_mix(mix: Dict[str,Any]) -> Dict[str,float]:
+    """{'easy': 40, 'hard_like': 20, ...} -> {pool_name: weight}; unknown names are an error."""
+    if not isinstance(mix, dict):
+        raise ValueError("mix must be an object of {level: weight}")
+    out: Dict[str,float] = {}
+    for name, w in mix.items():
+        pool_name = MIX_ALIASES.get(str(name).strip().lower())
+        if pool_name is None:
+            raise ValueError(f"Unknown pool in mix: {name}")
+        w = float(w)
+        if w < 0:
+            raise ValueError(f"Negative weight for {name}")
+        if w > 0:
+            out[pool_name] = out.get(pool_name, 0.0) + w
+    if not out:
+        raise ValueError("mix must have at least one positive weight")
+    return out
+
+def _apportion(weights: Dict[str,float], size: int) -> Dict[str,int]:
+    """Largest-remainder split of size over weights (weights need not sum to 100)."""
+    total = sum(weights.values())
+    exact = {k: size * w / total for k, w in weights.items()}
+    counts = {k: int(v) for k, v in exact.items()}
+    short = size - sum(counts.values())
+    for k in sorted(exact, key=lambda k: exact[k] - counts[k], reverse=True)[:short]:
+        counts[k] += 1
+    return counts
+
+def _draw_distinct(pool: List[tuple], k: int, rng: random.Random, taken: set) -> List[int]:
+    """
+    Lazy partial Fisher-Yates over pool: draws without replacement in O(draws),
+    skipping case_ids already taken from an overlapping bucket.
+    """
+    out = []
+    swapped = {}  # position -> index it now holds
+    n = len(pool)
+    i = 0
+    while len(out) < k and i < n:
+        j = rng.randrange(i, n)
+        pick = swapped.get(j, j)
+        swapped[j] = swapped.get(i, i)
+        i += 1
+        cid = int(pool[pick][0]['case_id'])
+        if cid not in taken:
+            taken.add(cid)
+            out.append(cid)
+    return out
+
+def _build_stratified_pool(mix: Dict[str,Any], size: int, seed=None, strict: bool = False):
+    """
+    Sample size case_ids from the level pools according to mix; same seed -> same
+    pool. Returns (ids, {pool: {'requested', 'delivered'}}). A bucket that comes
+    up short (hard_like is small) is topped up from the others, heaviest first;
+    with strict that is a ValueError instead.
+    """
+    pools = core.CATALOG.pools
+    weights = _normalize_mix(mix)
+    rng = random.Random(seed)
+    taken: set = set()
+    ids: List[int] = []
+    strata = {}
+    for name, k in _apportion(weights, size).items():
+        got = _draw_distinct(pools.get(name, ()), k, rng, taken)
+        strata[name] = {'requested': k, 'delivered': len(got)}
+        ids += got
+    short = {name: s for name, s in strata.items() if s['delivered'] < s['requested']}
+    if short and strict:
+        raise ValueError("mix cannot be met: " + ", ".join(
+            f"{name} has {s['delivered']} of {s['requested']}" for name, s in short.items()))
+    for name in sorted(weights, key=weights.get, reverse=True):
+        if len(ids) >= size:
+            break
+        got = _draw_distinct(pools.get(name, ()), size - len(ids), rng, taken)
+        strata[name]['delivered'] += len(got)
+        ids += got
+    rng.shuffle(ids)
+    return ids, strata
+
+def _install_pool(state: Dict[str,Any], mode: str, ids: List[int], duration: int = 0,
+                  competition_id: Optional[str] = None):
+    p = core._pool(state)
+    p['mode'] = mode
+    p['ids'] = ids if isinstance(ids, core.SeededSequence) else [int(x) for x in ids]
+    p['index'] = 0
+    # filled lazily; readers default to unseen / 0
+    p['status'] = {}
+    p['score']  = {}
+    p['solved'] = 0
+    p['done'] = False
+    p['changes'] = {}
+    p['members'] = None if isinstance(p['ids'], core.SeededSequence) else frozenset(p['ids'])
+
+    if mode == 'competition' and duration > 0:
+        state['competition_ends_at'] = time.time() + duration
+        state['help_disabled'] = True
+    else:
+        state.pop('competition_ends_at', None)
+        state['help_disabled'] = False
+
+    # players sharing a competition_id share a leaderboard
+    if mode == 'competition' and competition_id:
+        state['competition_id'] = str(competition_id)[:64]
+    else:
+        state.pop('competition_id', None)
+
+    # Optional: reset session-visible stats when a new pool starts
+    state['stats'].update({
+        'played': 0, 'solved': 0, 'revealed': 0, 'skipped': 0,
+        'by_level': {},
+        'help_single': 0, 'help_all': 0,
+        'answer_attempts': 0, 'answer_correct': 0, 'answer_wrong': 0,
+        'deal_swaps': 0,
+    })
+    state['recent_keys'] = []
+    state['current_case_id'] = None
+    state['current_effective_level'] = None
+    state['current_variant'] = None
+    state['hand_interacted'] = False
+    state['hand_solved'] = False
+    state['version_base'] = core.touch(state)
+    return p
 
 def _counting_level_for_current(state: Dict[str,Any], puzzle: Dict[str,Any], requested_level: str) -> str:
     p = core._pool(state)
@@ -198,22 +725,21 @@ def _competition_time_left(state: Dict[str,Any]) -> Optional[int]:
     left = int(round(end - time.time()))
     return max(0, left)
 
+def _publish_score(sid, state, cid):
+    """Incremental score change for anyone listening on /api/events."""
+    p = core._pool(state)
+    if p.get('mode') not in ('custom', 'competition'):
+        return
+    events.publish(sid, 'score', {
+        'case_id': cid,
+        'pool_solved': core.pool_solved(p),
+        'pool_len': len(p['ids']),
+        'solved': int(state['stats'].get('solved', 0)),
+    })
+
 def _stats_payload(state):
     st = state.get('stats', {})
-    app.logger.debug(f"""
-        'played': {int(st.get('played', 0))},
-        'solved': {int(st.get('solved', 0))},
-        'revealed': {int(st.get('revealed', 0))},
-        'skipped': {int(st.get('skipped', 0))},
-        'difficulty': {st.get('by_level', '')},
-        'help_single': {int(st.get('help_single', 0))},
-        'help_all': {int(st.get('help_all', 0))},
-        'answer_attempts': {int(st.get('answer_attempts', 0))},
-        'answer_correct': {int(st.get('answer_correct', 0))},
-        'answer_wrong': {int(st.get('answer_wrong', 0))},
-        'deal_swaps': {int(st.get('deal_swaps', 0))},
-        """)
-    return {
+    out = {
         'played': int(st.get('played', 0)),
         'solved': int(st.get('solved', 0)),
         'revealed': int(st.get('revealed', 0)),
@@ -227,25 +753,132 @@ def _stats_payload(state):
         'answer_wrong': int(st.get('answer_wrong', 0)),
         'deal_swaps': int(st.get('deal_swaps', 0)),
     }
+    app.logger.debug("stats: %s", out)
+    return out
 
 
 # ---------- routes ----------
+# ---------- game24 engine (see engines.py) ----------
+class Game24Engine(engines.Engine):
+    """The 24-point card game; its catalog is built at startup by init_app()."""
+    name = 'game24'
+    title = '24 Points'
+
+    def catalog(self, state, params):
+        try:
+            variant = _request_variant(params.get('variant'), state)
+        except KeyError:
+            raise ValueError(f"Unknown variant: {params.get('variant')}")
+        cat = _variant_catalog(variant)
+        if cat is None:
+            raise engines.NotReady(f'Variant {variant!r}')
+        state['variant'] = variant      # sticks only once it can be played
+        return cat
+
+    def pick(self, level, state, catalog):
+        return _random_pick_by_level(level, state, catalog)
+
+    def present(self, puzzle, state, params):
+        values = list(map(int, puzzle['cards']))
+        theme = params.get('theme', 'classic')
+        images = _cards_to_images(values, theme)
+        return {'question': ", ".join(map(str, values)), 'values': values, 'images': images,
+                **_hand_sprite(images, theme, params), 'variant': state.get('variant', 'classic')}
+
+    def check(self, answer, puzzle, state, data):
+        values = list(puzzle['cards']) if puzzle else (data.get('values') or [])
+        # the rules the hand was dealt under, whatever the session switched to since
+        return _evaluate_answer(answer, values, state.get('current_variant') or state.get('variant', 'classic'))
+
+engines.register('game24', Game24Engine())
+
+def _engine_session(name):
+    """
+    (engine, sid, state) for this request. The default game keeps the plain sid;
+    other games get their own state (and review/leaderboard identity) under
+    sid@game, since case ids are only unique within one game. KeyError if unknown.
+    """
+    engine = engines.get(name)
+    sid = core.get_or_create_session_id(request)
+    own = engine.name == engines.DEFAULT
+    state = core.SESSIONS.setdefault(sid if own else f"{sid}@{engine.name}", core.default_state())
+    if not own:
+        state['game'] = engine.name     # keeps its case ids out of calibration (core._calibrates)
+    gid = core.get_guest_id(request)
+    if gid: state['guest_id'] = gid if own else f"{gid}@{engine.name}"
+    return engine, sid, state
+
 @app.get('/')
 def index():
+    if INDEX_HTML:
+        resp = make_response(INDEX_HTML)
+        resp.headers['Cache-Control'] = 'no-cache'
+        return resp
     return send_file('static/index.html')
 
+@app.get('/hand/<theme>/<spec>')
+def hand_image(theme, spec):
+    """Composited hand, e.g. /hand/classic/AD-TS-QH-5C.webp?w=400; cached and ETag'd."""
+    handimg = _hand_renderer()
+    if handimg.Image is None:
+        return jsonify({'error': 'image rendering unavailable'}), 501
+    stem, _, fmt = spec.rpartition('.')
+    codes = stem.split('-') if stem else []
+    if fmt not in handimg.FORMATS or not 1 <= len(codes) <= 6:
+        abort(404)
+    if not ASSETS.has_theme(theme) or any(ASSETS.resolve(theme, c) is None for c in codes):
+        abort(404)
+    width = handimg.snap_width(request.args.get('w', type=int))
+
+    etag = handimg.etag_for(theme, codes, width, fmt, ASSETS)
+    if request.if_none_match.contains(etag):
+        resp = make_response('', 304)
+    else:
+        _, data = handimg.get_or_render(theme, codes, width, fmt, ASSETS, etag)
+        resp = make_response(data)
+        resp.mimetype = handimg.FORMATS[fmt]
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'public, max-age=86400'
+    return resp
+
+@app.get('/static/dist/<path:filename>')
+def dist_asset(filename):
+    """Hashed build output: cache forever, serve a precompressed variant when accepted."""
+    if filename == 'manifest.json':
+        abort(404)
+    accept = request.headers.get('Accept-Encoding', '')
+    for enc, ext in (('br', '.br'), ('gzip', '.gz')):
+        if enc in DIST_ENCODINGS.get(filename, ()) and enc in accept:
+            resp = send_from_directory(DIST_DIR, filename + ext, max_age=31536000)
+            resp.headers['Content-Encoding'] = enc
+            resp.headers['Vary'] = 'Accept-Encoding'
+            resp.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            break
+    else:
+        resp = send_from_directory(DIST_DIR, filename, max_age=31536000)
+        if filename in DIST_ENCODINGS:
+            resp.headers['Vary'] = 'Accept-Encoding'
+    resp.headers['Cache-Control'] = IMMUTABLE
+    return resp
+
 @app.get('/api/next')
+@_admitted()
 def api_next():
-    sid = core.get_or_create_session_id(request)
-    app.logger.debug(f"in next :session_id = {sid}")
-    state = core.SESSIONS.setdefault(sid, core.default_state())
-    gid = core.get_guest_id(request)
-    if gid: state['guest_id'] = gid
+    try:
+        engine, sid, state = _engine_session(request.args.get('game'))
+    except KeyError:
+        return jsonify({'error': f"Unknown game: {request.args.get('game')}"}), 400
+    app.logger.debug("in next :session_id = %s", sid)
 
-    theme = request.args.get('theme', 'classic')
     level = request.args.get('level', 'easy')
     case_id = request.args.get('case_id', type=int)
     seq = int(request.args.get('seq', 0))
+    try:
+        catalog = engine.catalog(state, request.args)
+    except engines.NotReady as e:
+        return _not_ready(e)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     # If the user is dealing away the current hand without interacting, count a deal_swap
     prev_cid = state.get('current_case_id')
@@ -258,9 +891,10 @@ def api_next():
 
     pstate = core._pool(state)
     puzzle = None
+    from_review = False
 
     if case_id:
-        puzzle = core.PUZZLES_BY_ID.get(int(case_id))
+        puzzle = catalog.get(case_id)
         if not puzzle:
             return jsonify({'error': f'Case #{case_id} not found'}), 404
         core._mark_case_status(state, case_id, 'shown')
@@ -269,29 +903,40 @@ def api_next():
         if pstate['done'] or pstate['index'] >= len(pstate['ids']):
             pstate['done'] = True
             score_map, unfinished = core._pool_score(state)
+            events.publish(sid, 'pool_done', {'unfinished': unfinished})
             return jsonify({'error': 'Pool complete', 'pool_done': True, 'unfinished': unfinished}), 400
         case_id = pstate['ids'][pstate['index']]
         pstate['index'] += 1
-        puzzle = core.PUZZLES_BY_ID.get(int(case_id))
+        puzzle = catalog.get(case_id)
         core._mark_case_status(state, case_id, 'shown')
 
     else:
-        puzzle = _random_pick_by_level(level, state)
+        # returning guests retry their weak hands first
+        due = review.next_due(state.get('guest_id'), exclude=prev_cid)
+        puzzle = catalog.get(due) if due else None
+        from_review = puzzle is not None
+        if not puzzle:
+            puzzle = engine.pick(level, state, catalog)
 
     state['current_case_id'] = int(puzzle['case_id'])
     state['hand_interacted'] = False
+    state['hand_attempts'] = 0
+    state['hand_revealed'] = False
+    state['hand_solved'] = False
+    state['dealt_at'] = time.time()
+    state['current_variant'] = state.get('variant', 'classic')
+    calibration.maybe_rebuild(recalibrate_pools)
     count_level = _counting_level_for_current(state, puzzle, level)
     state['current_effective_level'] = count_level
+    _record_outcome(engine, state, 'dealt', puzzle)
 
-    values = list(map(int, puzzle['cards']))
-    images = _cards_to_images(values, theme)
     resp_payload = {
         'seq': seq + 1,
+        'game': engine.name,
         'case_id': int(puzzle['case_id']),
-        'question': ", ".join(map(str, values)),
-        'values': values,
-        'images': images,
+        **engine.present(puzzle, state, request.args),
         'help_disabled': bool(state.get('help_disabled')),
+        'review': from_review,
         'pool_done': bool(pstate['done'] or (pstate['mode'] in ('custom','competition') and pstate['index'] >= len(pstate['ids']))),
     }
 
@@ -307,33 +952,43 @@ def api_next():
 
 # web/app.py - Fix the check endpoint
 @app.post('/api/check')
+@_admitted()
 def api_check():
-    sid = core.get_or_create_session_id(request)
-    state = core.SESSIONS.setdefault(sid, core.default_state())
-    gid = core.get_guest_id(request)
-    if gid: state['guest_id'] = gid
-
     data = request.get_json(silent=True) or {}
+    try:
+        engine, sid, state = _engine_session(data.get('game'))
+    except KeyError:
+        return jsonify({'error': f"Unknown game: {data.get('game')}"}), 400
+
     values = data.get('values') or []
     ans = (data.get('answer') or '').strip()
+    try:
+        catalog = engine.catalog(state, data)
+    except engines.NotReady as e:
+        return _not_ready(e)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     cid = state.get('current_case_id')
-    puzzle = core.PUZZLES_BY_ID.get(int(cid)) if cid else core.PUZZLES_BY_KEY.get(_values_key(values)) if values else None
+    puzzle = catalog.get(cid) if cid else catalog.by_key.get(_values_key(values)) if values else None
 
     # "no solution" path counts as an attempt
     if ans.lower() in {"no solution","no sol","nosol","0","-1"}:
-        sols_exist = bool(puzzle and puzzle.get('solutions'))
+        sols_exist = bool(engine.solutions(puzzle))
         core.bump_played_once(state, state.get('current_effective_level') or (puzzle and puzzle.get('level') or 'unknown'))
         state['hand_interacted'] = True
         if not sols_exist:
             core.bump_attempt(state, True)
+            _record_outcome(engine, state, 'correct', puzzle)
             if cid:
                 core._mark_case_status(state, cid, 'good')
                 core._set_case_solved(state, cid)
             core.bump_solved(state, state.get('current_effective_level') or (puzzle and puzzle.get('level') or 'unknown'))
+            _publish_score(sid, state, cid)
             return jsonify({'ok': True, 'value': None, 'kind': 'no-solution', 'stats': _stats_payload(state)})
         else:
             core.bump_attempt(state, False)
+            _record_outcome(engine, state, 'wrong', puzzle)
             in_comp = (core._pool(state).get('mode') == 'competition')
             if cid: core._mark_case_status(state, cid, 'attempt')
             return jsonify({
@@ -344,20 +999,22 @@ def api_check():
             })
 
     try:
-        value = safe_eval(ans)
-    except Exception:
+        value, reason = engine.check(ans, puzzle, state, data)
+    except Exception as e:
         core.bump_played_once(state, state.get('current_effective_level') or (puzzle and puzzle.get('level') or 'unknown'))
         core.bump_attempt(state, False)
+        _record_outcome(engine, state, 'wrong', puzzle)
         state['hand_interacted'] = True
         if cid: core._mark_case_status(state, cid, 'attempt')
-        return jsonify({'ok': False, 'reason': 'Invalid expression', 'stats': _stats_payload(state)}), 200
+        why = f'Invalid expression: {e}' if isinstance(e, ValueError) and str(e) else 'Invalid expression'
+        return jsonify({'ok': False, 'reason': why, 'stats': _stats_payload(state)}), 200
 
-    tol = 1e-6
-    ok = abs(value - 24.0) < tol
+    ok = reason is None
 
     level_for_stats = state.get('current_effective_level') or (puzzle and puzzle.get('level') or 'unknown')
     core.bump_played_once(state, level_for_stats)
     core.bump_attempt(state, ok)
+    _record_outcome(engine, state, 'correct' if ok else 'wrong', puzzle)
     state['hand_interacted'] = True
 
     if ok:
@@ -365,29 +1022,37 @@ def api_check():
             core._mark_case_status(state, cid, 'good')
             core._set_case_solved(state, cid)
         core.bump_solved(state, level_for_stats)
+        _publish_score(sid, state, cid)
         return jsonify({'ok': True, 'value': value, 'stats': _stats_payload(state)})
     else:
         if cid: core._mark_case_status(state, cid, 'attempt')
-        return jsonify({'ok': False, 'value': value, 'reason': 'Not 24', 'stats': _stats_payload(state)})
+        return jsonify({'ok': False, 'value': value, 'reason': reason, 'stats': _stats_payload(state)})
 
 @app.post('/api/help')
+@_admitted(lambda data: HELP_ALL_COST if data.get('all') else 1)
 def api_help():
-    sid = core.get_or_create_session_id(request)
-    app.logger.debug(f"in check :session_id = {sid}")
-    state = core.SESSIONS.setdefault(sid, core.default_state())
-    gid = core.get_guest_id(request)
-    if gid: state['guest_id'] = gid
+    data = request.get_json(silent=True) or {}
+    try:
+        engine, sid, state = _engine_session(data.get('game'))
+    except KeyError:
+        return jsonify({'error': f"Unknown game: {data.get('game')}"}), 400
+    app.logger.debug("in check :session_id = %s", sid)
 
     if state.get('help_disabled'):
         return jsonify({'has_solution': False, 'solutions': []}), 200
 
-    data = request.get_json(silent=True) or {}
     values = data.get('values') or []
     show_all = bool(data.get('all'))
+    try:
+        catalog = engine.catalog(state, data)
+    except engines.NotReady as e:
+        return _not_ready(e)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     cid = state.get('current_case_id')
-    puzzle = core.PUZZLES_BY_ID.get(int(cid)) if cid else core.PUZZLES_BY_KEY.get(_values_key(values)) if values else None
+    puzzle = catalog.get(cid) if cid else catalog.by_key.get(_values_key(values)) if values else None
 
-    sols = list(puzzle.get('solutions') or []) if puzzle else []
+    sols = engine.solutions(puzzle)
     has = len(sols) > 0
     resp = {'has_solution': has, 'solutions': sols if show_all else (sols[:min(50, len(sols))] if has else [])}
 
@@ -395,6 +1060,7 @@ def api_help():
     core.bump_played_once(state, level_for_stats)
     core.bump_revealed(state)
     core.bump_help(state, all=show_all)  # NEW: track help usage
+    _record_outcome(engine, state, 'help_all' if show_all else 'help', puzzle)
     state['hand_interacted'] = True
 
     if cid and has:
@@ -405,7 +1071,7 @@ def api_help():
 @app.post('/api/pool')
 def api_pool():
     sid = core.get_or_create_session_id(request)
-    app.logger.debug(f"in check :session_id = {sid}")
+    app.logger.debug("in check :session_id = %s", sid)
     state = core.SESSIONS.setdefault(sid, core.default_state())
     gid = core.get_guest_id(request)
     if gid: state['guest_id'] = gid
@@ -417,48 +1083,68 @@ def api_pool():
 
     if mode not in ('custom','competition'):
         return jsonify({'error': 'mode must be custom or competition'}), 400
-    if not ids:
-        return jsonify({'error': f'No {mode} pool set'}), 400
 
-    p = core._pool(state)
-    p['mode'] = mode
-    p['ids'] = [int(x) for x in ids]
-    p['index'] = 0
-    p['status'] = {str(cid): {'status':'unseen','attempts':0} for cid in p['ids']}
-    p['score']  = {str(cid): 0 for cid in p['ids']}
-    p['done'] = False
-
-    if mode == 'competition' and duration > 0:
-        state['competition_ends_at'] = time.time() + duration
-        state['help_disabled'] = True
-    else:
-        state.pop('competition_ends_at', None)
-        state['help_disabled'] = False
+    # No explicit IDs: generate the pool server-side from a level mix
+    mix = data.get('mix')
+    mix_report = None
+    if not ids and mix:
+        try:
+            size = int(data.get('size') or 0)
+            if size <= 0 or size > MAX_POOL_SIZE:
+                raise ValueError(f"size must be 1..{MAX_POOL_SIZE}")
+            ids, strata = _build_stratified_pool(mix, size, data.get('seed'), strict=bool(data.get('strict')))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Bad pool spec: {e}'}), 400
+        mix_report = {'requested': size, 'delivered': len(ids), 'strata': strata}
+
+    # Seed only: lazy shared deal sequence, every player with this seed gets the same hands
+    seed = data.get('seed')
+    if not ids and not mix and seed is not None:
+        source = core.CATALOG.ids
+        if data.get('level'):
+            source = core.CATALOG.pool_ids.get(MIX_ALIASES.get(normalize_level(data['level'])), ())
+        if not source:
+            return jsonify({'error': f"Unknown level: {data.get('level')}"}), 400
+        try:
+            size = int(data['size']) if data.get('size') else None
+            if size is not None and size <= 0:
+                raise ValueError("size must be >= 1")
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Bad pool spec: {e}'}), 400
+        ids = core.SeededSequence(seed, source, size)
 
-    # Optional: reset session-visible stats when a new pool starts
-    state['stats'].update({
-        'played': 0, 'solved': 0, 'revealed': 0, 'skipped': 0,
-        'by_level': {},
-        'help_single': 0, 'help_all': 0,
-        'answer_attempts': 0, 'answer_correct': 0, 'answer_wrong': 0,
-        'deal_swaps': 0,
-    })
-    state['recent_keys'] = []
-    state['current_case_id'] = None
-    state['current_effective_level'] = None
-    state['hand_interacted'] = False
+    if not ids:
+        return jsonify({'error': f'No {mode} pool set'}), 400
 
-    return jsonify({'ok': True, 'pool_len': len(p['ids']), 'stats_reset': True})
+    comp_id = data.get('competition_id') or seed
+    p = _install_pool(state, mode, ids, duration, comp_id)
+    events.publish(sid, 'pool_started', {'pool_len': len(p['ids']), 'time_left': _competition_time_left(state)})
+    out = {'ok': True, 'pool_len': len(p['ids']), 'stats_reset': True,
+           'competition_id': state.get('competition_id')}
+    if mix_report is not None:
+        out['mix'] = mix_report     # per-stratum requested vs delivered; pool_len < size when short
+    return jsonify(out)
 
-@app.get('/api/pool_report')
-def api_pool_report():
-    sid = core.get_or_create_session_id(request)
-    app.logger.debug(f"in check :session_id = {sid}")
-    state = core.SESSIONS.setdefault(sid, core.default_state())
-    gid = core.get_guest_id(request) or state.get('guest_id')
+def _since(raw) -> Optional[int]:
+    try:
+        return int(raw) if raw not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+def _report(state: Dict[str,Any], gid: Optional[str], since: Optional[int] = None) -> Dict[str,Any]:
+    """
+    Stats + pool report. With `since` (a version from an earlier report) only
+    pool cases changed after it are listed ('delta': True), or nothing at all
+    ('unchanged': True) if the session has not moved. Clients behind the last
+    reset / pool install get the full report.
+    """
+    version = state.get('version', 0)
+    if since is not None and since >= version:
+        return {'ok': True, 'unchanged': True, 'version': version}
+    delta = since is not None and since >= state.get('version_base', 0)
 
     st = state.get('stats', {})
-    score_map, unfinished = core._pool_score(state)
+    p = core._pool(state)
     payload = {
         # classic
         'played': int(st.get('played', 0)),
@@ -475,55 +1161,277 @@ def api_pool_report():
         'deal_swaps': int(st.get('deal_swaps',0)),
 
         'guest_id': gid,
-        'pool_mode': core._pool(state).get('mode'),
-        'pool_len': len(core._pool(state).get('ids') or []),
-        'pool_score': score_map,
-        'unfinished': unfinished,
-        'pool_report': core._pool_report(state),
+        'pool_mode': p.get('mode'),
+        'pool_len': len(p.get('ids') or []),
     }
-    return jsonify({'ok': True, 'stats': payload})
+    if delta:
+        # changed rows only; unfinished is left for the client to derive from its merged map
+        payload['pool_score'], payload['pool_report'] = core._pool_delta(state, since)
+        payload['pool_solved'] = core.pool_solved(p)
+    else:
+        payload['pool_score'], payload['unfinished'] = core._pool_score(state)
+        payload['pool_report'] = core._pool_report(state)
+    return {'ok': True, 'stats': payload, 'version': version, 'delta': delta}
+
+@app.get('/api/pool_report')
+def api_pool_report():
+    sid = core.get_or_create_session_id(request)
+    app.logger.debug("in check :session_id = %s", sid)
+    state = core.SESSIONS.setdefault(sid, core.default_state())
+    gid = core.get_guest_id(request) or state.get('guest_id')
+    return jsonify(_report(state, gid, _since(request.args.get('since'))))
+
+# open streams per process that may hold a request thread (gunicorn.conf.py sets it)
+try:
+    events.MAX_STREAMS = max(0, int(os.environ.get('PUZZLEBOOK_MAX_STREAMS') or 0))
+except ValueError:
+    app.logger.error("PUZZLEBOOK_MAX_STREAMS=%r is not an integer; streams are not capped",
+                     os.environ.get('PUZZLEBOOK_MAX_STREAMS'))
+
+@app.get('/api/events')
+def api_events():
+    """
+    Push channel: SSE by default, ?transport=poll for a JSON long-poll.
+    Events: tick {time_left}, time_up, score {...}, pool_started, pool_done.
+    """
+    sid = core.get_or_create_session_id(request)
+    last = request.headers.get('Last-Event-ID') or request.args.get('since') or ''
+    last = int(last) if last.isdigit() else None
+
+    def time_left():
+        # float seconds so time_up lands on the deadline, not a rounded second
+        st = core.SESSIONS.peek(sid)     # every tick: a read must not re-snapshot the session
+        end = st.get('competition_ends_at') if st else None
+        return max(0.0, end - time.time()) if end else None
+
+    if request.args.get('transport') == 'poll':
+        evs, last, busy = events.poll(sid, last)
+        left = time_left()
+        out = {'ok': True, 'events': evs, 'last_id': last,
+               'time_left': None if left is None else math.ceil(left)}
+        if busy:
+            out['retry_ms'] = events.BUSY_RETRY_SECS * 1000
+        return jsonify(out)
+    return Response(events.stream(sid, last, time_left), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.get('/api/games')
+def api_games():
+    """Registered puzzle types; 'loaded' is false until someone has played one."""
+    return jsonify({'default': engines.DEFAULT, 'games': engines.listing()})
+
+@app.get('/api/variants')
+def api_variants():
+    """Rule variants the game accepts, and whether each one's catalog is loaded."""
+    solver = _solver_mod()
+    out = []
+    for name, rules in solver.VARIANTS.items():
+        entry = VARIANT_CATALOGS.get(name)
+        ready = name == 'classic' or (entry is not None and entry[0] == core.CATALOG.digest)
+        out.append({**rules.describe(), 'ready': ready})
+    return jsonify({'variants': out})
+
+@app.get('/api/leaderboard')
+def api_leaderboard():
+    gid = core.get_guest_id(request)
+    comp = request.args.get('competition_id')
+    k = request.args.get('k', 10, type=int)
+    return jsonify({'ok': True, **leaderboard.report(comp, k, gid)})
+
+@app.get('/api/case_stats')
+def api_case_stats():
+    cid = request.args.get('case_id', type=int)
+    puz = core.get_puzzle(cid) if cid else None
+    if not puz:
+        return jsonify({'error': f'Case #{cid} not found'}), 404
+    s = calibration.STATS.get(cid)
+    return jsonify({
+        'ok': True, 'case_id': cid,
+        'level': puz.get('level'),
+        'observed_level': calibration.observed_level(s) if s else None,
+        'stats': s.as_dict() if s else None,
+    })
+
+@app.post('/api/admin/reload')
+def api_admin_reload():
+    if not _is_admin(request):
+        return jsonify({'error': 'forbidden'}), 403
+    data = request.get_json(silent=True) or {}
+    try:
+        info = reload_catalog(force=bool(data.get('force')))
+    except Exception as e:
+        return jsonify({'ok': False, 'error': f'reload failed, catalog unchanged: {e}'}), 400
+    return jsonify({'ok': True, **info})
+
+@app.route('/api/admin/profile', methods=['GET', 'POST'])
+def api_admin_profile():
+    """GET -> status; POST {enabled, mode, rate, routes, reset} -> reconfigure."""
+    if not _is_admin(request):
+        return jsonify({'error': 'forbidden'}), 403
+    if request.method == 'GET':
+        return jsonify({'ok': True, **PROFILER.status()})
+    data = request.get_json(silent=True) or {}
+    try:
+        status = PROFILER.configure(enabled=data.get('enabled'), mode=data.get('mode'), rate=data.get('rate'),
+                                    routes=data.get('routes'), reset=bool(data.get('reset')))
+    except (TypeError, ValueError) as e:
+        return jsonify({'ok': False, 'error': str(e)}), 400
+    app.logger.info("profiling %s: %s", 'on' if status['enabled'] else 'off', status)
+    return jsonify({'ok': True, **status})
+
+@app.get('/api/admin/outcomes')
+def api_admin_outcomes():
+    """Cross-player aggregates: ?hours=N (default all kept rows), ?top=N most-revealed cases."""
+    if not _is_admin(request):
+        return jsonify({'error': 'forbidden'}), 403
+    if outcomes.np is None:
+        return jsonify({'error': 'reports need NumPy', **outcomes.STORE.status()}), 501
+    hours = request.args.get('hours', type=float)
+    top = max(1, min(request.args.get('top', 20, type=int), 500))
+    t = time.perf_counter()
+    cols = outcomes.STORE.load(since=time.time() - hours * 3600 if hours else None)
+    rep = outcomes.report(cols, top=top)
+    return jsonify({'ok': True, **rep, 'store': outcomes.STORE.status(),
+                    'ms': round((time.perf_counter() - t) * 1000, 1)})
+
+@app.route('/api/admin/snapshot', methods=['GET', 'POST'])
+def api_admin_snapshot():
+    """GET -> snapshot status; POST {full} -> write this worker's sessions now."""
+    if not _is_admin(request):
+        return jsonify({'error': 'forbidden'}), 403
+    if request.method == 'POST':
+        if not SNAPSHOTS.enabled:
+            return jsonify({'ok': False, 'error': 'snapshots are off (PUZZLEBOOK_SNAPSHOT_DIR)'}), 400
+        try:
+            n = SNAPSHOTS.flush(full=bool((request.get_json(silent=True) or {}).get('full')))
+        except OSError as e:
+            return jsonify({'ok': False, 'error': str(e)}), 500
+        app.logger.info("snapshot: wrote %d sessions", n)
+    return jsonify({'ok': True, **SNAPSHOTS.status()})
+
+@app.route('/api/admin/admission', methods=['GET', 'POST'])
+def api_admin_admission():
+    """GET -> limiter + coalescer status; POST {rate, burst} -> reconfigure (rate 0 = off)."""
+    if not _is_admin(request):
+        return jsonify({'error': 'forbidden'}), 403
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            LIMITER.configure(rate=data.get('rate'), burst=data.get('burst'))
+        except (TypeError, ValueError) as e:
+            return jsonify({'ok': False, 'error': str(e)}), 400
+        app.logger.info("admission: %s", LIMITER.status())
+    return jsonify({'ok': True, **LIMITER.status(), 'coalesce': COALESCER.status()})
+
+@app.get('/api/admin/profile/<fmt>')
+def api_admin_profile_export(fmt):
+    """pstats (binary, for pstats/snakeviz) or collapsed (text, for flamegraphs); ?route= narrows."""
+    if not _is_admin(request):
+        return jsonify({'error': 'forbidden'}), 403
+    route = request.args.get('route') or None
+    if fmt == 'pstats':
+        data = PROFILER.pstats_bytes(route)
+        if data is None:
+            return jsonify({'ok': False, 'error': 'no cProfile samples yet'}), 404
+        resp = make_response(data)
+        resp.headers['Content-Type'] = 'application/octet-stream'
+        resp.headers['Content-Disposition'] = f'attachment; filename="puzzlebook-{os.getpid()}.pstats"'
+        return resp
+    if fmt == 'collapsed':
+        resp = make_response(PROFILER.collapsed(route))
+        resp.headers['Content-Type'] = 'text/plain; charset=utf-8'
+        return resp
+    abort(404)
 
 @app.post('/api/restart')
 def api_restart():
     sid = core.get_or_create_session_id(request)
-    app.logger.debug(f"in restart :session_id = {sid}")  # <— add this line
+    app.logger.debug("in restart :session_id = %s", sid)
     core.SESSIONS[sid] = core.default_state()
     return jsonify({'ok': True})
 
 @app.post('/api/exit')
 def api_exit():
     sid = core.get_or_create_session_id(request)
-    app.logger.debug(f"in check :session_id = {sid}")
+    app.logger.debug("in check :session_id = %s", sid)
     state = core.SESSIONS.setdefault(sid, core.default_state())
     gid = core.get_guest_id(request) or state.get('guest_id')
+    data = request.get_json(silent=True) or {}
+    return jsonify(_report(state, gid, _since(data.get('since', request.args.get('since')))))
 
-    st = state.get('stats', {})
-    score_map, unfinished = core._pool_score(state)
-    p = core._pool(state)
-    payload = {
-        'played': int(st.get('played', 0)),
-        'solved': int(st.get('solved', 0)),
-        'revealed': int(st.get('revealed', 0)),
-        'skipped': int(st.get('skipped', 0)),
-        'difficulty': st.get('by_level', {}),
+# ---------- initialization ----------
+STARTUP_TIMINGS: List[tuple] = []   # [(step, ms), ...]
 
-        # NEW: action counters
-        'help_single': int(st.get('help_single',0)),
-        'help_all': int(st.get('help_all',0)),
-        'answer_attempts': int(st.get('answer_attempts',0)),
-        'answer_correct': int(st.get('answer_correct',0)),
-        'answer_wrong': int(st.get('answer_wrong',0)),
-        'deal_swaps': int(st.get('deal_swaps',0)),
+def _timed(step, fn, *args):
+    t = time.perf_counter()
+    out = fn(*args)
+    STARTUP_TIMINGS.append((step, round((time.perf_counter() - t) * 1000, 1)))
+    return out
 
-        'guest_id': gid,
-        'pool_mode': p.get('mode'),
-        'pool_len': len(p.get('ids') or []),
-        'pool_score': score_map,
-        'unfinished': unfinished,
-        'pool_report': core._pool_report(state),
-    }
-    return jsonify({'ok': True, 'stats': payload})
+def init_app(freeze: bool = True):
+    """
+    Load the catalog, build indices/pools and scan assets, once; returns app.
+    Servers call it as the app factory (gunicorn.conf.py: app:init_app(), in
+    the master with preload_app); with freeze, everything built here moves to
+    the GC's permanent generation so forked workers keep sharing those pages.
+    Importing app.py does none of this, so tools and tests can import it
+    cheaply; a server that imports app:app directly gets it on first request.
+    """
+    global _ready
+    with _init_lock:
+        if not _ready:
+            _init(freeze)
+            _ready = True
+    return app
+
+_init_lock = threading.Lock()
+_ready = False
+
+def _init(freeze):
+    global ANSWERS_PATH, ASSETS, ASSET_MANIFEST, DIST_ENCODINGS, INDEX_HTML, HAVE_PILLOW
+    t0 = time.perf_counter()
+
+    ANSWERS_PATH = _answers_path()
+    core.CATALOG = _timed('catalog', _build_catalog, ANSWERS_PATH)
+    app.logger.debug("I loaded total %d puzzles from %s", len(core.CATALOG.puzzles), ANSWERS_PATH)
+
+    # Scan card images once; serving a hand is then dict lookups only
+    from game24.card_assets import CardAssetRegistry
+    app.logger.debug("picutures are here: %s", assets_dir)
+    ASSETS = _timed('assets', CardAssetRegistry(str(assets_dir), url_prefix='/static/assets/images').scan)
+    for theme, missing in ASSETS.validate().items():
+        app.logger.warning("card theme %r is missing %d images: %s", theme, len(missing), ", ".join(missing[:8]))
+    if not ASSETS.has_theme(DEFAULT_THEME):
+        app.logger.error("default card theme %r not found under %s", DEFAULT_THEME, assets_dir)
+    HAVE_PILLOW = importlib.util.find_spec('PIL') is not None
+
+    ASSET_MANIFEST = _timed('manifest', _load_manifest)
+    # hashed file -> encodings it was precompressed with
+    DIST_ENCODINGS = {e['file']: e.get('encodings', []) for e in ASSET_MANIFEST.values() if 'file' in e}
+    INDEX_HTML = _index_html() if ASSET_MANIFEST else None
+    app.logger.debug("asset manifest: %d entries", len(ASSET_MANIFEST))
+
+    # after the catalog: restored seeded pools share its id tuples
+    if SNAPSHOTS.enabled:
+        try:
+            n = _timed('sessions', SNAPSHOTS.restore)
+            app.logger.info("restored %d sessions from %s", n, SNAPSHOTS.dir)
+        except OSError as e:
+            app.logger.error("session restore from %s failed: %s", SNAPSHOTS.dir, e)
+        SNAPSHOTS.install_sigterm()
+
+    if freeze:
+        _timed('gc_freeze', _gc_freeze)
+    total = round((time.perf_counter() - t0) * 1000, 1)
+    STARTUP_TIMINGS.append(('total', total))
+    app.logger.info("startup: import %.1f ms; %s", (t0 - _T_IMPORT_START) * 1000,
+                    ", ".join(f"{k} {v} ms" for k, v in STARTUP_TIMINGS))
+
+def _gc_freeze():
+    gc.collect()
+    gc.freeze()
 
 if __name__ == '__main__':
+    init_app(freeze=False)
     app.run(debug=True)
 
@@ -0,0 +1,99 @@
+# web/calibration.py
+import threading, time
+
+# ---- online difficulty calibration from observed play ----
+MIN_PLAYS = 20            # a case keeps its answers.json level until this many hands
+RECALIBRATE_EVERY = 300   # seconds between bucket rebuilds
+
+class CaseStats:
+    """Running counters for one case_id; fixed size however much it is played."""
+    __slots__ = ('played', 'attempts', 'solved', 'revealed', 'solve_attempts', 'solve_secs')
+
+    def __init__(self):
+        self.played = 0
+        self.attempts = 0
+        self.solved = 0
+        self.revealed = 0
+        self.solve_attempts = 0    # sum of attempts on hands that ended solved
+        self.solve_secs = 0.0      # running mean of time-to-solve
+
+    def as_dict(self):
+        return {
+            'played': self.played,
+            'solve_rate': round(self.solved / self.played, 3) if self.played else None,
+            'reveal_rate': round(self.revealed / self.played, 3) if self.played else None,
+            'attempts_to_solve': round(self.solve_attempts / self.solved, 2) if self.solved else None,
+            'secs_to_solve': round(self.solve_secs, 1) if self.solved else None,
+        }
+
+STATS = {}   # case_id -> CaseStats
+_lock = threading.Lock()
+_last_run = time.time()
+_dirty = False
+
+def _get(case_id):
+    s = STATS.get(case_id)
+    if s is None:
+        s = STATS.setdefault(case_id, CaseStats())
+    return s
+
+def record_played(case_id):
+    global _dirty
+    _get(int(case_id)).played += 1
+    _dirty = True
+
+def record_attempt(case_id):
+    _get(int(case_id)).attempts += 1
+
+def record_revealed(case_id):
+    _get(int(case_id)).revealed += 1
+
+def record_solved(case_id, attempts, secs):
+    s = _get(int(case_id))
+    s.solved += 1
+    s.solve_attempts += max(1, int(attempts))
+    if secs is not None:
+        s.solve_secs += (float(secs) - s.solve_secs) / s.solved
+
+def observed_level(s: CaseStats):
+    """'easy' | 'medium' | 'hard' from play data, or None while too few hands."""
+    if s.played < MIN_PLAYS:
+        return None
+    solve_rate = s.solved / s.played
+    reveal_rate = s.revealed / s.played
+    tries = s.solve_attempts / s.solved if s.solved else None
+    if solve_rate < 0.4 or reveal_rate > 0.4 or (tries or 0) > 3:
+        return 'hard'
+    if solve_rate >= 0.8 and s.solve_secs <= 30 and (tries or 1) <= 1.5:
+        return 'easy'
+    return 'medium'
+
+def overrides():
+    """case_id -> observed level, for every case with enough data."""
+    out = {}
+    for cid, s in list(STATS.items()):
+        lvl = observed_level(s)
+        if lvl:
+            out[cid] = lvl
+    return out
+
+def maybe_rebuild(rebuild):
+    """
+    Run rebuild(overrides()) on a background thread at most every
+    RECALIBRATE_EVERY seconds; rebuild publishes its result with one swap.
+    """
+    global _last_run, _dirty
+    if not _dirty or time.time() - _last_run < RECALIBRATE_EVERY:
+        return False
+    if not _lock.acquire(blocking=False):
+        return False
+    _last_run = time.time()
+    _dirty = False
+
+    def _run():
+        try:
+            rebuild(overrides())
+        finally:
+            _lock.release()
+    threading.Thread(target=_run, name='recalibrate', daemon=True).start()
+    return True
@@ -1,12 +1,170 @@
 # web/core.py
-import uuid
+import uuid, hashlib, itertools, threading, time
+
+import review       # per-guest spaced repetition
+import leaderboard  # cross-session rankings
+import calibration  # per-case observed difficulty
 
 # ---- Global in-memory state ----
-SESSIONS = {}      # sid -> state dict
-PUZZLES_BY_ID = {} # filled by app.py after loading JSON
-PUZZLES_BY_KEY = {}# values_key "1-4-8-8" -> puzzle
+class SessionStore(dict):
+    """
+    sid -> state dict. Sessions restored from a snapshot sit in `cold` as
+    encoded blobs and are decoded by `decoder` on first access, so a restart
+    costs nothing per session. Every access also marks the sid dirty, which is
+    what the snapshot writer persists next (take_dirty swaps the set under
+    `lock`, so no mark is lost mid-swap).
+    """
+    def __init__(self):
+        super().__init__()
+        self.cold = {}          # sid -> (version, blob)
+        self.dirty = set()
+        self.decoder = None     # blob -> state dict (set by snapshot.py); may raise
+        self.on_error = None    # (sid, exc) for a blob that would not decode (app.py logs)
+        self.lock = threading.Lock()        # guards `dirty`
+        self._thaw_lock = threading.Lock()  # one decode per sid; nobody sees it half-done
+        self.thaw_errors = 0
+        self.last_error = None
+
+    def mark_dirty(self, sids):
+        with self.lock:
+            self.dirty.update(sids)
+
+    def take_dirty(self):
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def _mark(self, sid):
+        with self.lock:
+            self.dirty.add(sid)
+
+    def _thaw(self, sid):
+        """Decode sid's cold blob into the live dict; the live state if another thread got there first."""
+        with self._thaw_lock:
+            state = dict.get(self, sid)
+            if state is not None:
+                return state
+            entry = self.cold.get(sid)
+            if entry is None:
+                return None
+            try:
+                state = self.decoder(entry[1])
+            except Exception as e:
+                # leave the blob cold (the next snapshot base keeps it) rather than guess
+                self.thaw_errors += 1
+                self.last_error = f"{sid}: {type(e).__name__}: {e}"
+                if self.on_error:
+                    self.on_error(sid, e)
+                return None
+            dict.__setitem__(self, sid, state)
+            del self.cold[sid]
+            return state
+
+    def get(self, sid, default=None):
+        state = dict.get(self, sid)
+        if state is None and self.cold:
+            state = self._thaw(sid)
+        if state is None:
+            return default
+        self._mark(sid)
+        return state
+
+    def peek(self, sid, default=None):
+        """get() for readers that change nothing (event ticks): the session is not marked dirty."""
+        state = dict.get(self, sid)
+        if state is None and self.cold:
+            state = self._thaw(sid)
+        return default if state is None else state
+
+    def setdefault(self, sid, default=None):
+        if self.cold and dict.get(self, sid) is None:
+            with self._thaw_lock:       # a thaw in flight lands first; then ours is a no-op
+                if sid not in self.cold:
+                    self._mark(sid)
+                    return dict.setdefault(self, sid, default)
+            state = self._thaw(sid)
+            if state is not None:
+                self._mark(sid)
+                return state
+        self._mark(sid)
+        return dict.setdefault(self, sid, default)
+
+    def __missing__(self, sid):
+        state = self._thaw(sid) if self.cold else None
+        if state is None:
+            raise KeyError(sid)
+        return state
+
+    def __getitem__(self, sid):
+        self._mark(sid)
+        return dict.__getitem__(self, sid)
+
+    def __setitem__(self, sid, state):
+        with self._thaw_lock:
+            self.cold.pop(sid, None)
+            dict.__setitem__(self, sid, state)
+        self._mark(sid)
+
+    def __contains__(self, sid):
+        return dict.__contains__(self, sid) or sid in self.cold
+
+    def __len__(self):
+        return dict.__len__(self) + len(self.cold)
+
+SESSIONS = SessionStore()
+CATALOG = None     # current Catalog, built by app.py; a reload swaps the whole object
+
+class Catalog:
+    """
+    One loaded answers.json plus everything derived from it. Never mutated after
+    it is published (except `pools`, which calibration replaces wholesale), so
+    readers that grabbed a reference keep a consistent view across a reload.
+    Cases a reload dropped stay resolvable through `retired`.
+    """
+    __slots__ = ('version', 'digest', 'puzzles', 'by_id', 'by_key', 'index_by_id',
+                 'pools_base', 'pools', 'ids', 'pool_ids', 'retired', 'loaded_at')
+
+    def __init__(self, puzzles, by_id, by_key, index_by_id, pools_base,
+                 version=1, digest=None, retired=None):
+        self.version = version
+        self.digest = digest
+        self.puzzles = puzzles
+        self.by_id = by_id               # case_id -> puzzle
+        self.by_key = by_key             # values_key "1-4-8-8" -> puzzle
+        self.index_by_id = index_by_id   # case_id -> (puzzle, values, key)
+        self.pools_base = pools_base     # pre_process_pool() output
+        self.pools = pools_base          # what the picker reads (maybe calibrated)
+        # Shared, immutable id lists that seeded sequences index into
+        self.ids = tuple(sorted(by_id))
+        self.pool_ids = {name: tuple(int(t[0]['case_id']) for t in pool) for name, pool in pools_base.items()}
+        self.retired = retired or {}
+        self.loaded_at = time.time()
+        for src in (self.ids, *self.pool_ids.values()):
+            positions(src)      # built here, before fork, so `in` on a seeded pool is a dict hit
+
+    def get(self, case_id):
+        p = self.by_id.get(case_id)
+        return p if p is not None else self.retired.get(case_id)
+
+# Session versions come from one process-wide counter seeded from the clock, so
+# they only grow: across /api/restart, new pools and server restarts alike.
+_VERSIONS = itertools.count(int(time.time() * 1000))
+
+def touch(state, case_id=None):
+    """Bump the session version; with case_id, log that case as changed at it."""
+    v = state['version'] = next(_VERSIONS)
+    if case_id is not None:
+        log = _pool(state).setdefault('changes', {})
+        key = str(case_id)
+        log.pop(key, None)      # keep the log in version order
+        log[key] = v
+    return v
+
+def get_puzzle(case_id):
+    return CATALOG.get(int(case_id)) if case_id is not None else None
 
 def default_state():
+    v = next(_VERSIONS)
     return {
         'stats': {
             # classic totals
@@ -29,8 +187,17 @@ def default_state():
         'help_disabled': False,
         'current_case_id': None,
         'current_effective_level': None,
+        'current_variant': None,  # rule variant the current hand was dealt under
         'recent_keys': [],        # last N dealt to avoid repeats
         'hand_interacted': False, # first interaction flag for current hand
+        'hand_attempts': 0,       # answers tried on current hand
+        'hand_revealed': False,   # help used on current hand
+        'hand_solved': False,     # answered correctly on current hand (boards count it once)
+        'dealt_at': None,         # epoch the current hand was dealt
+
+        # delta reports: version bumps on every stats / pool change
+        'version': v,
+        'version_base': v,        # clients behind this get a full report
 
         # competition/pools
         # 'competition_ends_at': float epoch
@@ -72,15 +239,105 @@ def get_guest_id(req):
         gid = req.headers.get('X-Guest-Id')
     return str(gid)[:64] if gid else None
 
+# ----- seeded deal sequences (shared competitions) -----
+class SeededSequence:
+    """
+    Read-only list of case_ids: item i = source[perm(seed, i)], where perm is a
+    keyed Feistel permutation over [0, len(source)) with cycle-walking.
+    Nothing is materialized, so a session holds only (seed, size) plus a shared
+    reference to source, and any worker derives the same i-th case from (seed, i).
+    """
+    __slots__ = ('seed', 'source', 'size', '_half', '_mask', '_keys')
+    ROUNDS = 4
+
+    def __init__(self, seed, source, size=None):
+        n = len(source)
+        if n == 0:
+            raise ValueError("empty source")
+        self.seed = str(seed)
+        self.source = source
+        self.size = n if size is None else max(0, min(int(size), n))
+        bits = max(2, (n - 1).bit_length())
+        bits += bits & 1                      # even split into two halves
+        self._half = bits // 2
+        self._mask = (1 << self._half) - 1
+        self._keys = tuple(
+            hashlib.sha256(f"{self.seed}|{r}".encode()).digest()[:8]
+            for r in range(self.ROUNDS)
+        )
+
+    def _round(self, r, x):
+        h = hashlib.blake2b(x.to_bytes(4, 'little'), digest_size=4, key=self._keys[r])
+        return int.from_bytes(h.digest(), 'little') & self._mask
+
+    def _permute(self, i):
+        n = len(self.source)
+        x = i
+        while True:  # cycle-walk until we land back inside [0, n)
+            left, right = x >> self._half, x & self._mask
+            for r in range(self.ROUNDS):
+                left, right = right, left ^ self._round(r, right)
+            x = (left << self._half) | right
+            if x < n:
+                return x
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError(i)
+        return self.source[self._permute(i)]
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield self[i]
+
+    def _unpermute(self, x):
+        n = len(self.source)
+        while True:
+            left, right = x >> self._half, x & self._mask
+            for r in reversed(range(self.ROUNDS)):
+                left, right = right ^ self._round(r, left), left
+            x = (left << self._half) | right
+            if x < n:
+                return x
+
+    def __contains__(self, case_id):
+        """Membership without materializing: locate case_id in source, invert the permutation."""
+        j = positions(self.source).get(case_id)
+        return j is not None and self._unpermute(j) < self.size
+
+# id(source) -> (source, {case_id: index}); catalogs fill it for their id tuples,
+# restored sequences over an older catalog's copy add theirs on first use
+_POSITIONS = {}
+POSITIONS_MAX = 64
+
+def positions(src):
+    """case_id -> index in src, built once per source tuple."""
+    hit = _POSITIONS.get(id(src))
+    if hit is not None and hit[0] is src:
+        return hit[1]
+    pos = {cid: i for i, cid in enumerate(src)}
+    if len(_POSITIONS) >= POSITIONS_MAX:
+        _POSITIONS.clear()      # a few reloads' worth; live catalogs rebuild on next use
+    _POSITIONS[id(src)] = (src, pos)
+    return pos
+
 # ----- pool helpers (custom / competition) -----
 def _pool(state):
     return state.setdefault('pool', {
         'mode': None,     # 'custom' | 'competition' | None
-        'ids': [],        # [case_id, ...]
+        'ids': [],        # [case_id, ...] or SeededSequence
         'index': 0,       # next index to serve (sequential)
         'status': {},     # str(cid) -> {'status': 'unseen'|'shown'|'good'|'revealed'|'skipped'|'attempted', 'attempts': int}
         'score': {},      # str(cid) -> 0 or 1   (0 at start; set to 1 only on correct answer)
         'done': False,    # all shown once
+        'changes': {},    # str(cid) -> version of its last change, oldest first
+        'members': None,  # frozenset of ids for list pools (SeededSequence answers `in` itself)
+        'solved': 0,      # count of 1s in score, kept as they flip
     })
 
 def _mark_case_status(state, case_id, action):
@@ -104,21 +361,37 @@ def _mark_case_status(state, case_id, action):
     elif action == 'good':
         entry['status'] = 'good'
 
+    touch(state, case_id)
+    review.record(state.get('guest_id'), case_id, action)
+
+def pool_solved(p) -> int:
+    """Solved cases in the pool; pools from before the counter are summed once."""
+    n = p.get('solved')
+    if n is None:
+        n = p['solved'] = sum(p['score'].values())
+    return n
+
 def _set_case_solved(state, case_id):
     """Binary score: flip to 1 only on correct answer."""
     p = _pool(state)
-    p['score'][str(case_id)] = 1
+    key = str(case_id)
+    if not p['score'].get(key):
+        p['solved'] = pool_solved(p) + 1
+        if p.get('mode') == 'competition':
+            leaderboard.record_pool_solved(state.get('competition_id'), state.get('guest_id'))
+    p['score'][key] = 1
+    touch(state, case_id)
+
+def _pool_row(p, cid):
+    puz = get_puzzle(cid)
+    level = puz.get('level') if puz else None
+    e = p['status'].get(str(cid), {'status':'unseen','attempts':0})
+    return {'case_id': cid, 'level': level, 'status': e['status'], 'attempts': e['attempts']}
 
 def _pool_report(state):
     """Legacy detailed report (status/attempts per case)."""
-    rows = []
     p = _pool(state)
-    for cid in p['ids']:
-        puz = PUZZLES_BY_ID.get(int(cid))
-        level = puz.get('level') if puz else None
-        e = p['status'].get(str(cid), {'status':'unseen','attempts':0})
-        rows.append({'case_id': cid, 'level': level, 'status': e['status'], 'attempts': e['attempts']})
-    return rows
+    return [_pool_row(p, cid) for cid in p['ids']]
 
 def _pool_score(state):
     """Compact 0/1 map and unfinished list."""
@@ -127,7 +400,35 @@ def _pool_score(state):
     unfinished = [int(cid) for cid, v in score.items() if v == 0]
     return score, unfinished
 
+def _pool_delta(state, since):
+    """
+    (score map, report rows) for pool cases changed after version `since`.
+    Walks the change log from the newest end, so the cost follows activity.
+    """
+    p = _pool(state)
+    log = p.get('changes') or {}
+    members = p.get('members')
+    if members is None:
+        members = p['ids']
+    score, rows = {}, []
+    for key in reversed(log):
+        if log[key] <= since:
+            break
+        cid = int(key)
+        if cid not in members:
+            continue
+        score[key] = int(p['score'].get(key, 0))
+        rows.append(_pool_row(p, cid))
+    return score, rows
+
 # ----- stats helpers -----
+def _calibrates(state) -> bool:
+    """
+    calibration.STATS is keyed by the default game's case ids under classic rules;
+    other games' sessions carry 'game', other rule variants 'current_variant'.
+    """
+    return not state.get('game') and (state.get('current_variant') or 'classic') == 'classic'
+
 def bump_played_once(state, level_for_stats: str):
     """Call on FIRST interaction (check/help/skip) of a hand."""
     if not state.get('hand_interacted'):
@@ -136,18 +437,33 @@ def bump_played_once(state, level_for_stats: str):
         by = st['by_level'].setdefault(level_for_stats, {'played': 0, 'solved': 0})
         by['played'] += 1
         state['hand_interacted'] = True
+        touch(state)
+        if state.get('current_case_id') and _calibrates(state):
+            calibration.record_played(state['current_case_id'])
 
 def bump_solved(state, level_for_stats: str):
     st = state['stats']
     st['solved'] += 1
     by = st['by_level'].setdefault(level_for_stats, {'played': 0, 'solved': 0})
     by['solved'] += 1
+    touch(state)
+    # one board point per (guest, case), none for a hand revealed first, and
+    # only for the default game: other games' case ids are their own
+    if not state.get('hand_solved') and not state.get('hand_revealed') and not state.get('game'):
+        leaderboard.record_solved(state.get('guest_id'), state.get('current_case_id'))
+    state['hand_solved'] = True
 
 def bump_revealed(state):
     state['stats']['revealed'] += 1
+    touch(state)
+    cid = state.get('current_case_id')
+    if cid and not state.get('hand_revealed') and _calibrates(state):
+        calibration.record_revealed(cid)
+    state['hand_revealed'] = True
 
 def bump_skipped(state):
     state['stats']['skipped'] += 1
+    touch(state)
 
 # NEW counters
 def bump_help(state, all=False):
@@ -155,6 +471,7 @@ def bump_help(state, all=False):
         state['stats']['help_all'] += 1
     else:
         state['stats']['help_single'] += 1
+    touch(state)
 
 def bump_attempt(state, correct: bool):
     st = state['stats']
@@ -163,7 +480,19 @@ def bump_attempt(state, correct: bool):
         st['answer_correct'] += 1
     else:
         st['answer_wrong'] += 1
+    touch(state)
+
+    cid = state.get('current_case_id')
+    if cid and not state.get('hand_solved'):     # answers resent after a solve say nothing new
+        state['hand_attempts'] = state.get('hand_attempts', 0) + 1
+        if not _calibrates(state):
+            return
+        calibration.record_attempt(cid)
+        if correct and not state.get('hand_revealed'):
+            dealt = state.get('dealt_at')
+            calibration.record_solved(cid, state['hand_attempts'], time.time() - dealt if dealt else None)
 
 def bump_deal_swap(state):
     state['stats']['deal_swaps'] += 1
+    touch(state)
 
@@ -0,0 +1,99 @@
+# web/engines.py
+import abc, importlib, os, threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# ---- puzzle-type registry: one Engine per game, loaded on first request ----
+DEFAULT = 'game24'
+
+class NotReady(Exception):
+    """The engine (or the catalog it was asked for) is still loading; retry shortly."""
+    def __init__(self, what: str, retry_after: int = 5):
+        super().__init__(what)
+        self.what = what
+        self.retry_after = retry_after
+
+class Engine(abc.ABC):
+    """
+    What a puzzle type provides. The session / pool / stats machinery in core.py
+    is shared; an engine only knows its own puzzles.
+
+    Puzzles are dicts with at least 'case_id' and 'level'; catalogs are
+    core.Catalog objects, so pools, reviews and reports work unchanged.
+    Subclasses must implement catalog, pick, present and check.
+    """
+    name = ''
+    title = ''
+
+    def load(self) -> None:
+        """Called once, on the first request for this type. Heavy imports go here."""
+
+    @abc.abstractmethod
+    def catalog(self, state: Dict[str, Any], params) -> Any:
+        """Catalog to serve from (may depend on request params); raise NotReady / ValueError."""
+
+    @abc.abstractmethod
+    def pick(self, level: str, state: Dict[str, Any], catalog) -> Dict[str, Any]:
+        """A puzzle for level from catalog."""
+
+    @abc.abstractmethod
+    def present(self, puzzle: Dict[str, Any], state: Dict[str, Any], params) -> Dict[str, Any]:
+        """Fields merged into the /api/next payload (question, images, ...)."""
+
+    @abc.abstractmethod
+    def check(self, answer: str, puzzle: Optional[Dict[str, Any]], state: Dict[str, Any],
+              data: Dict[str, Any]) -> Tuple[Any, Optional[str]]:
+        """(value, None) if correct, (value, reason) if not; raise on unparseable input."""
+
+    def solutions(self, puzzle: Optional[Dict[str, Any]]) -> List[str]:
+        return list(puzzle.get('solutions') or []) if puzzle else []
+
+    def describe(self) -> Dict[str, Any]:
+        return {'name': self.name, 'title': self.title}
+
+# name -> Engine instance, or "module:attr" imported on first use.
+# PUZZLEBOOK_ENGINES="sudoku=engine_sudoku:SudokuEngine,..." adds more.
+REGISTRY: Dict[str, Any] = {}
+_loaded: Dict[str, Engine] = {}
+_lock = threading.Lock()
+
+def _norm(name: Optional[str]) -> str:
+    return (name or DEFAULT).strip().lower()
+
+def register(name: str, engine) -> None:
+    name = _norm(name)
+    REGISTRY[name] = engine
+    _loaded.pop(name, None)
+
+for _spec in filter(None, (os.environ.get('PUZZLEBOOK_ENGINES') or '').split(',')):
+    _name, _, _target = _spec.partition('=')
+    register(_name.strip(), _target.strip())
+
+def get(name: Optional[str]) -> Engine:
+    """Engine for name (default game); imports and loads it on first use. KeyError if unknown."""
+    name = _norm(name)
+    eng = _loaded.get(name)
+    if eng is not None:
+        return eng
+    if name not in REGISTRY:
+        raise KeyError(name)
+    with _lock:
+        eng = _loaded.get(name)
+        if eng is None:
+            target = REGISTRY[name]
+            if isinstance(target, str):
+                mod, _, attr = target.partition(':')
+                target = getattr(importlib.import_module(mod), attr)()
+            target.load()
+            _loaded[name] = eng = target
+    return eng
+
+def listing() -> List[Dict[str, Any]]:
+    out = []
+    for name, target in REGISTRY.items():
+        eng = _loaded.get(name)
+        if eng is not None:
+            info = eng.describe()
+        else:
+            info = {'name': name, 'title': name if isinstance(target, str) else target.title}
+        out.append({**info, 'loaded': eng is not None})
+    return out
@@ -0,0 +1,175 @@
+# web/events.py
+import json, math, threading, time
+from collections import deque
+
+# ---- per-session push channel (SSE / long-poll) ----
+TICK_SECS = 10          # authoritative time_left resync while a competition runs
+HEARTBEAT_SECS = 25     # keep-alive comment when nothing else is going on
+STREAM_MAX_SECS = 300   # recycle the connection; EventSource reconnects with Last-Event-ID
+BACKLOG = 64            # events kept per session for reconnects
+GRACE_SECS = 60         # keep an unwatched channel this long so reconnects miss nothing
+# Under threaded workers every open stream / long-poll parks a request thread.
+# MAX_STREAMS (per process, 0 = no cap) keeps some for game requests: past it a
+# client gets what is buffered right away and is told to come back later.
+# gunicorn.conf.py sizes it from the thread count; evented workers leave it 0.
+MAX_STREAMS = 0
+BUSY_RETRY_SECS = 15
+
+class Channel:
+    """Bounded event log with a monotonically increasing id; waiters block on a Condition."""
+    __slots__ = ('log', 'seq', 'cond', 'subscribers', 'idle_since')
+
+    def __init__(self):
+        self.log = deque(maxlen=BACKLOG)   # (id, event, data)
+        # ms-epoch start keeps ids increasing even if the channel is recreated
+        self.seq = int(time.time() * 1000)
+        self.cond = threading.Condition()
+        self.subscribers = 0
+        self.idle_since = None
+
+    def publish(self, event, data):
+        with self.cond:
+            self.seq += 1
+            self.log.append((self.seq, event, data))
+            self.cond.notify_all()
+
+    def since(self, last_id):
+        return [e for e in self.log if e[0] > last_id]
+
+    def wait(self, last_id, timeout):
+        """Events after last_id, blocking up to timeout for the first one."""
+        with self.cond:
+            if self.seq <= last_id:
+                self.cond.wait(timeout)
+            return self.since(last_id)
+
+CHANNELS = {}   # sid -> Channel, while someone listens (plus GRACE_SECS)
+_lock = threading.Lock()
+_last_sweep = 0.0
+_parked = 0     # streams + long-polls currently holding a thread
+
+def publish(sid, event, data):
+    """No listener, no channel: publishing for an idle session costs a dict miss."""
+    ch = CHANNELS.get(sid)
+    if ch is not None:
+        ch.publish(event, data)
+
+def _sweep(now):
+    global _last_sweep
+    if now - _last_sweep < GRACE_SECS:
+        return
+    _last_sweep = now
+    for sid, ch in list(CHANNELS.items()):
+        if ch.subscribers <= 0 and ch.idle_since and now - ch.idle_since > GRACE_SECS:
+            del CHANNELS[sid]
+
+def subscribe(sid):
+    with _lock:
+        _sweep(time.time())
+        ch = CHANNELS.get(sid)
+        if ch is None:
+            ch = CHANNELS[sid] = Channel()
+        ch.subscribers += 1
+        ch.idle_since = None
+        return ch
+
+def unsubscribe(sid, ch):
+    with _lock:
+        ch.subscribers -= 1
+        if ch.subscribers <= 0:
+            ch.idle_since = time.time()
+
+def _park():
+    """Claim one of MAX_STREAMS parking slots; False when they are all taken."""
+    global _parked
+    with _lock:
+        if MAX_STREAMS and _parked >= MAX_STREAMS:
+            return False
+        _parked += 1
+        return True
+
+def _unpark():
+    global _parked
+    with _lock:
+        _parked -= 1
+
+def _buffered(sid, last_id):
+    ch = CHANNELS.get(sid)
+    return ch.since(last_id) if ch is not None and last_id is not None else []
+
+def _sse(event, data, eid=None):
+    head = f"id: {eid}\n" if eid is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream(sid, last_id, time_left):
+    """
+    SSE generator. time_left() -> float seconds or None (no competition).
+    Sends buffered events, a 'tick' every TICK_SECS and a 'time_up' exactly at
+    the deadline; between those the thread just sleeps on the channel. With all
+    MAX_STREAMS slots taken it sends what is buffered and ends, and the browser
+    reconnects after BUSY_RETRY_SECS.
+    """
+    if not _park():
+        yield f"retry: {BUSY_RETRY_SECS * 1000}\n\n"
+        for eid, event, data in _buffered(sid, last_id):
+            yield _sse(event, data, eid)
+        left = time_left()
+        if left is not None:
+            yield _sse('time_up', {'time_left': 0}) if left <= 0 else _sse('tick', {'time_left': math.ceil(left)})
+        return
+    try:
+        yield from _stream(sid, last_id, time_left)
+    finally:
+        _unpark()
+
+def _stream(sid, last_id, time_left):
+    ch = subscribe(sid)
+    if last_id is None:
+        last_id = ch.seq    # fresh connection: nothing to replay
+    try:
+        yield "retry: 3000\n\n"
+        started = time.time()
+        left = time_left()
+        if left is not None:
+            yield _sse('tick', {'time_left': math.ceil(left)})
+        next_tick = time.time() + TICK_SECS
+        while time.time() - started < STREAM_MAX_SECS:
+            left = time_left()
+            if left is not None and left <= 0:
+                yield _sse('time_up', {'time_left': 0})
+                return
+            now = time.time()
+            timeout = HEARTBEAT_SECS if left is None else max(0.05, min(next_tick - now, left))
+            evs = ch.wait(last_id, timeout)
+            for eid, event, data in evs:
+                yield _sse(event, data, eid)
+                last_id = eid
+            left = time_left()
+            if left is not None and time.time() >= next_tick:
+                yield _sse('tick', {'time_left': math.ceil(left)})
+                next_tick = time.time() + TICK_SECS
+            elif not evs and left is None:
+                yield ": ping\n\n"
+    finally:
+        unsubscribe(sid, ch)
+
+def poll(sid, last_id, timeout=HEARTBEAT_SECS):
+    """
+    Long-poll fallback: (events after last_id, new last id, busy), waiting up to
+    timeout. busy means no slot was free and nothing was waited for.
+    """
+    if not _park():
+        evs = _buffered(sid, last_id)
+        return _rows(evs), (evs[-1][0] if evs else last_id), True
+    ch = subscribe(sid)
+    if last_id is None:
+        last_id = ch.seq
+    try:
+        evs = ch.wait(last_id, timeout)
+        return _rows(evs), (evs[-1][0] if evs else last_id), False
+    finally:
+        unsubscribe(sid, ch)
+        _unpark()
+
+def _rows(evs):
+    return [{'id': eid, 'event': ev, 'data': data} for eid, ev, data in evs]
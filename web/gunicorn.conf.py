@@ -0,0 +1,49 @@
+# web/gunicorn.conf.py
+#   cd web && gunicorn -c gunicorn.conf.py
+# preload_app loads the app (init_app() as the factory) once in the master, so
+# the frozen catalog is shared copy-on-write by every forked worker.
+#
+# /api/events (SSE and long-poll) keeps its connection open, and under the
+# default gthread worker that parks one request thread per open stream. So
+# threads is sized for the streams too, and PUZZLEBOOK_MAX_STREAMS stops the
+# streams from taking more than threads - RESERVED_THREADS of them. Past that,
+# clients get a short answer plus a retry delay (events.py) and /api/check,
+# /api/next keep their threads. For many concurrent players run an evented
+# worker, where a stream is a parked greenlet and nothing is capped:
+#   PUZZLEBOOK_WORKER_CLASS=gevent  (pip install gevent)
+#
+# One worker by default: sessions, event channels, leaderboards, calibration
+# and the request coalescer all live in the worker's memory, so a second
+# worker would see a different game. Scale with threads (or an evented
+# worker) first; PUZZLEBOOK_WORKERS > 1 needs a proxy in front that routes
+# every request with the same session_id cookie to the same worker, and even
+# then leaderboards and calibration are per worker.
+import os
+
+RESERVED_THREADS = 4    # per worker, never taken by streams
+
+wsgi_app = "app:init_app()"
+bind = "0.0.0.0:8000"
+preload_app = True
+workers = int(os.environ.get('PUZZLEBOOK_WORKERS') or 1)
+worker_class = os.environ.get('PUZZLEBOOK_WORKER_CLASS') or "gthread"
+if worker_class == "gthread":
+    threads = int(os.environ.get('PUZZLEBOOK_THREADS') or 16)
+    os.environ.setdefault('PUZZLEBOOK_MAX_STREAMS', str(max(1, threads - RESERVED_THREADS)))
+else:
+    worker_connections = int(os.environ.get('PUZZLEBOOK_WORKER_CONNECTIONS') or 1000)
+
+def worker_exit(server, worker):
+    # last snapshot of this worker's sessions (PUZZLEBOOK_SNAPSHOT_DIR); the next
+    # master folds it into the base on startup
+    import snapshot
+    try:
+        snapshot.SNAPSHOTS.flush()
+    except Exception as e:
+        server.log.error("session snapshot on exit failed: %s", e)
+    # outcome rows of the chunk still filling (PUZZLEBOOK_OUTCOMES_DIR)
+    import outcomes
+    try:
+        outcomes.STORE.flush()
+    except Exception as e:
+        server.log.error("outcome flush on exit failed: %s", e)
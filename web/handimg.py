@@ -0,0 +1,125 @@
+# web/handimg.py
+import hashlib, io, os, tempfile, threading
+from collections import OrderedDict
+from pathlib import Path
+
+try:
+    from PIL import Image
+except Exception:  # Pillow is optional for the rest of the app
+    Image = None
+
+# ---- one composited image per hand: 4 equal tiles side by side ----
+WIDTHS = (400, 600, 800)          # total sprite width, snapped to one of these
+FORMATS = {'png': 'image/png', 'webp': 'image/webp'}
+MEM_MAX_BYTES = 32 * 1024 * 1024
+DISK_MAX_FILES = 5000
+DISK_DIR = Path(os.environ.get('HAND_CACHE_DIR') or Path(tempfile.gettempdir()) / 'puzzlebook-hands')
+
+def snap_width(w):
+    w = int(w or WIDTHS[0])
+    return min(WIDTHS, key=lambda x: (abs(x - w), x))
+
+def etag_for(theme, codes, width, fmt, assets):
+    """Strong ETag from the request and the source images' content hashes; no rendering needed."""
+    parts = [theme, ','.join(codes), str(width), fmt]
+    parts += [assets.resolve(theme, c)['hash'] for c in codes]
+    return hashlib.sha256('|'.join(parts).encode()).hexdigest()[:32]
+
+class RenderCache:
+    """Bounded in-memory LRU in front of a bounded on-disk LRU (by file mtime)."""
+
+    def __init__(self, mem_max_bytes=MEM_MAX_BYTES, disk_dir=DISK_DIR, disk_max_files=DISK_MAX_FILES):
+        self.mem = OrderedDict()   # etag -> bytes
+        self.mem_bytes = 0
+        self.mem_max_bytes = mem_max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_files = disk_max_files
+        self.disk_count = None
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            data = self.mem.get(key)
+            if data is not None:
+                self.mem.move_to_end(key)
+                return data
+        if self.disk_dir:
+            path = self.disk_dir / key
+            try:
+                data = path.read_bytes()
+                os.utime(path)
+            except OSError:
+                return None
+            self._put_mem(key, data)
+            return data
+        return None
+
+    def put(self, key, data):
+        self._put_mem(key, data)
+        if self.disk_dir:
+            try:
+                self._put_disk(key, data)
+            except OSError:
+                pass  # disk tier is best effort
+
+    def _put_mem(self, key, data):
+        with self.lock:
+            old = self.mem.pop(key, None)
+            if old is not None:
+                self.mem_bytes -= len(old)
+            self.mem[key] = data
+            self.mem_bytes += len(data)
+            while self.mem_bytes > self.mem_max_bytes and len(self.mem) > 1:
+                _, ev = self.mem.popitem(last=False)
+                self.mem_bytes -= len(ev)
+
+    def _put_disk(self, key, data):
+        self.disk_dir.mkdir(parents=True, exist_ok=True)
+        if self.disk_count is None:
+            self.disk_count = sum(1 for _ in self.disk_dir.iterdir())
+        tmp = self.disk_dir / f".{key}.{threading.get_ident()}"
+        tmp.write_bytes(data)
+        os.replace(tmp, self.disk_dir / key)
+        self.disk_count += 1
+        if self.disk_count > self.disk_max_files:
+            files = sorted(self.disk_dir.iterdir(), key=lambda p: p.stat().st_mtime)
+            for p in files[:len(files) - self.disk_max_files * 9 // 10]:
+                p.unlink(missing_ok=True)
+            self.disk_count = sum(1 for _ in self.disk_dir.iterdir())
+
+CACHE = RenderCache()
+_tiles = {}   # (path, tile_w, tile_h) -> decoded, resized card
+
+def _tile(path, w, h):
+    key = (path, w, h)
+    im = _tiles.get(key)
+    if im is None:
+        with Image.open(path) as src:
+            im = src.convert('RGBA').resize((w, h), Image.LANCZOS)
+        _tiles[key] = im
+    return im
+
+def render(theme, codes, width, fmt, assets):
+    """Encoded image bytes for codes laid out left to right."""
+    first = assets.resolve(theme, codes[0])
+    with Image.open(first['path']) as probe:
+        aspect = probe.height / probe.width
+    tile_w = width // len(codes)
+    tile_h = round(tile_w * aspect)
+    canvas = Image.new('RGBA', (tile_w * len(codes), tile_h), (0, 0, 0, 0))
+    for i, code in enumerate(codes):
+        canvas.paste(_tile(assets.resolve(theme, code)['path'], tile_w, tile_h), (i * tile_w, 0))
+    buf = io.BytesIO()
+    if fmt == 'webp':
+        canvas.save(buf, 'WEBP', quality=85)
+    else:
+        canvas.save(buf, 'PNG', optimize=True)
+    return buf.getvalue()
+
+def get_or_render(theme, codes, width, fmt, assets, etag=None):
+    etag = etag or etag_for(theme, codes, width, fmt, assets)
+    data = CACHE.get(etag)
+    if data is None:
+        data = render(theme, codes, width, fmt, assets)
+        CACHE.put(etag, data)
+    return etag, data
@@ -0,0 +1,85 @@
+# web/leaderboard.py
+import bisect, hashlib
+
+# ---- cross-session leaderboards, updated as answers come in ----
+TOP_K = 100          # entries kept sorted per board; queries cap at this
+GLOBAL = 'global'
+
+class Board:
+    """
+    Per-guest totals plus a sorted list of the best TOP_K (-score, guest_id).
+    Scores only grow, so a guest outside the list can only enter by passing its
+    last entry: each update is O(log k + k) and a query is a slice, whatever the
+    number of sessions.
+    """
+    __slots__ = ('totals', 'top', 'k')
+
+    def __init__(self, k=TOP_K):
+        self.totals = {}   # guest_id -> score
+        self.top = []      # [(-score, guest_id), ...] ascending
+        self.k = k
+
+    def add(self, guest_id, delta=1):
+        old = self.totals.get(guest_id, 0)
+        new = old + delta
+        self.totals[guest_id] = new
+
+        top = self.top
+        if old:
+            i = bisect.bisect_left(top, (-old, guest_id))
+            if i < len(top) and top[i] == (-old, guest_id):
+                del top[i]
+        entry = (-new, guest_id)
+        if len(top) < self.k or entry < top[-1]:
+            bisect.insort(top, entry)
+            if len(top) > self.k:
+                top.pop()
+        return new
+
+    def top_n(self, n):
+        return [(g, -s) for s, g in self.top[:n]]
+
+# 'global' and competition_id -> Board
+BOARDS = {GLOBAL: Board()}
+CREDITED = {}   # guest_id -> set of case_ids already worth a global point
+
+def _board(name):
+    b = BOARDS.get(name)
+    if b is None:
+        b = BOARDS[name] = Board()
+    return b
+
+def record_solved(guest_id, case_id=None):
+    """
+    First unrevealed solve of a hand (core.bump_solved); a case scores once per
+    guest, however often it is dealt again. Hands without a case id score once per hand.
+    """
+    if not guest_id:
+        return
+    if case_id is not None:
+        seen = CREDITED.setdefault(guest_id, set())
+        if case_id in seen:
+            return
+        seen.add(case_id)
+    _board(GLOBAL).add(guest_id)
+
+def record_pool_solved(competition_id, guest_id):
+    """A competition case flipped from 0 to 1 (core._set_case_solved)."""
+    if guest_id and competition_id:
+        _board(f"comp:{competition_id}").add(guest_id)
+
+def public_name(guest_id):
+    """Guest ids double as credentials; only a short digest is ever shown."""
+    return 'guest-' + hashlib.sha1(str(guest_id).encode()).hexdigest()[:8]
+
+def report(competition_id=None, k=10, guest_id=None):
+    name = f"comp:{competition_id}" if competition_id else GLOBAL
+    board = BOARDS.get(name) or Board()
+    k = max(1, min(int(k), TOP_K))
+    rows = []
+    for rank, (g, score) in enumerate(board.top_n(k), start=1):
+        rows.append({'rank': rank, 'name': public_name(g), 'score': score, 'you': g == guest_id})
+    out = {'board': name, 'players': len(board.totals), 'top': rows}
+    if guest_id:
+        out['your_score'] = board.totals.get(guest_id, 0)
+    return out
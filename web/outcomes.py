@@ -0,0 +1,220 @@
+# web/outcomes.py
+import glob, os, struct, threading, time
+from array import array
+from typing import Any, Dict, List, Optional
+
+try:
+    import numpy as np
+except Exception:  # NumPy is only needed for reports; recording works without it
+    np = None
+
+# ---- per-case outcome rows in typed columns, for cross-player reports ----
+# One row per deal / answer / help. Columns are stdlib arrays while they fill;
+# a full chunk is sealed and, with PUZZLEBOOK_OUTCOMES_DIR set, spilled as
+# outcomes-<pid>-<n>.col: header (MAGIC, rows) then each column's raw bytes.
+# flush() (every FLUSH_SECS and at worker exit) writes the chunk still filling
+# under the number it will get, so the full spill later replaces it.
+LEVELS = ('unknown', 'easy', 'medium', 'hard', 'challenge', 'nosol')
+ACTIONS = ('dealt', 'wrong', 'correct', 'help', 'help_all')
+LEVEL_CODE = {name: i for i, name in enumerate(LEVELS)}
+ACTION_CODE = {name: i for i, name in enumerate(ACTIONS)}
+
+# name, array typecode, numpy dtype (little-endian, as array writes it here)
+COLUMNS = (('case_id', 'i', '<i4'), ('level', 'b', 'i1'), ('action', 'b', 'i1'),
+           ('ts', 'd', '<f8'), ('attempts', 'H', '<u2'))
+CHUNK_ROWS = 1 << 16
+MEM_CHUNKS = 64             # sealed chunks kept in memory when there is no spill dir
+MAGIC = b'PBOC'
+FLUSH_SECS = 60.0
+_HEADER = struct.Struct('<4sI')
+
+def _columns():
+    return {name: array(code) for name, code, _ in COLUMNS}
+
+class OutcomeStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dir: Optional[str] = None
+        self.cols = _columns()
+        self.sealed: List[Dict[str, array]] = []    # in memory, when not spilling
+        self.chunk_no = 0
+        self.rows = 0
+        self.last_error = None
+        self.io_lock = threading.Lock()     # orders a partial flush before the full spill of the same chunk
+        self.interval = FLUSH_SECS
+        self._flushed = (0, 0)              # (chunk number, rows) last written by flush()
+        self._pid = None
+
+    def configure(self, directory: Optional[str], interval=None) -> None:
+        self.dir = directory or None
+        if interval is not None:
+            self.interval = max(1.0, float(interval))
+        if self.dir:
+            os.makedirs(self.dir, exist_ok=True)
+
+    def record(self, case_id, level: Optional[str], action: str, attempts: int = 0) -> None:
+        full = None
+        with self.lock:
+            c = self.cols
+            c['case_id'].append(int(case_id))
+            c['level'].append(LEVEL_CODE.get(level, 0))
+            c['action'].append(ACTION_CODE[action])
+            c['ts'].append(time.time())
+            c['attempts'].append(min(int(attempts or 0), 0xFFFF))
+            self.rows += 1
+            if len(c['case_id']) >= CHUNK_ROWS:
+                full, self.cols = c, _columns()
+                if not self.dir:
+                    self.sealed.append(full)
+                    del self.sealed[:-MEM_CHUNKS]
+                    full = None
+                else:
+                    self.chunk_no += 1
+                    n = self.chunk_no
+        if full is not None:
+            with self.io_lock:
+                self._spill(full, n)
+
+    def flush(self) -> int:
+        """Write the chunk still filling (rows so far) to disk; returns rows written."""
+        if not self.dir:
+            return 0
+        with self.io_lock:
+            with self.lock:
+                n = self.chunk_no + 1
+                rows = len(self.cols['case_id'])
+                if not rows or self._flushed == (n, rows):
+                    return 0
+                cols = {name: array(col.typecode, col) for name, col in self.cols.items()}
+            if not self._spill(cols, n):
+                return 0
+            self._flushed = (n, rows)
+            return rows
+
+    def start(self) -> None:
+        """Start this process's periodic flush thread (again after a fork)."""
+        if not self.dir or self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        threading.Thread(target=self._run, name='outcome-flush', daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+
+    def _path(self, n: int) -> str:
+        return os.path.join(self.dir, f"outcomes-{os.getpid()}-{n:06d}.col")
+
+    def _spill(self, cols: Dict[str, array], n: int) -> bool:
+        path = self._path(n)
+        try:
+            with open(path + '.tmp', 'wb') as f:
+                f.write(_HEADER.pack(MAGIC, len(cols['case_id'])))
+                for name, _, _ in COLUMNS:
+                    cols[name].tofile(f)
+            os.replace(path + '.tmp', path)
+            return True
+        except OSError as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            return False
+
+    # -- reading (NumPy) --
+    def load(self, since: Optional[float] = None) -> Dict[str, Any]:
+        """
+        All rows as NumPy columns: spilled chunks of every process, plus this
+        one's in memory (which stand in for its own flushed partial chunk).
+        """
+        with self.lock:
+            chunks = self.sealed + [self.cols]
+            parts = [{name: np.array(ch[name], dtype=dt) for name, _, dt in COLUMNS} for ch in chunks]
+            own_partial = self._path(self.chunk_no + 1) if self.dir else None
+        if self.dir:
+            for path in sorted(glob.glob(os.path.join(self.dir, 'outcomes-*.col'))):
+                if path == own_partial:
+                    continue
+                if since is not None and os.path.getmtime(path) < since:
+                    continue    # written after its last row, so all of it is older
+                part = _read_chunk(path)
+                if part is not None:
+                    parts.append(part)
+        out = {name: np.concatenate([p[name] for p in parts]) if parts else np.empty(0, dt)
+               for name, _, dt in COLUMNS}
+        if since is not None:
+            keep = out['ts'] >= since
+            out = {name: col[keep] for name, col in out.items()}
+        return out
+
+    def status(self) -> Dict[str, Any]:
+        return {'rows': self.rows, 'in_memory': len(self.cols['case_id']) + CHUNK_ROWS * len(self.sealed),
+                'dir': self.dir, 'spilled_chunks': self.chunk_no, 'last_error': self.last_error,
+                'numpy': np is not None}
+
+def _read_chunk(path: str):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        return None
+    magic, n = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        return None
+    out, at = {}, _HEADER.size
+    for name, _, dt in COLUMNS:
+        width = np.dtype(dt).itemsize * n
+        if at + width > len(data):
+            return None
+        out[name] = np.frombuffer(data, dtype=dt, count=n, offset=at)
+        at += width
+    return out
+
+# ---------- reports ----------
+def report(cols: Dict[str, Any], top: int = 20) -> Dict[str, Any]:
+    """Group-bys over the columns; every count comes from bincount / unique, no per-row Python."""
+    action, level, cid = cols['action'], cols['level'], cols['case_id']
+    n_levels = len(LEVELS)
+    dealt = action == ACTION_CODE['dealt']
+    correct = action == ACTION_CODE['correct']
+    helped = (action == ACTION_CODE['help']) | (action == ACTION_CODE['help_all'])
+
+    # solve rate by level per hour: one key per (hour, level)
+    hour = (cols['ts'] // 3600).astype(np.int64)
+    key = hour * n_levels + level
+    hours, inv = np.unique(key, return_inverse=True)
+    dealt_n = np.bincount(inv, weights=dealt, minlength=len(hours))
+    solved_n = np.bincount(inv, weights=correct, minlength=len(hours))
+    by_hour = [{'hour': int(k // n_levels) * 3600, 'level': LEVELS[int(k % n_levels)],
+                'dealt': int(d), 'solved': int(s), 'solve_rate': round(float(s / d), 3) if d else None}
+               for k, d, s in zip(hours.tolist(), dealt_n.tolist(), solved_n.tolist()) if d or s]
+
+    # most-revealed cases, with how often they were dealt
+    size = int(cid.max()) + 1 if cid.size else 0
+    reveals = np.bincount(cid[helped], minlength=size)
+    deals = np.bincount(cid[dealt], minlength=size)
+    k = min(top, int(np.count_nonzero(reveals)))
+    most = np.argpartition(-reveals, k - 1)[:k] if k else np.empty(0, np.int64)
+    most = most[np.argsort(-reveals[most], kind='stable')]
+    most_revealed = [{'case_id': int(c), 'reveals': int(reveals[c]), 'dealt': int(deals[c]),
+                      'reveal_rate': round(float(reveals[c] / deals[c]), 3) if deals[c] else None}
+                     for c in most.tolist()]
+
+    # attempts it took, on answers that were correct
+    att = cols['attempts'][correct].astype(np.float64)
+    lv = level[correct]
+    sums = np.bincount(lv, weights=att, minlength=n_levels)
+    cnts = np.bincount(lv, minlength=n_levels)
+    attempts = {LEVELS[i]: {'solved': int(cnts[i]), 'avg_attempts': round(float(sums[i] / cnts[i]), 2)}
+                for i in range(n_levels) if cnts[i]}
+    if att.size:
+        attempts['all'] = {'solved': int(att.size), 'avg_attempts': round(float(att.mean()), 2)}
+
+    counts = np.bincount(action, minlength=len(ACTIONS))
+    return {'rows': int(action.size),
+            'actions': {name: int(counts[i]) for i, name in enumerate(ACTIONS)},
+            'solve_rate_by_hour': by_hour,
+            'most_revealed': most_revealed,
+            'attempts_to_solve': attempts}
+
+STORE = OutcomeStore()
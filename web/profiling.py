@@ -0,0 +1,144 @@
+# web/profiling.py
+import cProfile, marshal, pstats, random, sys, threading, time
+from collections import Counter
+
+# ---- on-demand request profiling, switched at runtime via /api/admin/profile ----
+MODES = ('cprofile', 'sample')
+SAMPLE_HZ = 200          # stack sampler frequency
+MAX_STACK_DEPTH = 64
+
+class RequestProfiler:
+    """
+    Profiles a random fraction of requests per route and aggregates in memory.
+      cprofile: one cProfile.Profile per sampled request, merged into pstats per route
+      sample:   a background thread snapshots the stacks of threads serving
+                sampled requests, counted as collapsed stacks (flamegraph input)
+    When disabled, the request hooks return after one attribute check.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.mode = 'cprofile'
+        self.rate = 0.1
+        self.routes = None            # None = every route
+        self.lock = threading.Lock()
+        self.stats = {}               # route -> pstats.Stats
+        self.stacks = {}              # route -> Counter(collapsed stack -> samples)
+        self.requests = Counter()     # route -> sampled requests
+        self.active = {}              # thread ident -> route (sample mode)
+        self._sampler = None
+
+    # -- control --
+    def configure(self, enabled=None, mode=None, rate=None, routes=None, reset=False):
+        if mode is not None:
+            if mode not in MODES:
+                raise ValueError(f"mode must be one of {MODES}")
+            self.mode = mode
+        if rate is not None:
+            rate = float(rate)
+            if not 0 < rate <= 1:
+                raise ValueError("rate must be in (0, 1]")
+            self.rate = rate
+        if routes is not None:
+            self.routes = set(routes) or None
+        if reset:
+            with self.lock:
+                self.stats.clear()
+                self.stacks.clear()
+                self.requests.clear()
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if self.enabled and self.mode == 'sample':
+            self._start_sampler()
+        return self.status()
+
+    def status(self):
+        return {
+            'enabled': self.enabled, 'mode': self.mode, 'rate': self.rate,
+            'routes': sorted(self.routes) if self.routes else None,
+            'sampled': dict(self.requests),
+        }
+
+    # -- request hooks --
+    def start(self, route):
+        """Returns a token for finish(), or None if this request is not sampled."""
+        if not self.enabled:
+            return None
+        if self.routes and route not in self.routes:
+            return None
+        if random.random() >= self.rate:
+            return None
+        if self.mode == 'sample':
+            self._start_sampler()   # no-op when running; restarts it in a freshly forked worker
+            self.active[threading.get_ident()] = route
+            return ('sample', route)
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:   # another profiler already active on this thread
+            return None
+        return ('cprofile', route, prof)
+
+    def finish(self, token):
+        if token[0] == 'sample':
+            self.active.pop(threading.get_ident(), None)
+            with self.lock:
+                self.requests[token[1]] += 1
+            return
+        _, route, prof = token
+        prof.disable()
+        with self.lock:
+            if route in self.stats:
+                self.stats[route].add(prof)
+            else:
+                self.stats[route] = pstats.Stats(prof)
+            self.requests[route] += 1
+
+    # -- stack sampler --
+    def _start_sampler(self):
+        if self._sampler and self._sampler.is_alive():
+            return
+        self._sampler = threading.Thread(target=self._sample_loop, name='profiler-sampler', daemon=True)
+        self._sampler.start()
+
+    def _sample_loop(self):
+        interval = 1.0 / SAMPLE_HZ
+        while self.enabled and self.mode == 'sample':
+            time.sleep(interval)
+            if not self.active:
+                continue
+            frames = sys._current_frames()
+            for tid, route in list(self.active.items()):
+                frame = frames.get(tid)
+                if frame is None:
+                    continue
+                parts = []
+                while frame is not None and len(parts) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    parts.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                    frame = frame.f_back
+                stack = ';'.join(reversed(parts))
+                with self.lock:
+                    self.stacks.setdefault(route, Counter())[stack] += 1
+
+    # -- export --
+    def pstats_bytes(self, route=None):
+        """marshal'd stats dict: the format pstats.Stats(filename) / snakeviz read."""
+        with self.lock:
+            picked = [s for r, s in self.stats.items() if route in (None, r)]
+            if not picked:
+                return None
+            merged = pstats.Stats()
+            merged.add(*picked)
+            return marshal.dumps(merged.stats)
+
+    def collapsed(self, route=None):
+        """'frame;frame;frame count' lines, for flamegraph.pl / speedscope."""
+        with self.lock:
+            total = Counter()
+            for r, c in self.stacks.items():
+                if route in (None, r):
+                    total.update(c)
+        return ''.join(f"{stack} {n}\n" for stack, n in total.most_common())
+
+PROFILER = RequestProfiler()
@@ -0,0 +1,153 @@
+# web/review.py
+import heapq, marshal, threading, time
+from collections import OrderedDict
+
+# ---- spaced repetition for returning guests ----
+# guest_id -> ReviewQueue, least recently used first. Per process like
+# core.SESSIONS; snapshot.py persists them next to the sessions (compact
+# blobs in COLD), and a restart merges every worker's copy.
+QUEUES = OrderedDict()
+COLD = {}           # guest_id -> (stamp_ms, blob): restored or evicted, decoded on first use
+DIRTY = set()       # guests changed since the last snapshot
+MAX_GUESTS = 20000  # decoded queues; older ones drop to COLD
+MAX_COLD = 500000   # oldest blobs beyond this are forgotten
+_lock = threading.Lock()
+
+# seconds until a case comes back, by step; past the last step it is dropped
+INTERVALS = (60, 5 * 60, 30 * 60, 24 * 3600, 4 * 24 * 3600)
+MAX_ITEMS = 500     # per guest; new misses are ignored once full
+FAILED = ('attempt', 'revealed', 'skipped')
+
+class ReviewQueue:
+    """
+    Min-heap of (due_ts, case_id) plus case_id -> (due_ts, step).
+    Rescheduling pushes a new heap entry; stale ones are discarded lazily on pop.
+    """
+    __slots__ = ('heap', 'items', 'stamp')
+
+    def __init__(self, items=None):
+        self.items = items or {}
+        self.heap = [(d, c) for c, (d, _) in self.items.items()]
+        heapq.heapify(self.heap)
+        self.stamp = 0      # ms of the last change, newest copy wins on restore
+
+    def __len__(self):
+        return len(self.items)
+
+    def to_blob(self) -> bytes:
+        return marshal.dumps(self.items)
+
+    @classmethod
+    def from_blob(cls, blob: bytes):
+        return cls(marshal.loads(blob))
+
+    def _schedule(self, case_id, step, now, delay=None):
+        self.stamp = int(now * 1000)
+        due = now + (INTERVALS[step] if delay is None else delay)
+        self.items[case_id] = (due, step)
+        heapq.heappush(self.heap, (due, case_id))
+        if len(self.heap) > 2 * len(self.items) + 16:
+            self.heap = [(d, c) for c, (d, _) in self.items.items()]
+            heapq.heapify(self.heap)
+
+    def record(self, case_id, action, now=None):
+        now = time.time() if now is None else now
+        if action in FAILED:
+            if case_id in self.items or len(self.items) < MAX_ITEMS:
+                self._schedule(case_id, 0, now)
+        elif action == 'good' and case_id in self.items:
+            step = self.items[case_id][1] + 1
+            if step < len(INTERVALS):
+                self._schedule(case_id, step, now)
+            else:
+                del self.items[case_id]
+
+    def pop_due(self, now=None, exclude=None):
+        """
+        Next due case_id (other than exclude) or None, in O(log n). The case stays
+        queued at its step, leased for INTERVALS[0], so dealing it away without
+        answering brings it back later.
+        """
+        now = time.time() if now is None else now
+        heap = self.heap
+        held = None
+        found = None
+        while heap and heap[0][0] <= now:
+            due, cid = heapq.heappop(heap)
+            cur = self.items.get(cid)
+            if not cur or cur[0] != due:
+                continue  # stale entry
+            if cid == exclude:
+                held = (due, cid)
+                continue
+            self._schedule(cid, cur[1], now, delay=INTERVALS[0])
+            found = cid
+            break
+        if held is not None:
+            heapq.heappush(heap, held)
+        return found
+
+def _queue(guest_id, create=False):
+    """Decoded queue for guest_id (thawing a cold one), most recently used; caller holds _lock."""
+    q = QUEUES.get(guest_id)
+    if q is not None:
+        QUEUES.move_to_end(guest_id)
+        return q
+    entry = COLD.pop(guest_id, None)
+    if entry is not None:
+        q = ReviewQueue.from_blob(entry[1])
+        q.stamp = entry[0]
+    elif create:
+        q = ReviewQueue()
+    else:
+        return None
+    QUEUES[guest_id] = q
+    while len(QUEUES) > MAX_GUESTS:
+        gid, old = QUEUES.popitem(last=False)
+        COLD[gid] = (old.stamp, old.to_blob())
+    while len(COLD) > MAX_COLD:
+        del COLD[next(iter(COLD))]
+    return q
+
+def record(guest_id, case_id, action):
+    if not guest_id or action not in FAILED + ('good',):
+        return
+    with _lock:
+        q = _queue(guest_id, create=action in FAILED)
+        if q is None:
+            return
+        q.record(int(case_id), action)
+        DIRTY.add(guest_id)
+
+def next_due(guest_id, exclude=None):
+    if not guest_id:
+        return None
+    with _lock:
+        q = _queue(guest_id)
+        if q is None:
+            return None
+        cid = q.pop_due(exclude=exclude)
+        if cid is not None:
+            DIRTY.add(guest_id)
+        return cid
+
+# ---------- snapshot hooks (snapshot.py) ----------
+def take_dirty(everything=False):
+    """{guest_id: (stamp_ms, blob)} changed since the last call (every decoded queue with everything)."""
+    global DIRTY
+    with _lock:
+        dirty, DIRTY = DIRTY, set()
+        gids = list(QUEUES) if everything else dirty
+        return {g: (QUEUES[g].stamp, QUEUES[g].to_blob()) for g in gids if g in QUEUES}
+
+def mark_dirty(guest_ids):
+    """Back into the next snapshot (a write that failed)."""
+    with _lock:
+        DIRTY.update(guest_ids)
+
+def restore(entries):
+    """Restored {guest_id: (stamp_ms, blob)}; kept encoded until the guest comes back."""
+    with _lock:
+        for gid, entry in entries.items():
+            if gid not in QUEUES:
+                COLD[gid] = entry
@@ -0,0 +1,355 @@
+# web/snapshot.py
+import glob, hashlib, marshal, os, signal, struct, threading, time, zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import core
+import review
+
+# ---- session snapshots: live state survives deploys and crashes ----
+# <dir>/sessions-base.snap    everything known at the last restore
+# <dir>/sessions-<pid>.snap   per-process append log of sessions touched since
+# A file is a run of frames: header (MAGIC, payload length, crc32) + payload,
+# payload = zlib(marshal((FORMAT, sources, {sid: (version, blob)}, reviews))),
+# blob    = marshal((state, seeded)): the state with every SeededSequence cut
+#           out and listed in seeded as (path, seed, source key, size).
+# reviews = {guest_id: (stamp_ms, blob)} for review.py's queues changed since.
+# Shared id tuples go in `sources` once per frame, not once per session.
+MAGIC = b'PBS1'
+FORMAT = 2
+_HEADER = struct.Struct('>4sII')
+BASE = 'sessions-base.snap'
+COMPACT_BYTES = 16 << 20    # a process log past this is rewritten with just its live sessions
+
+SOURCES: Dict[str, tuple] = {}      # source key -> id tuple, from restored frames
+_SOURCE_KEYS: Dict[int, Tuple[tuple, str]] = {}
+
+class _Skip(Exception):
+    pass
+
+class MissingSource(KeyError):
+    """A blob names a source key no restored frame carried; the session stays cold."""
+
+def _source_key(src) -> str:
+    hit = _SOURCE_KEYS.get(id(src))
+    if hit is not None and hit[0] is src:
+        return hit[1]
+    key = hashlib.blake2b(marshal.dumps(tuple(src)), digest_size=8).hexdigest()
+    _SOURCE_KEYS[id(src)] = (src, key)
+    return key
+
+def _pack(v, path, seeded, sources):
+    """v with SeededSequences cut out; raises _Skip for anything marshal cannot take."""
+    if isinstance(v, core.SeededSequence):
+        key = _source_key(v.source)
+        sources[key] = tuple(v.source)
+        seeded.append((path, v.seed, key, v.size))
+        return None
+    try:
+        marshal.dumps(v)
+        return v
+    except ValueError:
+        pass
+    if isinstance(v, dict):
+        out = {}
+        for k, x in v.items():
+            try:
+                out[k] = _pack(x, path + (k,), seeded, sources)
+            except _Skip:
+                pass    # drop just this key (e.g. a plugin's live object)
+        return out
+    if isinstance(v, list):
+        return [_pack(x, path + (i,), seeded, sources) for i, x in enumerate(v)]
+    raise _Skip(path)
+
+def encode(state: Dict[str, Any], sources: Dict[str, tuple]) -> Optional[bytes]:
+    """Blob for one session, or None if it cannot be serialized at all."""
+    try:
+        return marshal.dumps((state, ()))       # fast path: plain data only
+    except ValueError:
+        pass
+    pool = state.get('pool')
+    seq = pool.get('ids') if isinstance(pool, dict) else None
+    if isinstance(seq, core.SeededSequence):   # the usual reason: a seeded competition pool
+        key = _source_key(seq.source)
+        sources[key] = tuple(seq.source)
+        try:
+            return marshal.dumps(({**state, 'pool': {**pool, 'ids': None}},
+                                  ((('pool', 'ids'), seq.seed, key, seq.size),)))
+        except ValueError:
+            pass
+    seeded: List[tuple] = []
+    try:
+        return marshal.dumps((_pack(state, (), seeded, sources), tuple(seeded)))
+    except (_Skip, ValueError):
+        return None
+
+def decode(blob: bytes) -> Dict[str, Any]:
+    """State for a blob; raises MissingSource rather than hand back a pool without its ids."""
+    state, seeded = marshal.loads(blob)
+    for path, seed, key, size in seeded:
+        src = SOURCES.get(key)
+        if not src:
+            raise MissingSource(key)
+        target = state
+        for k in path[:-1]:
+            target = target[k]
+        target[path[-1]] = core.SeededSequence(seed, src, size)
+    return state
+
+def _frame(entries, sources, reviews=None) -> bytes:
+    payload = zlib.compress(marshal.dumps((FORMAT, sources, entries, reviews or {})), 1)
+    return _HEADER.pack(MAGIC, len(payload), zlib.crc32(payload)) + payload
+
+def read_frames(path: str):
+    """(sources, entries, reviews) per intact frame; stops at the first torn or corrupt one."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return
+    at = 0
+    while at + _HEADER.size <= len(data):
+        magic, n, crc = _HEADER.unpack_from(data, at)
+        payload = data[at + _HEADER.size: at + _HEADER.size + n]
+        if magic != MAGIC or len(payload) != n or zlib.crc32(payload) != crc:
+            return
+        fmt, sources, entries, *rest = marshal.loads(zlib.decompress(payload))
+        if fmt in (1, FORMAT):
+            yield sources, entries, (rest[0] if rest else {})
+        at += _HEADER.size + n
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+class Snapshots:
+    """
+    Background writer for core.SESSIONS. Each round appends one frame with the
+    sessions accessed since the previous round; flush() does the same on demand
+    (SIGTERM, worker exit). restore() merges base + logs by session version.
+    """
+    def __init__(self):
+        self.dir: Optional[str] = None
+        self.interval = 30.0
+        self.max_age = 7 * 86400.0
+        self.lock = threading.RLock()     # SIGTERM may land mid-flush on the main thread
+        self._pid = None
+        self.written = 0
+        self.skipped = 0
+        self.last_flush = None
+        self.last_error = None
+        self.restored = 0
+        self.restore_ms = None
+        self.rebase_ms = None
+        self.expired = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.dir)
+
+    def configure(self, directory: Optional[str], interval=None, max_age_days=None) -> None:
+        self.dir = directory or None
+        if interval is not None:
+            self.interval = max(1.0, float(interval))
+        if max_age_days is not None:
+            self.max_age = float(max_age_days) * 86400
+        if self.dir:
+            os.makedirs(self.dir, exist_ok=True)
+
+    def _log_path(self) -> str:
+        return os.path.join(self.dir, f"sessions-{os.getpid()}.snap")
+
+    # -- writing --
+    def flush(self, full: bool = False) -> int:
+        """Persist dirty sessions (all live ones with full); returns how many were written."""
+        if not self.enabled:
+            return 0
+        store = core.SESSIONS
+        with self.lock:
+            dirty = store.take_dirty()
+            reviews = {}
+            try:
+                return self._write(store, dirty, full, reviews)
+            except BaseException as e:
+                store.mark_dirty(dirty)          # try these again next round
+                review.mark_dirty(reviews)
+                self.last_error = f"{type(e).__name__}: {e}"
+                raise
+
+    def _write(self, store, dirty, full, reviews) -> int:
+        sids = list(dict.keys(store)) if full else dirty
+        sources: Dict[str, tuple] = {}
+        entries = {}
+        retry = set()
+        for sid in sids:
+            state = dict.get(store, sid)
+            if state is None:
+                continue
+            try:
+                blob = encode(state, sources)
+            except RuntimeError:        # mutated mid-walk by a request thread
+                retry.add(sid)
+                continue
+            if blob is None:
+                self.skipped += 1
+                continue
+            entries[sid] = (state.get('version', 0), blob)
+        store.mark_dirty(retry)
+        reviews.update(review.take_dirty(everything=full))
+        if not entries and not reviews and not full:
+            return 0
+        path = self._log_path()
+        if full:
+            _write_atomic(path, _frame(entries, sources, reviews))
+        else:
+            with open(path, 'ab') as f:
+                f.write(_frame(entries, sources, reviews))
+            if os.path.getsize(path) > COMPACT_BYTES:
+                _write_atomic(path, _frame(self._live(sources), sources,
+                                           review.take_dirty(everything=True)))
+        self.written += len(entries)
+        self.last_flush = time.time()
+        return len(entries)
+
+    def _live(self, sources):
+        out = {}
+        for sid, state in list(dict.items(core.SESSIONS)):
+            blob = encode(state, sources)
+            if blob is not None:
+                out[sid] = (state.get('version', 0), blob)
+        return out
+
+    def start(self) -> None:
+        """Start this process's writer thread (again after a fork)."""
+        if not self.enabled or self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        threading.Thread(target=self._run, name='session-snapshot', daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+
+    def install_sigterm(self) -> None:
+        """Flush on SIGTERM, then hand over to whatever handled it before."""
+        if not self.enabled or threading.current_thread() is not threading.main_thread():
+            return
+        prev = signal.getsignal(signal.SIGTERM)
+
+        def on_term(signum, frame):
+            try:
+                self.flush()
+            finally:
+                if callable(prev):
+                    prev(signum, frame)
+                else:
+                    signal.signal(signal.SIGTERM, prev or signal.SIG_DFL)
+                    os.kill(os.getpid(), signal.SIGTERM)
+        signal.signal(signal.SIGTERM, on_term)
+
+    # -- restoring --
+    def restore(self) -> int:
+        """
+        Load base + every process log as cold sessions (decoded on first access),
+        newest version winning, then fold them into a fresh base. Logs are renamed
+        before reading, so a process still shutting down writes a new one instead
+        of appending to a file that is about to be deleted.
+        """
+        if not self.enabled:
+            return 0
+        t0 = time.perf_counter()
+        base = os.path.join(self.dir, BASE)
+        claimed = glob.glob(os.path.join(self.dir, 'sessions-*.snap.merging'))
+        for path in glob.glob(os.path.join(self.dir, 'sessions-*.snap')):
+            if os.path.basename(path) == BASE:
+                continue
+            try:
+                os.rename(path, path + '.merging')
+                claimed.append(path + '.merging')
+            except OSError:
+                pass
+
+        merged: Dict[str, tuple] = {}
+        queues: Dict[str, tuple] = {}
+        for sources, entries, reviews in read_frames(base):
+            SOURCES.update(sources)
+            merged.update(entries)
+            queues.update(reviews)
+        for path in claimed:
+            for sources, entries, reviews in read_frames(path):
+                SOURCES.update(sources)
+                for sid, entry in entries.items():
+                    cur = merged.get(sid)
+                    if cur is None or entry[0] >= cur[0]:
+                        merged[sid] = entry
+                for gid, entry in reviews.items():
+                    cur = queues.get(gid)
+                    if cur is None or entry[0] >= cur[0]:
+                        queues[gid] = entry
+
+        self._share_catalog_sources()
+        store = core.SESSIONS
+        store.decoder = decode
+        if dict.__len__(store):
+            merged = {sid: e for sid, e in merged.items() if not dict.__contains__(store, sid)}
+        store.cold.update(merged)
+        review.restore(queues)
+        self.restored = len(merged)
+        self.restore_ms = round((time.perf_counter() - t0) * 1000, 1)
+        # the new base is written off the startup path; until it lands the
+        # .merging files stay, so an early exit just redoes this next time
+        threading.Thread(target=self._rebase, args=(base, merged, queues, claimed),
+                         name='session-rebase', daemon=True).start()
+        return self.restored
+
+    def _rebase(self, base: str, merged: Dict[str, tuple], queues: Dict[str, tuple],
+                claimed: List[str]) -> None:
+        t0 = time.perf_counter()
+        # versions start from a ms clock, so they double as last-activity stamps
+        cutoff = (time.time() - self.max_age) * 1000
+        expired = [sid for sid, e in merged.items() if e[0] < cutoff]
+        for sid in expired:
+            del merged[sid]
+            core.SESSIONS.cold.pop(sid, None)
+        queues = {gid: e for gid, e in queues.items() if e[0] >= cutoff}
+        try:
+            _write_atomic(base, _frame(merged, dict(SOURCES), queues))
+        except OSError as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            return
+        for path in claimed:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.expired = len(expired)
+        self.rebase_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+    def _share_catalog_sources(self) -> None:
+        """Restored sequences over an unchanged catalog point at its tuples, not copies."""
+        cat = core.CATALOG
+        if cat is None:
+            return
+        for ids in (cat.ids, *cat.pool_ids.values()):
+            key = _source_key(ids)
+            if key in SOURCES:
+                SOURCES[key] = ids
+
+    def status(self) -> Dict[str, Any]:
+        return {'enabled': self.enabled, 'dir': self.dir, 'interval': self.interval,
+                'live': dict.__len__(core.SESSIONS), 'cold': len(core.SESSIONS.cold),
+                'dirty': len(core.SESSIONS.dirty), 'written': self.written, 'skipped': self.skipped,
+                'thaw_errors': core.SESSIONS.thaw_errors, 'last_thaw_error': core.SESSIONS.last_error,
+                'last_flush': self.last_flush, 'last_error': self.last_error,
+                'restored': self.restored, 'restore_ms': self.restore_ms,
+                'rebase_ms': self.rebase_ms, 'expired': self.expired}
+
+SNAPSHOTS = Snapshots()
@@ -25,6 +25,9 @@ document.addEventListener('DOMContentLoaded', () => {
   })());
   console.log('GUEST_ID', GUEST_ID); // optional debug
 
+  // Rule variant (?variant=nopow|sqrtfact|concat); the server remembers it per session
+  const VARIANT = new URLSearchParams(location.search).get('variant') || '';
+
 
   // Surface any uncaught JS error so we don't silently stall on "Dealing…"
   window.addEventListener('error', (ev)=>{
@@ -122,6 +125,65 @@ document.addEventListener('DOMContentLoaded', () => {
     compDeadline = null;
     if (compInterval) { clearInterval(compInterval); compInterval = null; }
     hideCompBanner();
+    closeEventStream();
+  }
+
+  // ---------- push channel: server timer + pool progress (SSE, long-poll fallback) ----------
+  let evtSource = null;
+  let evtPolling = false;
+  function handlePush(event, d) {
+    d = d || {};
+    if (event === 'tick' && typeof d.time_left === 'number') {
+      if (d.time_left > 0) resyncCompetitionCountdown(d.time_left); else endCompetitionUI();
+    } else if (event === 'time_up') {
+      endCompetitionUI();
+    } else if (event === 'score' && el.msg && typeof d.pool_solved === 'number') {
+      el.msg.title = `Pool: ${d.pool_solved} / ${d.pool_len} solved`;
+    } else if (event === 'pool_done') {
+      const list = (d.unfinished || []).map(id => `#${id}`).join(', ');
+      if (el.msg) {
+        el.msg.textContent = list ? `✅ All questions in this pool have been shown once. Unfinished: ${list}` : `✅ All questions in this pool have been shown once.`;
+        el.msg.className = 'status status-success';
+      }
+    }
+  }
+  function openEventStream() {
+    if (evtSource || evtPolling) return;
+    const qs = `client_id=${encodeURIComponent(CLIENT_ID)}&guest_id=${encodeURIComponent(GUEST_ID)}`;
+    if (window.EventSource) {
+      evtSource = new EventSource(`/api/events?${qs}`);
+      ['tick', 'time_up', 'score', 'pool_done'].forEach(name => {
+        evtSource.addEventListener(name, (e) => {
+          let d = {}; try { d = JSON.parse(e.data); } catch {}
+          handlePush(name, d);
+        });
+      });
+      return;
+    }
+    evtPolling = true;
+    (async () => {
+      let since = '';
+      while (evtPolling) {
+        try {
+          const r = await fetch(`/api/events?transport=poll&since=${since}&${qs}`);
+          const j = await r.json();
+          since = (j.last_id == null) ? '' : j.last_id;
+          (j.events || []).forEach(e => handlePush(e.event, e.data));
+          if (typeof j.time_left === 'number') handlePush('tick', { time_left: j.time_left });
+          if (j.retry_ms) await new Promise(res => setTimeout(res, j.retry_ms));   // server has no thread to park on
+        } catch { await new Promise(res => setTimeout(res, 3000)); }
+      }
+    })();
+  }
+  function closeEventStream() {
+    if (evtSource) { evtSource.close(); evtSource = null; }
+    evtPolling = false;
+  }
+  // server tick: correct the local deadline without restarting the banner
+  function resyncCompetitionCountdown(seconds) {
+    if (!compDeadline) { startCompetitionCountdown(seconds); return; }
+    compDeadline = Date.now() + seconds * 1000;
+    updateCompBanner();
   }
   // Only toggles the Next button now
   function setControlsEnabled(enabled) {
@@ -282,7 +344,7 @@ function updateStatsFromServer(statsData) {
       helpDisabled = data.help_disabled;
       updateCasePoolUI();
     }
-    if (typeof data.time_left === 'number') startCompetitionCountdown(data.time_left);
+    if (typeof data.time_left === 'number') { startCompetitionCountdown(data.time_left); openEventStream(); }
     else stopCompetitionCountdown();
     competitionOver = false;
 
@@ -292,9 +354,27 @@ function updateStatsFromServer(statsData) {
     if (el.question) el.question.textContent = `Q${data.seq} [#${data.case_id}] — Cards: ${data.question}`;
     if (el.cards) {
       el.cards.innerHTML = '';
-      data.images.forEach(c => {
-        const img = document.createElement('img');
-        img.src = c.url; img.alt = c.code; img.className = 'card';
+      const n = data.images.length;
+      data.images.forEach((c, i) => {
+        let img;
+        if (data.hand_url) {
+          // one composited image for the hand; each card shows its own tile
+          img = document.createElement('div');
+          img.className = 'card sprite';
+          img.setAttribute('role', 'img');
+          img.setAttribute('aria-label', c.code);
+          // PNG for browsers without WebP or image-set(); the second assignment is dropped where unsupported
+          img.style.backgroundImage = `url("${data.hand_url_png || data.hand_url}")`;
+          if (data.hand_url_png) {
+            img.style.backgroundImage = `image-set(url("${data.hand_url}") type("image/webp"), url("${data.hand_url_png}") type("image/png"))`;
+          }
+          img.style.backgroundSize = `${n * 100}% 100%`;
+          img.style.backgroundPosition = `${n > 1 ? (i * 100) / (n - 1) : 0}% 0`;
+        } else {
+          img = document.createElement('img');
+          img.src = c.url; img.alt = c.code; img.className = 'card';
+          if (c.srcset) { img.srcset = c.srcset; img.sizes = '(max-width: 600px) 45vw, 200px'; }
+        }
         const rankToken = c.code.startsWith('10') ? 'T' : c.code[0];
         img.title = `Click to insert ${rankToken}`;
         img.addEventListener('click', () => insertAtCursor(rankToken));
@@ -331,7 +411,7 @@ function updateStatsFromServer(statsData) {
       const levelVal = safeValue(el.level, 'easy');
   
       try {
-          const r = await fetch(`/api/next?theme=${encodeURIComponent(themeVal)}&level=${encodeURIComponent(levelVal)}&seq=${currentSeq}&client_id=${encodeURIComponent(CLIENT_ID)}&guest_id=${encodeURIComponent(GUEST_ID)}`);
+          const r = await fetch(`/api/next?theme=${encodeURIComponent(themeVal)}&level=${encodeURIComponent(levelVal)}&seq=${currentSeq}&variant=${encodeURIComponent(VARIANT)}&client_id=${encodeURIComponent(CLIENT_ID)}&guest_id=${encodeURIComponent(GUEST_ID)}`);
   
           if (r.ok) {
               const data = await r.json();
@@ -349,6 +429,25 @@ function updateStatsFromServer(statsData) {
               return;
           }
   
+          if (r.status === 503 && data && data.retry_after) {
+              // variant catalog still loading on the server
+              if (el.question) el.question.textContent = '';
+              el.msg.textContent = data.error;
+              el.msg.className = 'status';
+              currentStatus = 'idle';
+              setTimeout(deal, data.retry_after * 1000);
+              return;
+          }
+
+          if (r.status === 429) {
+              // admission control: dealing too fast, wait the bucket out
+              el.msg.textContent = `Slow down — try again in ${(data && data.retry_after) || 1}s.`;
+              el.msg.className = 'status';
+              currentStatus = 'idle';
+              setControlsEnabled(true);
+              return;
+          }
+
           if (r.status === 400 && data && data.pool_done) {
               if (el.question) el.question.textContent = '';
               const list = (data.unfinished || []).map(id => `#${id}`).join(', ');
@@ -390,9 +489,7 @@ function updateStatsFromServer(statsData) {
 
    async function showPoolReportNow(){
      try{
-       const r = await fetch('/api/pool_report');
-       const j = await r.json();
-       if(!j.ok){ throw new Error('pool_report failed'); }
+       const j = await window.fetchReport('/api/pool_report');
        const s = j.stats || {};
        renderSummary(s, totalSeconds); // re-use your existing summary modal
      }catch(e){
@@ -419,7 +516,7 @@ function updateStatsFromServer(statsData) {
     try {
       const themeVal = safeValue(el.theme, 'classic');
       const levelVal = safeValue(el.level, 'easy');
-      const r = await fetch(`/api/next?theme=${encodeURIComponent(themeVal)}&level=${encodeURIComponent(levelVal)}&case_id=${caseId}&seq=${currentSeq}&client_id=${encodeURIComponent(CLIENT_ID)}&guest_id=${encodeURIComponent(GUEST_ID)}`);
+      const r = await fetch(`/api/next?theme=${encodeURIComponent(themeVal)}&level=${encodeURIComponent(levelVal)}&case_id=${caseId}&seq=${currentSeq}&variant=${encodeURIComponent(VARIANT)}&client_id=${encodeURIComponent(CLIENT_ID)}&guest_id=${encodeURIComponent(GUEST_ID)}`);
       if (!r.ok) {
         const errorData = await r.json().catch(()=>({}));
         throw new Error(errorData.error || 'Case not found.');
@@ -440,7 +537,7 @@ function updateStatsFromServer(statsData) {
     try{
       const r = await fetch('/api/check', {
         method:'POST', headers:{'Content-Type':'application/json'},
-        body: JSON.stringify({ values: current.values, answer: preprocess(expr), client_id: CLIENT_ID,  guest_id: GUEST_ID })
+        body: JSON.stringify({ values: current.values, answer: preprocess(expr), variant: VARIANT, client_id: CLIENT_ID,  guest_id: GUEST_ID })
       });
       const res = await r.json();
       if(res.ok){
@@ -469,7 +566,7 @@ function updateStatsFromServer(statsData) {
     try{
       const r = await fetch('/api/help', {
         method:'POST', headers:{'Content-Type':'application/json'},
-        body: JSON.stringify({ values: current.values, all, client_id: CLIENT_ID,  guest_id: GUEST_ID })
+        body: JSON.stringify({ values: current.values, all, variant: VARIANT, client_id: CLIENT_ID,  guest_id: GUEST_ID })
       });
       if(!r.ok) throw new Error('help fetch');
       const data = await r.json();
@@ -687,6 +784,43 @@ function updateStatsFromServer(statsData) {
 })(); // end IIFE
 }); // End of DOMContentLoaded
 /* ===== SUMMARY + EXIT (anywhere-safe) ===== */
+// Versioned reports: keep the last one, ask the server only for what changed since.
+(function reportCache(){
+  let last = null;   // {key, version, stats}
+
+  function merge(prev, d) {
+    const score = Object.assign({}, prev.pool_score, d.pool_score);
+    const rows = new Map((prev.pool_report || []).map(r => [r.case_id, r]));
+    (d.pool_report || []).forEach(r => rows.set(r.case_id, r));
+    const unfinished = Object.keys(score).filter(k => !score[k]).map(Number);
+    return Object.assign({}, prev, d, {pool_score: score, pool_report: [...rows.values()], unfinished});
+  }
+
+  window.fetchReport = async function(url, init = {}) {
+    const key = `${window.CLIENT_ID}|${window.GUEST_ID}`;
+    if (last && last.key !== key) last = null;
+    init = Object.assign({}, init);
+    if (last) {
+      if (String(init.method || 'GET').toUpperCase() === 'POST') {
+        let body = {};
+        if (init.body) { try { body = JSON.parse(init.body); } catch {} }
+        body.since = last.version;
+        init.body = JSON.stringify(body);
+      } else {
+        url += (url.includes('?') ? '&' : '?') + 'since=' + last.version;
+      }
+    }
+    const r = await fetch(url, init);
+    if (!r.ok) throw new Error(url + ' http ' + r.status);
+    const j = await r.json();
+    if (!j || j.ok !== true) throw new Error(url + ' payload');
+    if (!(j.unchanged && last)) {
+      last = {key, version: j.version, stats: (j.delta && last) ? merge(last.stats, j.stats) : j.stats};
+    }
+    return {ok: true, stats: last.stats, version: last.version};
+  };
+})();
+
 (function initSummaryUI(){
   // --- IDs (per-tab/person), no redeclare: use window.*
   try {
@@ -853,14 +987,11 @@ function updateStatsFromServer(statsData) {
 
   async function exitAndShowSummary() {
     try {
-      const r = await fetch('/api/exit', {
+      const j = await window.fetchReport('/api/exit', {
         method: 'POST',
         headers: {'Content-Type':'application/json'},
         body: JSON.stringify({ client_id: window.CLIENT_ID, guest_id: window.GUEST_ID })
       });
-      if (!r.ok) throw new Error('exit http ' + r.status);
-      const j = await r.json();
-      if (!j || j.ok !== true) throw new Error('exit payload');
       const html = renderSummary(j.stats || {}, getTotalSeconds());
       showSummaryModal(html);
     } catch (e) {
@@ -1067,10 +1198,8 @@ function updateStatsFromServer(statsData) {
 
   async function refetchStats() {
     try {
-      const r = await fetch(`/api/pool_report?client_id=${encodeURIComponent(window.CLIENT_ID)}&guest_id=${encodeURIComponent(window.GUEST_ID)}`);
-      if (!r.ok) return;
-      const j = await r.json();
-      if (j && j.ok && j.stats) setCountersFromStats(j.stats);
+      const j = await window.fetchReport(`/api/pool_report?client_id=${encodeURIComponent(window.CLIENT_ID)}&guest_id=${encodeURIComponent(window.GUEST_ID)}`);
+      if (j.stats) setCountersFromStats(j.stats);
     } catch {}
   }
 
@@ -1223,10 +1352,7 @@ function updateStatsFromServer(statsData) {
   // --- Fetch current stats & decide whether to show banner ---
   async function fetchStatsAndMaybeBanner() {
     try {
-      const r = await fetch(`/api/pool_report?client_id=${encodeURIComponent(window.CLIENT_ID)}&guest_id=${encodeURIComponent(window.GUEST_ID)}`);
-      if (!r.ok) return;
-      const j = await r.json();
-      if (!j || !j.ok) return;
+      const j = await window.fetchReport(`/api/pool_report?client_id=${encodeURIComponent(window.CLIENT_ID)}&guest_id=${encodeURIComponent(window.GUEST_ID)}`);
       const st = j.stats || {};
       updateFooterFromStats(st);
       const hasProgress = (st.played||0) + (st.solved||0) + (st.revealed||0) + (st.skipped||0) > 0;